@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Interface asyncio de SimplePhotoMetadata, pour les services asynchrones
+(aiohttp, etc.).
+
+Les lectures de fichiers et l'analyse des EXIF restent faites par
+SimplePhotoMetadata, dans des threads (asyncio.to_thread) : la boucle
+d'événements n'est jamais bloquée. Un sémaphore limite le nombre de photos
+traitées en même temps.
+
+Exemple :
+    async def ingest(directory):
+        photos = AsyncPhotoMetadata(directory, concurrency=8)
+        async with contextlib.aclosing(photos.scan_directory()) as scan:
+            async for filepath, metadata in scan:
+                ...
+        report = await photos.restore("/chemin/cible")
+
+Annulation : annuler la tâche appelante arrête de lancer de nouvelles
+photos et annule celles qui attendent leur tour. Les photos déjà en cours
+dans un thread se terminent normalement ; une restauration en cours passe
+toujours par un fichier temporaire, aucune photo n'est laissée tronquée.
+Pour un scan, aclosing() garantit que les extractions en attente sont
+annulées dès la sortie de la boucle (break, exception ou annulation).
+"""
+
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from photo_log import get_logger, log_event
+from simple_metadata import SimplePhotoMetadata, _extract_worker, _log_extracted
+
+
+logger = get_logger()
+
+# Nombre de photos lues d'un coup dans les itérateurs bloquants
+# (parcours du dossier, lecture du fichier de métadonnées)
+BATCH_SIZE = 64
+
+
+def _next_batch(iterator, size):
+    """Lit jusqu'à `size` éléments d'un itérateur (appelé dans un thread)."""
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) >= size:
+            break
+    return batch
+
+
+async def _iter_in_thread(iterator, size=BATCH_SIZE):
+    """
+    Parcourt un itérateur bloquant depuis la boucle d'événements.
+
+    Les éléments sont lus par paquets, toujours dans le même thread dédié,
+    qui ferme aussi l'itérateur à la fin : une connexion SQLite ouverte par
+    l'itérateur reste dans son thread, et un arrêt anticipé (aclose,
+    annulation) ferme le fichier ou la connexion.
+
+    Yields:
+        Éléments de l'itérateur
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='metadata_iter')
+    try:
+        while True:
+            batch = await loop.run_in_executor(executor, _next_batch, iterator, size)
+            if not batch:
+                return
+            for item in batch:
+                yield item
+    finally:
+        # Fermeture après le paquet éventuellement en cours, même si
+        # l'attente est annulée
+        close = getattr(iterator, 'close', None)
+        closing = executor.submit(close) if close is not None else None
+        executor.shutdown(wait=False)
+        if closing is not None:
+            await asyncio.shield(asyncio.wrap_future(closing))
+
+
+async def _cancel_tasks(tasks):
+    """Annule des tâches et attend qu'elles soient terminées."""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class AsyncPhotoMetadata:
+    """Gestionnaire asynchrone des métadonnées des photos."""
+
+    def __init__(self, photo_directory, output_format=None, concurrency=8, **options):
+        """
+        Args:
+            photo_directory (str): Chemin vers le dossier contenant les photos
+            output_format (str): Format de sauvegarde (voir SimplePhotoMetadata)
+            concurrency (int): Nombre maximal de photos traitées en même temps
+            **options: Autres options de SimplePhotoMetadata (include,
+                exclude, skip_hidden, date_precedence, instrument, exif_backup,
+                fingerprint, timezones, timezone_polygons, date_rules, places,
+                places_file)
+        """
+        self.manager = SimplePhotoMetadata(photo_directory, output_format, **options)
+        self.concurrency = max(1, concurrency)
+        # Un sémaphore par boucle : un sémaphore reste lié à la boucle où il a servi
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    @property
+    def semaphore(self):
+        """Sémaphore de la boucle courante (créé à la première utilisation)."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.concurrency)
+        return semaphore
+
+    async def _limited(self, function, *args):
+        """Exécute une fonction bloquante dans un thread, dans la limite du sémaphore."""
+        async with self.semaphore:
+            return await asyncio.to_thread(function, *args)
+
+    async def extract(self, image_path):
+        """
+        Extrait les métadonnées essentielles d'une photo.
+
+        Args:
+            image_path (str | Path): Chemin vers l'image
+
+        Returns:
+            dict: Métadonnées de la photo (champ 'erreur' en cas d'échec)
+        """
+        metadata, _ = await self._limited(_extract_worker, self.manager, Path(image_path))
+        return metadata
+
+    async def scan_directory(self, incremental=True):
+        """
+        Scanne le dossier et fournit les métadonnées au fur et à mesure.
+
+        Les photos sont rendues dans l'ordre du parcours, comme avec
+        SimplePhotoMetadata.iter_scan ; jusqu'à `concurrency` extractions
+        sont menées en même temps.
+
+        Args:
+            incremental (bool): Réutiliser les métadonnées déjà extraites
+
+        Yields:
+            tuple: (chemin, métadonnées)
+        """
+        manager = self.manager
+        log_event(logger, logging.INFO, 'scan_debut', "Scan du dossier: %s", manager.photo_directory,
+                  dossier=str(manager.photo_directory))
+        manager._start_stats('extraction')
+
+        previous_metadata = {}
+        if incremental and manager.metadata_file.exists():
+            previous_metadata = await asyncio.to_thread(manager.load_metadata)
+
+        exif_output = await asyncio.to_thread(manager._open_exif_output, incremental)
+
+        counts = {'photos': 0, 'extraites': 0, 'reprises': 0, 'retrouvees': 0}
+        plan = manager._iter_walk_plan(previous_metadata, {}, counts)
+
+        # Fenêtre de photos en cours, dans l'ordre du parcours : une photo
+        # réutilisée y attend que les extractions qui la précèdent soient finies
+        window = deque()
+        max_pending = self.concurrency * 2
+
+        async def pop_ready():
+            file_path, stat_info, task = window.popleft()
+            if not isinstance(task, asyncio.Task):
+                if exif_output is not None:
+                    await asyncio.to_thread(manager._backup_exif, exif_output, file_path, stat_info)
+                return str(file_path), task
+            metadata, block = await task
+            if exif_output is not None:
+                await asyncio.to_thread(manager._backup_exif, exif_output, file_path, stat_info, block)
+            _log_extracted(file_path, metadata)
+            manager.correct_date(file_path, metadata)
+            metadata['taille'] = stat_info.st_size
+            metadata['mtime_ns'] = stat_info.st_mtime_ns
+            return str(file_path), metadata
+
+        entries = _iter_in_thread(plan)
+        try:
+            async for file_path, stat_info, previous in entries:
+                if previous is None:
+                    previous = asyncio.create_task(
+                        self._limited(_extract_worker, manager, file_path))
+                window.append((file_path, stat_info, previous))
+
+                while len(window) > max_pending or (
+                        window and not isinstance(window[0][2], asyncio.Task)):
+                    yield await pop_ready()
+
+            while window:
+                yield await pop_ready()
+
+            if exif_output is not None:
+                await asyncio.to_thread(manager._close_exif_output, exif_output)
+        finally:
+            # Arrêt anticipé ou annulation : ne laisser aucune tâche derrière soi
+            await _cancel_tasks([task for _, _, task in window if isinstance(task, asyncio.Task)])
+            await entries.aclose()
+            if exif_output is not None and not exif_output.closed:
+                exif_output.abort()
+
+        manager.log_date_rules()
+        pruned = len(previous_metadata) - counts['retrouvees']
+        manager.scan_summary = {
+            'reutilisees': counts['photos'] - counts['extraites'],
+            'reprises': 0,
+            'extraites': counts['extraites'],
+            'supprimees': pruned
+        }
+        if manager.stats is not None:
+            manager.stats.counters.update(manager.scan_summary)
+            manager.stats.finish()
+
+    async def save_metadata(self, metadata):
+        """
+        Sauvegarde les métadonnées (voir SimplePhotoMetadata.save_metadata).
+
+        Args:
+            metadata (dict): Chemin -> métadonnées
+
+        Returns:
+            int: Nombre de photos sauvegardées
+        """
+        return await asyncio.to_thread(self.manager.save_metadata, metadata)
+
+    async def restore(self, target_directory=None, dry_run=False, full_exif=True, in_place=False):
+        """
+        Restaure les métadonnées sur les photos.
+
+        Args:
+            target_directory (str): Dossier cible (par défaut: dossier original)
+            dry_run (bool): Seulement indiquer les photos qui seraient modifiées
+            full_exif (bool): Utiliser la sauvegarde complète des EXIF si elle existe
+            in_place (bool): Modifier les JPEG sur place quand c'est possible
+
+        Returns:
+            dict: Bilan de la restauration, comme restore_metadata
+        """
+        manager = self.manager
+        target_directory = (manager.photo_directory if target_directory is None
+                            else Path(target_directory))
+
+        if not manager.metadata_file.exists():
+            logger.warning("Fichier de metadonnees non trouve: %s", manager.metadata_file)
+            logger.warning("Aucune metadonnees a restaurer.")
+            return None
+
+        log_event(logger, logging.INFO, 'restauration_debut', "Restauration des metadonnees...",
+                  cible=str(target_directory), simulation=dry_run)
+        start = time.perf_counter()
+        manager._start_stats('restauration')
+
+        filename_index = await asyncio.to_thread(manager.build_filename_index, target_directory)
+        index_duration = time.perf_counter() - start
+
+        resolution_stats = {'trouves': 0, 'absents': 0, 'ambigus': 0, 'empreinte': 0}
+        report = {'restaures': 0, 'inchanges': 0, 'a_modifier': 0, 'erreurs': 0, 'octets_ecrits': 0}
+        fingerprint_index = manager.build_fingerprint_index(filename_index)
+
+        exif_archive = (await asyncio.to_thread(manager._open_exif_archive)) if full_exif else None
+
+        pending = set()
+
+        def collect(task):
+            manager._collect_restore_results([task.result()], report)
+
+        entries = _iter_in_thread(manager.iter_metadata())
+        try:
+            async for original_path, metadata in entries:
+                # Les empreintes éventuelles sont calculées dans un thread
+                target_file = await asyncio.to_thread(
+                    manager.resolve_target_file, filename_index, original_path, metadata,
+                    target_directory, resolution_stats, fingerprint_index
+                )
+                if target_file is None:
+                    log_event(logger, logging.WARNING, 'photo_absente', "Fichier non trouve: %s",
+                              Path(original_path).name, chemin=original_path)
+                    continue
+
+                manager.correct_date(original_path, metadata)
+                exif_block = await asyncio.to_thread(
+                    manager._saved_exif_block, exif_archive, original_path, metadata, target_file
+                ) if exif_archive is not None else None
+                task = asyncio.create_task(
+                    self._limited(manager.restore_file, target_file, metadata, dry_run, exif_block,
+                                  in_place)
+                )
+                pending.add(task)
+
+                # Ne pas lire tout le fichier de métadonnées d'avance
+                if len(pending) >= self.concurrency * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        collect(task)
+
+            if pending:
+                done, pending = await asyncio.wait(pending)
+                for task in done:
+                    collect(task)
+        finally:
+            await _cancel_tasks(list(pending))
+            await entries.aclose()
+            if exif_archive is not None:
+                exif_archive.close()
+
+        return manager._finish_restore_report(report, resolution_stats, index_duration, start,
+                                              dry_run)
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai de l'extraction, de la sauvegarde, du chargement et de la
+restauration des métadonnées.
+
+Un corpus synthétique est généré localement (JPEG et TIFF, avec ou sans
+EXIF et GPS, de plusieurs tailles, dans des sous-dossiers), puis chaque
+étape est chronométrée. Le résultat est écrit en JSON pour pouvoir comparer
+deux exécutions.
+
+Avec --memoire, le pic des allocations Python de chaque étape est mesuré
+avec tracemalloc (ce qui ralentit les étapes : les durées ne sont alors pas
+comparables à une exécution sans --memoire).
+
+Utilisation :
+    python benchmark_metadata.py --tailles 1000,10000 --sortie bench.json
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import piexif
+from PIL import Image
+
+from photo_log import get_logger
+from simple_metadata import SimplePhotoMetadata
+
+
+# Photos par sous-dossier du corpus
+FILES_PER_DIRECTORY = 200
+
+# Nombre de photos mesurées individuellement avec extract_simple_metadata
+EXTRACT_SAMPLE_SIZE = 200
+
+
+def peak_rss_bytes():
+    """
+    Mémoire maximale utilisée par le processus depuis son lancement.
+
+    Ce pic ne redescend jamais : il couvre toutes les étapes déjà exécutées.
+
+    Returns:
+        int: Pic de mémoire résidente en octets, ou None si non disponible
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux, en octets sous macOS
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def _exif_bytes(index, with_gps):
+    """Construit un bloc EXIF avec une date (et éventuellement un GPS) variable."""
+    date = f"20{10 + index % 15:02d}:{1 + index % 12:02d}:{1 + index % 28:02d} " \
+           f"{index % 24:02d}:{index % 60:02d}:{(index * 7) % 60:02d}"
+    exif = {
+        "0th": {piexif.ImageIFD.Make: b"Benchmark", piexif.ImageIFD.DateTime: date.encode()},
+        "Exif": {piexif.ExifIFD.DateTimeOriginal: date.encode(),
+                 piexif.ExifIFD.DateTimeDigitized: date.encode()},
+        "GPS": {},
+        "1st": {},
+        "thumbnail": None
+    }
+    if with_gps:
+        exif["GPS"] = {
+            piexif.GPSIFD.GPSLatitudeRef: b"N" if index % 2 else b"S",
+            piexif.GPSIFD.GPSLatitude: ((index % 90, 1), (index % 60, 1), (1234, 100)),
+            piexif.GPSIFD.GPSLongitudeRef: b"E" if index % 3 else b"W",
+            piexif.GPSIFD.GPSLongitude: ((index % 180, 1), (index % 60, 1), (5678, 100)),
+        }
+    return piexif.dump(exif)
+
+
+def build_templates():
+    """
+    Prépare les modèles d'images du corpus.
+
+    Returns:
+        list: (extension, contenu) pour chaque variante d'image
+    """
+    templates = []
+    variants = [
+        # (extension, dimensions, EXIF, GPS) ; les petites photos sont majoritaires
+        ('.jpg', (320, 240), True, True),
+        ('.jpg', (320, 240), True, False),
+        ('.jpg', (320, 240), False, False),
+        ('.jpeg', (320, 240), True, True),
+        ('.jpg', (320, 240), True, True),
+        ('.jpg', (320, 240), True, False),
+        ('.jpg', (1600, 1200), True, True),
+        ('.jpg', (320, 240), True, True),
+        ('.tif', (160, 120), True, True),
+        ('.tif', (160, 120), False, False),
+    ]
+    for index, (extension, size, with_exif, with_gps) in enumerate(variants):
+        image = Image.effect_noise(size, 20 + index).convert('RGB')
+        output = io.BytesIO()
+        image_format = 'JPEG' if extension in ('.jpg', '.jpeg') else 'TIFF'
+        if with_exif:
+            image.save(output, image_format, exif=_exif_bytes(index, with_gps))
+        else:
+            image.save(output, image_format)
+        templates.append((extension, output.getvalue()))
+    return templates
+
+
+def generate_corpus(root, file_count, templates):
+    """
+    Génère un corpus de photos dans des sous-dossiers imbriqués.
+
+    Args:
+        root (Path): Dossier du corpus
+        file_count (int): Nombre de photos
+        templates (list): Modèles produits par build_templates
+
+    Returns:
+        int: Taille totale du corpus en octets
+    """
+    total_bytes = 0
+    for index in range(file_count):
+        directory_index = index // FILES_PER_DIRECTORY
+        directory = root / f"annee_{directory_index % 10}" / f"dossier_{directory_index:04d}"
+        if index % FILES_PER_DIRECTORY == 0:
+            directory.mkdir(parents=True, exist_ok=True)
+            # Fichier non photo, ignoré par le scan
+            (directory / "notes.txt").write_text("benchmark")
+
+        extension, data = templates[index % len(templates)]
+        with open(directory / f"IMG_{index:06d}{extension}", 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+    return total_bytes
+
+
+def _timed(function, *args, **kwargs):
+    """
+    Exécute une fonction en masquant ses affichages et mesure sa durée.
+
+    Si tracemalloc est actif, le pic des allocations Python est mesuré
+    pendant cette seule exécution.
+
+    Returns:
+        tuple: (résultat, durée en secondes, pic mémoire en octets ou None)
+    """
+    tracing = tracemalloc.is_tracing()
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+        if tracing:
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        result = function(*args, **kwargs)
+        duration = time.perf_counter() - start
+        memory_peak = tracemalloc.get_traced_memory()[1] - memory_before if tracing else None
+    return result, duration, memory_peak
+
+
+def _stage(file_count, duration, memory_peak, **extra):
+    """Construit le résultat d'une étape."""
+    stage = {
+        'fichiers': file_count,
+        'duree_s': round(duration, 4),
+        'fichiers_par_s': round(file_count / duration, 1) if duration else None
+    }
+    if memory_peak is not None:
+        # Pic des allocations Python de l'étape, au-delà de la mémoire déjà allouée
+        stage['pic_memoire_etape_octets'] = memory_peak
+    stage.update(extra)
+    return stage
+
+
+def run_size(root, file_count, templates, workers, output_format, pipeline=False):
+    """
+    Chronomètre toutes les étapes pour un corpus d'une taille donnée.
+
+    Args:
+        root (Path): Dossier de travail
+        file_count (int): Nombre de photos du corpus
+        templates (list): Modèles d'images
+        workers (int): Nombre de threads pour l'extraction et la restauration
+        output_format (str): Format de sauvegarde ('json', 'jsonl', 'sqlite')
+        pipeline (bool): Extraire avec le pipeline de scan_directory
+
+    Returns:
+        dict: Mesures de chaque étape
+    """
+    corpus = root / f"corpus_{file_count}"
+    start = time.perf_counter()
+    corpus_bytes = generate_corpus(corpus, file_count, templates)
+    results = {
+        'fichiers': file_count,
+        'octets_corpus': corpus_bytes,
+        'generation_s': round(time.perf_counter() - start, 4)
+    }
+
+    manager = SimplePhotoMetadata(corpus, output_format=output_format)
+
+    # scan_directory (extraction complète)
+    bytes_before = manager.bytes_read
+    metadata, duration, memory_peak = _timed(manager.scan_directory, workers=workers,
+                                             incremental=False, pipeline=pipeline)
+    results['scan_directory'] = _stage(
+        len(metadata), duration, memory_peak, octets_lus=manager.bytes_read - bytes_before
+    )
+    if pipeline:
+        results['scan_directory']['pipeline'] = manager.pipeline_stats
+
+    # extract_simple_metadata, photo par photo sur un échantillon
+    sample = [Path(filepath) for filepath in list(metadata)[:EXTRACT_SAMPLE_SIZE]]
+    bytes_before = manager.bytes_read
+    _, duration, memory_peak = _timed(
+        lambda: [manager.extract_simple_metadata(path) for path in sample]
+    )
+    results['extract_simple_metadata'] = _stage(
+        len(sample), duration, memory_peak, octets_lus=manager.bytes_read - bytes_before
+    )
+
+    # save_metadata
+    _, duration, memory_peak = _timed(manager.save_metadata, metadata)
+    results['save_metadata'] = _stage(
+        len(metadata), duration, memory_peak, octets_fichier=manager.metadata_file.stat().st_size
+    )
+    del metadata
+
+    # load_metadata
+    loaded, duration, memory_peak = _timed(manager.load_metadata)
+    results['load_metadata'] = _stage(len(loaded), duration, memory_peak)
+    del loaded
+
+    # restore_metadata (les photos sans EXIF sont réécrites, les autres inchangées)
+    report, duration, memory_peak = _timed(manager.restore_metadata, workers=workers)
+    results['restore_metadata'] = _stage(
+        report['restaures'] + report['inchanges'] + report['erreurs'], duration, memory_peak,
+        restaures=report['restaures'],
+        inchanges=report['inchanges'],
+        erreurs=report['erreurs'],
+        octets_ecrits=report['octets_ecrits']
+    )
+
+    # Pic de tout le processus depuis son lancement, corpus précédents compris
+    results['pic_rss_processus_octets'] = peak_rss_bytes()
+
+    shutil.rmtree(corpus, ignore_errors=True)
+    return results
+
+
+def parse_arguments():
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Banc d'essai des metadonnees photo")
+    parser.add_argument("--tailles", default="1000,10000,100000",
+                        help="Tailles de corpus, separees par des virgules")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="Threads pour l'extraction et la restauration (defaut: 1)")
+    parser.add_argument("--format", choices=["json", "jsonl", "sqlite"], default="json",
+                        help="Format de sauvegarde mesure (defaut: json)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Mesurer l'extraction en pipeline")
+    parser.add_argument("--memoire", action="store_true",
+                        help="Mesurer le pic memoire de chaque etape avec tracemalloc "
+                             "(ralentit les mesures de duree)")
+    parser.add_argument("--dossier", help="Dossier de travail (defaut: dossier temporaire)")
+    parser.add_argument("--sortie", help="Fichier JSON de resultats (defaut: affichage)")
+    return parser.parse_args()
+
+
+def main():
+    """Fonction principale."""
+    args = parse_arguments()
+    # Mesures sans affichage : les messages des traitements sont ignorés
+    get_logger().addHandler(logging.NullHandler())
+    sizes = [int(size) for size in args.tailles.split(',') if size.strip()]
+
+    work_root = Path(args.dossier) if args.dossier else Path(tempfile.mkdtemp(prefix="bench_metadata_"))
+    work_root.mkdir(parents=True, exist_ok=True)
+
+    report = {
+        'date': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        'python': sys.version.split()[0],
+        'plateforme': platform.platform(),
+        'jobs': args.jobs,
+        'format': args.format,
+        'pipeline': args.pipeline,
+        'memoire': args.memoire,
+        'tailles': []
+    }
+
+    templates = build_templates()
+    if args.memoire:
+        tracemalloc.start()
+    try:
+        for size in sizes:
+            print(f"Corpus de {size} photos...", file=sys.stderr)
+            report['tailles'].append(run_size(work_root, size, templates, args.jobs, args.format,
+                                               args.pipeline))
+    finally:
+        if not args.dossier:
+            shutil.rmtree(work_root, ignore_errors=True)
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as f:
+            f.write(output + "\n")
+        print(f"Resultats sauvegardes: {args.sortie}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
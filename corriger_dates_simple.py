@@ -1,103 +1,117 @@
 #!/usr/bin/env python3
 """
-Programme simple pour corriger les dates et heures de création dans un fichier 
+Programme simple pour corriger les dates et heures de création dans un fichier
 de métadonnées photos en se basant sur les noms de fichiers.
+
+Les corrections sont décrites par des règles (voir date_rules) : sans
+fichier de règles, les photos datées du 21/05/2025 reprennent la date de
+leur nom. Le fichier est lu et réécrit photo par photo.
 """
 
-import json
-import re
-from datetime import datetime
+import argparse
+import logging
+from pathlib import Path
+
+from date_rules import DateCorrector, DateRule
+from photo_dates import filename_pattern, match_filename_date
+from photo_log import SUMMARY, add_logging_arguments, configure_logging, get_logger, log_event
+from simple_metadata import SimplePhotoMetadata
+
+
+logger = get_logger('correction')
+
+# Règle appliquée sans fichier de règles : date future incorrecte
+DEFAULT_RULES = [{'nom': 'date_future', 'type': 'date_erronee', 'du': '2025-05-21', 'au': '2025-05-21'}]
+
+# Styles reconnus par extract_date_from_filename
+LEGACY_STYLES = ('samsung', 'whatsapp')
+
 
 def extract_date_from_filename(filename):
     """
     Extrait la date et l'heure du nom de fichier.
-    
+
     Args:
         filename (str): Nom de fichier à analyser
-        
+
     Returns:
         tuple: (date_creation, heure_creation) ou (None, None) si non trouvé
     """
-    # Format avec date et heure: 20210711_065821.jpg
-    match = re.search(r'(\d{4})(\d{2})(\d{2})_(\d{2})(\d{2})(\d{2})', filename)
-    if match:
-        year = match.group(1)
-        month = match.group(2)
-        day = match.group(3)
-        hour = match.group(4)
-        minute = match.group(5)
-        second = match.group(6)
-        
-        date_fr = f"{day}/{month}/{year}"
-        heure = f"{hour}:{minute}:{second}"
-        return date_fr, heure
-        
-    # Format WhatsApp: 20210711-WA0000.jpg
-    match = re.search(r'(\d{4})(\d{2})(\d{2})-WA', filename)
-    if match:
-        year = match.group(1)
-        month = match.group(2)
-        day = match.group(3)
-        
-        date_fr = f"{day}/{month}/{year}"
-        # On ne change pas l'heure existante
-        return date_fr, None
-    
-    return None, None
-
-def correct_metadata_dates(input_file, output_file):
+    return match_filename_date(filename_pattern(LEGACY_STYLES), filename) or (None, None)
+
+
+def correct_metadata_dates(input_file, output_file, rules=None, output_format=None):
     """
     Corrige les dates et heures dans le fichier de métadonnées.
-    
+
     Args:
-        input_file (str): Fichier d'entrée (JSON)
-        output_file (str): Fichier de sortie (JSON)
+        input_file (str): Fichier d'entrée (JSON, JSONL ou SQLite)
+        output_file (str): Fichier de sortie (format d'après son extension)
+        rules (DateCorrector): Règles à appliquer (par défaut DEFAULT_RULES)
+        output_format (str): Format du fichier de sortie ('json', 'jsonl', 'sqlite')
+
+    Returns:
+        DateCorrector: Règles appliquées, avec le nombre de photos corrigées par chacune
     """
-    print(f"Lecture du fichier {input_file}...")
-    
-    # Charger les métadonnées
-    with open(input_file, 'r', encoding='utf-8') as f:
-        metadata = json.load(f)
-    
-    print(f"Total de photos trouvées: {metadata.get('total_photos', 0)}")
-    
-    # Date future incorrecte à corriger
-    date_future = "21/05/2025"
-    corrections = 0
-    
-    # Parcourir toutes les photos
-    for filepath, photo_data in metadata['photos'].items():
-        filename = photo_data['nom']
-        
-        # Vérifier si la date est incorrecte (année 2025)
-        if photo_data['date_creation'] and date_future in photo_data['date_creation']:
-            date_from_name, heure_from_name = extract_date_from_filename(filename)
-            
-            if date_from_name:
-                # Mise à jour de la date de création
-                photo_data['date_creation'] = date_from_name
-                
-                # Mise à jour de l'heure si disponible
-                if heure_from_name:
-                    photo_data['heure_creation'] = heure_from_name
-                
-                corrections += 1
-                print(f"Correction de {filename} -> {date_from_name} {heure_from_name or photo_data['heure_creation']}")
-    
-    # Mettre à jour la date d'extraction
-    metadata['extraction_date'] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-    
-    # Sauvegarder les métadonnées corrigées
-    print(f"\nSauvegarde des métadonnées corrigées dans {output_file}...")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
-    
-    print(f"\nTerminé! {corrections} dates corrigées.")
+    input_file, output_file = Path(input_file), Path(output_file)
+    if input_file.resolve() == output_file.resolve():
+        raise ValueError("Le fichier de sortie doit etre different du fichier d'entree")
+    if rules is None:
+        rules = DateCorrector(DateRule.from_dict(spec, index) for index, spec in enumerate(DEFAULT_RULES))
+
+    logger.info("Lecture du fichier %s...", input_file)
+    reader = SimplePhotoMetadata(input_file.parent, metadata_file=input_file)
+    writer = SimplePhotoMetadata(output_file.parent, output_format, metadata_file=output_file)
+
+    def corrected_photos():
+        for filepath, photo_data in reader.iter_metadata():
+            rule = rules.correct(filepath, photo_data)
+            if rule is not None:
+                log_event(logger, logging.INFO, 'date_corrigee', "Correction de %s -> %s %s (%s)",
+                          photo_data['nom'], photo_data['date_creation'],
+                          photo_data['heure_creation'], rule,
+                          fichier=filepath, regle=rule, date_creation=photo_data['date_creation'],
+                          heure_creation=photo_data['heure_creation'])
+            yield filepath, photo_data
+
+    # Sauvegarder les métadonnées corrigées, au fil de la lecture
+    writer.save_metadata(corrected_photos())
+
+    for rule in rules.rules:
+        logger.log(SUMMARY, "Regle %s: %d photos corrigees%s", rule.name, rules.hits[rule.name],
+                   f", {rules.unresolved[rule.name]} non corrigeables"
+                   if rules.unresolved[rule.name] else "")
+    log_event(logger, SUMMARY, 'correction_bilan', "Termine! %d dates corrigees sur %d photos.",
+              rules.corrected, rules.total, corrigees=rules.corrected, photos=rules.total,
+              regles=dict(rules.hits))
+    return rules
+
+
+def parse_arguments():
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Correction des dates des photos par regles")
+    parser.add_argument("entree", nargs="?", default="metadata_simple.json",
+                        help="Fichier de metadonnees a corriger (defaut: metadata_simple.json)")
+    parser.add_argument("sortie", nargs="?", default="metadata_simple_corrected.json",
+                        help="Fichier corrige (defaut: metadata_simple_corrected.json)")
+    parser.add_argument("--regles", metavar="FICHIER",
+                        help="Fichier JSON des regles de correction (defaut: photos datees "
+                             "du 21/05/2025 corrigees d'apres leur nom)")
+    parser.add_argument("--format", choices=["json", "jsonl", "sqlite"], default=None,
+                        help="Format du fichier corrige (defaut: d'apres son extension)")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
 
 # Programme principal
 if __name__ == "__main__":
-    input_file = "metadata_simple.json"
-    output_file = "metadata_simple_corrected.json"
-    
+    args = parse_arguments()
+    configure_logging(quiet=args.quiet, verbose=args.verbeux, event_log=args.journal)
+
     print("=== Correction des dates et heures des photos ===")
-    correct_metadata_dates(input_file, output_file)
\ No newline at end of file
+    try:
+        rules = DateCorrector.from_file(args.regles) if args.regles else None
+        correct_metadata_dates(args.entree, args.sortie, rules, args.format)
+    except (OSError, ValueError) as e:
+        logger.error("Correction impossible: %s", e)
+        raise SystemExit(1)
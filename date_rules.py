@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Correction en lot des dates de prise de vue, par règles.
+
+Quatre sortes de règles, lues par exemple d'un fichier JSON :
+- 'date_erronee' : les photos datées d'une période impossible (horloge
+  remise à zéro, date du jour de la copie...) reprennent la date contenue
+  dans leur nom ;
+- 'nom_fichier' : les photos dont la date vient d'une source peu fiable
+  (par défaut la date du fichier, ou aucune date) reprennent la date
+  contenue dans leur nom ;
+- 'decalage' : les photos d'un dossier ou d'un appareil (motif du nom)
+  dont l'horloge était décalée sont avancées ou reculées d'un nombre fixe
+  de secondes, éventuellement sur une période seulement. Le décalage peut
+  être mesuré : une photo d'une horloge donne l'heure affichée par
+  l'appareil et l'heure réelle ; deux mesures à des dates différentes
+  donnent la dérive de l'horloge, appliquée proportionnellement ;
+- 'fuseau' : les photos prises avec l'horloge restée à l'heure d'un autre
+  fuseau ('horloge' : "+01:00" ou "Europe/Paris") passent à l'heure locale
+  du lieu de prise de vue, d'après leur décalage UTC déduit du GPS
+  (voir photo_timezones).
+
+Exemple de fichier de règles :
+    [
+      {"nom": "date_future", "type": "date_erronee", "du": "2025-05-21", "au": "2025-05-21"},
+      {"nom": "sans_exif", "type": "nom_fichier", "styles": ["samsung", "whatsapp"]},
+      {"nom": "horloge_reflex", "type": "decalage", "chemin": "*/Vacances 2019/*",
+       "fichier": "DSC_*", "secondes": -3600},
+      {"nom": "derive_compact", "type": "decalage", "fichier": "IMG_*",
+       "mesure": [["2023-01-02 10:00:00", "2023-01-02 10:00:00"],
+                  ["2023-12-30 10:04:10", "2023-12-30 10:00:00"]]},
+      {"nom": "reflex_japon", "type": "fuseau", "chemin": "*/Japon/*", "horloge": "Europe/Paris"}
+    ]
+
+Une photo n'est corrigée que par la première règle qui s'applique à elle ;
+les règles sont compilées une fois (motifs de chemins, motif unique pour
+tous les styles de noms) et appliquées au fil des photos.
+"""
+
+import json
+import re
+from bisect import bisect_right
+from collections import Counter
+from fnmatch import translate
+
+from photo_dates import (FILENAME_STYLES, capture_timestamp, filename_pattern, format_timestamp,
+                         match_filename_date, parse_date_argument)
+from photo_timezones import OFFSET_FIELD, OFFSET_SOURCE_FIELD, parse_offset, zone_offset
+
+
+RULE_TYPES = ('date_erronee', 'nom_fichier', 'decalage', 'fuseau')
+
+# Sources du décalage UTC donnant l'heure locale du lieu de prise de vue
+# (un décalage EXIF est celui de l'horloge de l'appareil)
+LOCATION_OFFSET_SOURCES = ('fuseau', 'longitude')
+
+# Sources de date remplacées par défaut par une règle 'nom_fichier'
+# (None : photo sans date)
+DEFAULT_UNRELIABLE_SOURCES = ('fichier', None)
+
+
+def parse_drift_measures(measures):
+    """
+    Lit les mesures d'une horloge d'appareil.
+
+    Args:
+        measures (list): Une mesure [heure affichée, heure réelle], ou une
+            liste de mesures ; heures au format de parse_date_argument
+
+    Returns:
+        list: (horodatage affiché, écart en secondes), triés par date
+
+    Raises:
+        ValueError: Si une mesure est invalide
+    """
+    if measures and all(isinstance(value, str) for value in measures):
+        measures = [measures]
+    points = []
+    for measure in measures or ():
+        if not isinstance(measure, (list, tuple)) or len(measure) != 2:
+            raise ValueError(f"Mesure invalide: {measure} (attendu: [heure affichee, heure reelle])")
+        shown, actual = (parse_date_argument(value) for value in measure)
+        points.append((shown, actual - shown))
+    points.sort()
+    if len({shown for shown, _ in points}) != len(points):
+        raise ValueError("Deux mesures a la meme heure affichee")
+    return points
+
+
+def drift_seconds(points, timestamp):
+    """
+    Écart de l'horloge à une date, d'après ses mesures.
+
+    Une seule mesure donne un écart constant ; avec plusieurs, l'écart varie
+    linéairement entre deux mesures et suit la dérive des deux mesures les
+    plus proches au-delà.
+
+    Args:
+        points (list): Mesures, comme parse_drift_measures
+        timestamp (int): Date affichée par l'appareil
+
+    Returns:
+        int: Secondes à ajouter à la date affichée
+    """
+    if len(points) == 1:
+        return points[0][1]
+    index = bisect_right(points, (timestamp, float('inf')))
+    index = min(max(index, 1), len(points) - 1)
+    (x1, y1), (x2, y2) = points[index - 1], points[index]
+    return round(y1 + (y2 - y1) * (timestamp - x1) / (x2 - x1))
+
+
+def _compile_glob(pattern):
+    """Compile un motif glob sur un chemin ("*/Vacances/*"), sans tenir compte de la casse."""
+    return re.compile(translate(pattern.replace('\\', '/')), re.IGNORECASE) if pattern else None
+
+
+class DateRule:
+    """Règle de correction des dates, compilée."""
+
+    def __init__(self, name, kind, start=None, end=None, path=None, filename=None,
+                 styles=None, sources=DEFAULT_UNRELIABLE_SOURCES, seconds=0, measures=None,
+                 clock=None):
+        """
+        Args:
+            name (str): Nom de la règle, repris dans le bilan
+            kind (str): Sorte de règle (voir RULE_TYPES)
+            start (str): Début de la période des dates concernées ("2025-05-21")
+            end (str): Fin de la période (incluse)
+            path (str): Motif glob des chemins concernés ("*/Vacances/*")
+            filename (str): Motif glob des noms concernés ("DSC_*")
+            styles (list): Styles de noms reconnus (par défaut tous)
+            sources (list): Sources de date remplacées par 'nom_fichier'
+            seconds (int): Décalage appliqué par 'decalage'
+            measures (list): Mesures de l'horloge pour 'decalage', à la place
+                de seconds (voir parse_drift_measures)
+            clock (str): Fuseau de l'horloge pour 'fuseau' ("+01:00" ou
+                "Europe/Paris")
+
+        Raises:
+            ValueError: Si la règle est incomplète ou invalide
+        """
+        if kind not in RULE_TYPES:
+            raise ValueError(f"Type de regle inconnu: {kind} (types possibles: {', '.join(RULE_TYPES)})")
+        styles = tuple(styles or FILENAME_STYLES)
+        unknown = [style for style in styles if style not in FILENAME_STYLES]
+        if unknown:
+            raise ValueError(f"Style de nom inconnu: {', '.join(unknown)} "
+                             f"(styles possibles: {', '.join(FILENAME_STYLES)})")
+        if kind == 'date_erronee' and start is None and end is None:
+            raise ValueError(f"Regle {name}: periode ('du', 'au') manquante")
+        if kind == 'decalage' and not seconds and not measures:
+            raise ValueError(f"Regle {name}: decalage ('secondes' ou 'mesure') manquant")
+        if kind == 'fuseau' and not clock:
+            raise ValueError(f"Regle {name}: fuseau de l'horloge ('horloge') manquant")
+        if clock and parse_offset(clock) is None and zone_offset(clock, '01/01/2000', None) is None:
+            raise ValueError(f"Regle {name}: fuseau inconnu: {clock}")
+
+        self.name = name
+        self.kind = kind
+        self.start = parse_date_argument(start) if start is not None else None
+        self.end = parse_date_argument(end, end_of_day=True) if end is not None else None
+        self.path_pattern = _compile_glob(path)
+        self.filename_pattern = _compile_glob(filename)
+        self.date_pattern = filename_pattern(styles)
+        self.sources = frozenset(sources)
+        self.seconds = int(seconds)
+        self.measures = parse_drift_measures(measures) if measures else None
+        self.clock = clock
+
+    @classmethod
+    def from_dict(cls, spec, index=0):
+        """
+        Crée une règle à partir de sa description JSON.
+
+        Args:
+            spec (dict): Clés 'type', 'nom', 'du', 'au', 'chemin', 'fichier',
+                'styles', 'sources', 'secondes', 'mesure' et 'horloge'
+            index (int): Position de la règle, pour nommer une règle sans nom
+        """
+        if not isinstance(spec, dict):
+            raise ValueError(f"Regle {index + 1}: description invalide")
+        known = {'type', 'nom', 'du', 'au', 'chemin', 'fichier', 'styles', 'sources', 'secondes',
+                 'mesure', 'horloge'}
+        unknown = set(spec) - known
+        if unknown:
+            raise ValueError(f"Cle de regle inconnue: {', '.join(sorted(unknown))}")
+        kind = spec.get('type')
+        return cls(
+            spec.get('nom') or f"{kind}_{index + 1}", kind,
+            start=spec.get('du'), end=spec.get('au'),
+            path=spec.get('chemin'), filename=spec.get('fichier'),
+            styles=spec.get('styles'),
+            sources=spec.get('sources', DEFAULT_UNRELIABLE_SOURCES),
+            seconds=spec.get('secondes', 0),
+            measures=spec.get('mesure'),
+            clock=spec.get('horloge')
+        )
+
+    def selects(self, filepath, metadata, timestamp):
+        """Indique si la règle concerne une photo (chemin, nom, période, source)."""
+        if self.path_pattern is not None and not self.path_pattern.match(filepath.replace('\\', '/')):
+            return False
+        if self.filename_pattern is not None and not self.filename_pattern.match(metadata.get('nom') or ''):
+            return False
+        if self.start is not None or self.end is not None:
+            if timestamp is None:
+                return False
+            if self.start is not None and timestamp < self.start:
+                return False
+            if self.end is not None and timestamp > self.end:
+                return False
+        if self.kind == 'nom_fichier':
+            source = metadata.get('source_date')
+            if source is None and metadata.get('date_creation'):
+                # Photo datée extraite avant l'enregistrement de la source :
+                # sa date peut venir des EXIF
+                return False
+            if source not in self.sources:
+                return False
+        return True
+
+    def shift(self, metadata, timestamp):
+        """
+        Secondes à ajouter à la date d'une photo pour 'decalage' et 'fuseau'.
+
+        Returns:
+            int: Décalage, ou None s'il ne peut pas être déterminé
+        """
+        if timestamp is None:
+            return None
+        if self.kind == 'decalage':
+            return drift_seconds(self.measures, timestamp) if self.measures else self.seconds
+
+        if metadata.get(OFFSET_SOURCE_FIELD) not in LOCATION_OFFSET_SOURCES:
+            return None
+        local = parse_offset(metadata.get(OFFSET_FIELD))
+        clock = parse_offset(self.clock)
+        if clock is None:
+            clock = zone_offset(self.clock, metadata['date_creation'], metadata['heure_creation'])
+        if local is None or clock is None:
+            return None
+        return (local - clock) * 60
+
+    def apply(self, metadata, timestamp):
+        """
+        Corrige la date d'une photo sélectionnée par selects.
+
+        Returns:
+            bool: True si la date a été modifiée
+        """
+        if self.kind in ('decalage', 'fuseau'):
+            seconds = self.shift(metadata, timestamp)
+            if not seconds:
+                return False
+            metadata['date_creation'], metadata['heure_creation'] = format_timestamp(
+                timestamp + seconds)
+            return True
+
+        found = match_filename_date(self.date_pattern, metadata.get('nom') or '')
+        if found is None:
+            return False
+        date_creation, heure_creation = found
+        if date_creation == metadata.get('date_creation') and (
+                heure_creation is None or heure_creation == metadata.get('heure_creation')):
+            return False
+        metadata['date_creation'] = date_creation
+        if heure_creation is not None:
+            metadata['heure_creation'] = heure_creation
+        metadata['source_date'] = 'nom_fichier'
+        return True
+
+
+class DateCorrector:
+    """Applique une liste de règles aux métadonnées, photo par photo."""
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules (list): Règles (DateRule), par ordre de priorité
+        """
+        self.rules = list(rules)
+        # Photos corrigées par chaque règle, et photos retenues par une
+        # règle sans pouvoir être corrigées (pas de date dans le nom,
+        # décalage UTC inconnu)
+        self.hits = Counter({rule.name: 0 for rule in self.rules})
+        self.unresolved = Counter()
+        self.total = 0
+
+    @classmethod
+    def from_file(cls, rules_file):
+        """
+        Lit les règles d'un fichier JSON (liste de descriptions de règles).
+
+        Raises:
+            ValueError: Si le fichier ou une règle est invalide
+        """
+        with open(rules_file, 'r', encoding='utf-8') as f:
+            specs = json.load(f)
+        if not isinstance(specs, list):
+            raise ValueError("Le fichier de regles doit contenir une liste de regles")
+        return cls(DateRule.from_dict(spec, index) for index, spec in enumerate(specs))
+
+    def correct(self, filepath, metadata):
+        """
+        Corrige la date d'une photo (les métadonnées sont modifiées sur place).
+
+        Returns:
+            str: Nom de la règle appliquée, ou None
+        """
+        self.total += 1
+        timestamp = capture_timestamp(metadata.get('date_creation'), metadata.get('heure_creation'))
+        for rule in self.rules:
+            if not rule.selects(filepath, metadata, timestamp):
+                continue
+            if rule.apply(metadata, timestamp):
+                self.hits[rule.name] += 1
+                return rule.name
+            self.unresolved[rule.name] += 1
+        return None
+
+    def apply(self, items):
+        """
+        Corrige les photos au fil d'un itérable, sans le charger en mémoire.
+
+        Args:
+            items: Itérable de couples (chemin, métadonnées), comme iter_metadata
+
+        Yields:
+            tuple: (chemin, métadonnées corrigées)
+        """
+        for filepath, metadata in items:
+            self.correct(filepath, metadata)
+            yield filepath, metadata
+
+    @property
+    def corrected(self):
+        """Nombre total de photos corrigées."""
+        return sum(self.hits.values())
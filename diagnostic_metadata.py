@@ -7,6 +7,7 @@ import sys
 import os
 from pathlib import Path
 from simple_metadata import SimplePhotoMetadata
+from photo_log import configure_logging
 import json
 
 
@@ -59,6 +60,9 @@ def test_single_photo(photo_path):
 
 def main():
     """Fonction principale."""
+    # Diagnostic : afficher aussi le détail de la lecture de chaque photo
+    configure_logging(verbose=True)
+    
     print("DIAGNOSTIC D'EXTRACTION DE MÉTADONNÉES")
     print("=" * 50)
     
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Sauvegarde complète des EXIF des photos JPEG dans un fichier annexe compact
+(metadata_simple.exif), pour les restaurer sans perte.
+
+Structure du fichier :
+- MAGIC (8 octets) ;
+- les structures EXIF (contenu TIFF du segment APP1), compressées avec
+  zlib ; une structure partagée par plusieurs photos n'est écrite qu'une
+  fois ;
+- l'index, en JSON compressé : position, taille et empreinte de chaque
+  structure, et pour chaque photo le numéro de sa structure, sa taille et
+  sa date de modification au moment de la sauvegarde ;
+- la position et la taille de l'index, suivies de MAGIC (FOOTER).
+
+Seul l'index est chargé à l'ouverture : chaque structure est lue et
+décompressée à la demande.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+
+
+MAGIC = b"MPEXIF01"
+
+# Position et taille de l'index, puis MAGIC
+FOOTER = struct.Struct("<QQ8s")
+
+# Extensions des photos dont les EXIF sont sauvegardés (restauration par
+# piexif.insert, qui ne gère que le JPEG)
+ARCHIVED_SUFFIXES = {'.jpg', '.jpeg'}
+
+COMPRESSION_LEVEL = 6
+
+
+class ExifArchiveError(Exception):
+    """Fichier de sauvegarde des EXIF illisible."""
+
+
+def _digest(block):
+    """Empreinte d'une structure EXIF, pour ne l'écrire qu'une fois."""
+    return hashlib.blake2b(block, digest_size=16).hexdigest()
+
+
+class ExifArchive:
+    """Lecture d'un fichier de sauvegarde des EXIF."""
+
+    def __init__(self, archive_path):
+        """
+        Args:
+            archive_path (str | Path): Fichier de sauvegarde
+
+        Raises:
+            ExifArchiveError: Si le fichier n'est pas une sauvegarde complète
+        """
+        self.archive_path = Path(archive_path)
+        self._file = open(self.archive_path, 'rb')
+        self._lock = threading.Lock()
+        try:
+            self._blocks, self._photos = self._read_index()
+        except BaseException:
+            self._file.close()
+            raise
+
+    def _read_index(self):
+        """Lit l'index placé à la fin du fichier."""
+        f = self._file
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ExifArchiveError(f"{self.archive_path.name} n'est pas une sauvegarde des EXIF")
+
+        size = f.seek(0, os.SEEK_END)
+        if size < len(MAGIC) + FOOTER.size:
+            raise ExifArchiveError(f"{self.archive_path.name} est incomplet")
+        f.seek(size - FOOTER.size)
+        offset, length, magic = FOOTER.unpack(f.read(FOOTER.size))
+        if magic != MAGIC or offset + length > size - FOOTER.size:
+            raise ExifArchiveError(f"{self.archive_path.name} est incomplet")
+
+        f.seek(offset)
+        try:
+            index = json.loads(zlib.decompress(f.read(length)))
+        except (zlib.error, ValueError) as e:
+            raise ExifArchiveError(f"Index illisible dans {self.archive_path.name}: {e}")
+        return index['structures'], index['photos']
+
+    def __len__(self):
+        return len(self._photos)
+
+    def __contains__(self, filepath):
+        return str(filepath) in self._photos
+
+    @property
+    def block_count(self):
+        """Nombre de structures différentes dans le fichier."""
+        return len(self._blocks)
+
+    def entry(self, filepath):
+        """
+        Entrée de l'index d'une photo.
+
+        Returns:
+            list: [numéro de structure, taille, date de modification (ns)],
+                ou None si la photo n'est pas sauvegardée
+        """
+        return self._photos.get(str(filepath))
+
+    def read_compressed(self, number):
+        """
+        Lit une structure sans la décompresser.
+
+        Returns:
+            tuple: (données compressées, empreinte)
+        """
+        offset, length, digest = self._blocks[number]
+        with self._lock:
+            self._file.seek(offset)
+            data = self._file.read(length)
+        if len(data) != length:
+            raise ExifArchiveError(f"Structure {number} tronquée dans {self.archive_path.name}")
+        return data, digest
+
+    def get(self, filepath, size=None, mtime_ns=None):
+        """
+        Structure EXIF sauvegardée d'une photo.
+
+        Args:
+            filepath (str): Chemin de la photo au moment de la sauvegarde
+            size (int): Taille attendue du fichier, ou None
+            mtime_ns (int): Date de modification attendue, ou None
+
+        Returns:
+            bytes: Structure TIFF, ou None si la photo n'est pas sauvegardée
+                ou si la sauvegarde correspond à une autre version du fichier
+        """
+        entry = self.entry(filepath)
+        if entry is None:
+            return None
+        number, saved_size, saved_mtime_ns = entry
+        if (size is not None and size != saved_size) or (
+                mtime_ns is not None and mtime_ns != saved_mtime_ns):
+            return None
+        data, _ = self.read_compressed(number)
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ExifArchiveError(f"Structure {number} illisible dans {self.archive_path.name}: {e}")
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ExifArchiveWriter:
+    """
+    Écriture d'un fichier de sauvegarde des EXIF.
+
+    Le fichier est écrit à côté sous un nom temporaire et ne remplace la
+    sauvegarde existante qu'une fois complet (close) ; abort l'abandonne.
+    """
+
+    def __init__(self, archive_path, previous=None):
+        """
+        Args:
+            archive_path (str | Path): Fichier de sauvegarde
+            previous (ExifArchive): Sauvegarde précédente, dont les
+                structures des photos inchangées sont recopiées telles quelles
+        """
+        self.archive_path = Path(archive_path)
+        self.temp_path = self.archive_path.with_name(self.archive_path.name + '.tmp')
+        self.previous = previous
+        self._file = open(self.temp_path, 'wb')
+        self._file.write(MAGIC)
+        self._position = len(MAGIC)
+        # Structures écrites : [position, taille, empreinte]
+        self._blocks = []
+        self._numbers = {}
+        self._photos = {}
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def _write_block(self, data, digest):
+        """Écrit une structure compressée si elle n'est pas déjà dans le fichier."""
+        number = self._numbers.get(digest)
+        if number is None:
+            number = len(self._blocks)
+            self._file.write(data)
+            self._blocks.append([self._position, len(data), digest])
+            self._numbers[digest] = number
+            self._position += len(data)
+        return number
+
+    def add(self, filepath, block, stat_info):
+        """
+        Ajoute la structure EXIF d'une photo.
+
+        Args:
+            filepath (str | Path): Chemin de la photo
+            block (bytes): Structure TIFF du segment APP1
+            stat_info (os.stat_result): Informations du fichier
+        """
+        digest = _digest(block)
+        # Une structure déjà écrite n'est pas recompressée
+        compressed = None if digest in self._numbers else zlib.compress(block, COMPRESSION_LEVEL)
+        with self._lock:
+            number = self._write_block(compressed, digest)
+            self._photos[str(filepath)] = [number, stat_info.st_size, stat_info.st_mtime_ns]
+
+    def copy(self, filepath, stat_info):
+        """
+        Recopie la structure d'une photo inchangée depuis la sauvegarde précédente.
+
+        Returns:
+            bool: True si la photo y était, pour la même version du fichier
+        """
+        if self.previous is None:
+            return False
+        entry = self.previous.entry(filepath)
+        if entry is None or entry[1:] != [stat_info.st_size, stat_info.st_mtime_ns]:
+            return False
+        data, digest = self.previous.read_compressed(entry[0])
+        with self._lock:
+            number = self._write_block(data, digest)
+            self._photos[str(filepath)] = [number, stat_info.st_size, stat_info.st_mtime_ns]
+        return True
+
+    def __len__(self):
+        return len(self._photos)
+
+    @property
+    def block_count(self):
+        """Nombre de structures différentes écrites."""
+        return len(self._blocks)
+
+    @property
+    def size(self):
+        """Taille du fichier écrit jusqu'ici."""
+        return self._position
+
+    def close(self):
+        """Écrit l'index et remplace la sauvegarde existante."""
+        index = zlib.compress(json.dumps(
+            {'structures': self._blocks, 'photos': self._photos},
+            ensure_ascii=False, separators=(',', ':')
+        ).encode('utf-8'), COMPRESSION_LEVEL)
+        self._file.write(index)
+        self._file.write(FOOTER.pack(self._position, len(index), MAGIC))
+        self._position += len(index) + FOOTER.size
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._close_previous()
+        os.replace(self.temp_path, self.archive_path)
+        self.closed = True
+
+    def abort(self):
+        """Abandonne l'écriture : la sauvegarde existante est conservée."""
+        self._file.close()
+        self._close_previous()
+        try:
+            self.temp_path.unlink()
+        except OSError:
+            pass
+        self.closed = True
+
+    def _close_previous(self):
+        if self.previous is not None:
+            self.previous.close()
+            self.previous = None
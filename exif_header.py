@@ -0,0 +1,731 @@
+#!/usr/bin/env python3
+"""
+Lecture rapide des EXIF utiles sans charger l'image complète.
+
+Seul l'en-tête du fichier est lu : le segment APP1 pour un JPEG, les IFD
+pour un TIFF, la boîte 'meta' et l'élément Exif pour un HEIC. La lecture
+s'arrête avant les données d'image (marqueur SOS, boîte 'mdat') et seules
+les balises utilisées par SimplePhotoMetadata sont décodées.
+Le résultat a la même forme que piexif.load() pour que le reste du code
+n'ait pas à faire la différence.
+"""
+
+import io
+import struct
+
+
+# Balises décodées, par IFD (mêmes numéros que piexif)
+IMAGE_DATETIME = 0x0132
+EXIF_IFD_POINTER = 0x8769
+GPS_IFD_POINTER = 0x8825
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_DATETIME_DIGITIZED = 0x9004
+EXIF_OFFSET_TIME = 0x9010
+EXIF_OFFSET_TIME_ORIGINAL = 0x9011
+EXIF_OFFSET_TIME_DIGITIZED = 0x9012
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+
+WANTED_TAGS = {
+    "0th": {IMAGE_DATETIME},
+    "Exif": {EXIF_DATETIME_ORIGINAL, EXIF_DATETIME_DIGITIZED, EXIF_OFFSET_TIME,
+             EXIF_OFFSET_TIME_ORIGINAL, EXIF_OFFSET_TIME_DIGITIZED},
+    "GPS": {GPS_LATITUDE_REF, GPS_LATITUDE, GPS_LONGITUDE_REF, GPS_LONGITUDE},
+}
+
+# Taille en octets de chaque type TIFF
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+# Un IFD raisonnable ne dépasse pas quelques centaines d'entrées
+MAX_IFD_ENTRIES = 1024
+
+JPEG_SOI = b"\xff\xd8"
+EXIF_HEADER = b"Exif\x00\x00"
+
+# Début d'un TIFF lu d'un bloc par read_exif_block
+TIFF_PREFIX_SIZE = 16 * 1024
+
+# Marques de format HEIF (boîte 'ftyp') reconnues
+HEIF_BRANDS = {b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1", b"avif"}
+
+# Tailles maximales acceptées pour la boîte 'meta' et pour l'élément Exif
+MAX_HEIF_META_SIZE = 4 * 1024 * 1024
+MAX_HEIF_EXIF_SIZE = 1024 * 1024
+
+
+class ExifHeaderError(Exception):
+    """Structure non gérée par la lecture rapide (utiliser piexif à la place)."""
+
+
+class _FileSource:
+    """Lecture positionnée dans un fichier ouvert, avec compteur d'octets."""
+
+    def __init__(self, file_obj, base_offset=0):
+        self.file_obj = file_obj
+        self.base_offset = base_offset
+        self.bytes_read = 0
+
+    def read_at(self, offset, size):
+        self.file_obj.seek(self.base_offset + offset)
+        data = self.file_obj.read(size)
+        self.bytes_read += len(data)
+        if len(data) != size:
+            raise ExifHeaderError("Lecture hors du fichier")
+        return data
+
+
+class _BytesSource:
+    """Lecture positionnée dans un segment déjà en mémoire."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def read_at(self, offset, size):
+        if offset < 0 or offset + size > len(self.data):
+            raise ExifHeaderError("Pointeur hors du segment EXIF")
+        return self.data[offset:offset + size]
+
+
+def _empty_exif():
+    """Structure vide, identique à celle de piexif pour une image sans EXIF."""
+    return {"0th": {}, "Exif": {}, "GPS": {}}
+
+
+def _decode_value(source, endian, value_type, count, value_field):
+    """Décode la valeur d'une entrée d'IFD."""
+    if value_type not in TYPE_SIZES:
+        raise ExifHeaderError(f"Type TIFF inconnu: {value_type}")
+
+    size = TYPE_SIZES[value_type] * count
+    if size <= 4:
+        raw = value_field[:size]
+    else:
+        offset = struct.unpack(endian + "L", value_field)[0]
+        raw = source.read_at(offset, size)
+
+    if value_type == 2:
+        # ASCII : piexif retire le caractère nul final
+        return raw[:-1] if raw.endswith(b"\x00") else raw
+    if value_type in (5, 10):
+        fmt = "L" if value_type == 5 else "l"
+        numbers = struct.unpack(endian + fmt * (2 * count), raw)
+        pairs = tuple(zip(numbers[0::2], numbers[1::2]))
+        return pairs[0] if count == 1 else pairs
+    if value_type in (3, 4, 9):
+        fmt = {3: "H", 4: "L", 9: "l"}[value_type]
+        values = struct.unpack(endian + fmt * count, raw)
+        return values[0] if count == 1 else values
+    return raw
+
+
+def _read_ifd(source, endian, offset, wanted):
+    """
+    Lit un IFD et décode uniquement les balises demandées.
+
+    Returns:
+        dict: Balise -> valeur
+    """
+    count = struct.unpack(endian + "H", source.read_at(offset, 2))[0]
+    if count > MAX_IFD_ENTRIES:
+        raise ExifHeaderError(f"IFD trop grand: {count} entrées")
+
+    entries = source.read_at(offset + 2, 12 * count)
+    values = {}
+    for i in range(count):
+        entry = entries[12 * i:12 * i + 12]
+        tag, value_type, value_count = struct.unpack(endian + "HHL", entry[:8])
+        if tag in wanted:
+            values[tag] = _decode_value(source, endian, value_type, value_count, entry[8:])
+    return values
+
+
+def _parse_tiff(source):
+    """
+    Parcourt la structure TIFF (IFD0, IFD Exif, IFD GPS).
+
+    Args:
+        source: Objet fournissant read_at(offset, size), offsets relatifs
+            au début de l'en-tête TIFF
+
+    Returns:
+        dict: Métadonnées au format piexif ("0th", "Exif", "GPS")
+    """
+    header = source.read_at(0, 8)
+    if header[:2] == b"II":
+        endian = "<"
+    elif header[:2] == b"MM":
+        endian = ">"
+    else:
+        raise ExifHeaderError("Ordre des octets TIFF inconnu")
+
+    magic, ifd0_offset = struct.unpack(endian + "HL", header[2:])
+    if magic != 42:
+        raise ExifHeaderError("En-tête TIFF invalide")
+
+    exif_dict = _empty_exif()
+    ifd0 = _read_ifd(
+        source, endian, ifd0_offset,
+        WANTED_TAGS["0th"] | {EXIF_IFD_POINTER, GPS_IFD_POINTER}
+    )
+
+    exif_pointer = ifd0.pop(EXIF_IFD_POINTER, None)
+    gps_pointer = ifd0.pop(GPS_IFD_POINTER, None)
+    exif_dict["0th"] = ifd0
+
+    if exif_pointer:
+        exif_dict["Exif"] = _read_ifd(source, endian, exif_pointer, WANTED_TAGS["Exif"])
+    if gps_pointer:
+        exif_dict["GPS"] = _read_ifd(source, endian, gps_pointer, WANTED_TAGS["GPS"])
+
+    return exif_dict
+
+
+def _read_jpeg_exif_segment(file_obj):
+    """
+    Parcourt les marqueurs JPEG jusqu'au segment APP1 Exif.
+
+    Les autres segments sont sautés sans être lus et le parcours s'arrête
+    au marqueur SOS (début des données compressées).
+
+    Returns:
+        tuple: (segment TIFF ou None, octets lus)
+    """
+    segment, _, bytes_read = _find_jpeg_exif_segment(file_obj)
+    return segment, bytes_read
+
+
+def _find_jpeg_exif_segment(file_obj):
+    """
+    Comme _read_jpeg_exif_segment, en donnant aussi la position du segment.
+
+    Returns:
+        tuple: (segment TIFF ou None, position de son début dans le fichier
+            ou None, octets lus)
+    """
+    bytes_read = 0
+    position = 2
+
+    while True:
+        file_obj.seek(position)
+        marker = file_obj.read(4)
+        bytes_read += len(marker)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            raise ExifHeaderError("Structure JPEG inattendue")
+
+        marker_type = marker[1]
+        if marker_type == 0xFF:
+            # Octet de remplissage
+            position += 1
+            continue
+        if marker_type in (0xDA, 0xD9):
+            # Début des données d'image ou fin du fichier : pas d'EXIF
+            return None, None, bytes_read
+        if 0xD0 <= marker_type <= 0xD7 or marker_type == 0x01:
+            position += 2
+            continue
+
+        length = struct.unpack(">H", marker[2:])[0]
+        if length < 2:
+            raise ExifHeaderError("Longueur de segment JPEG invalide")
+
+        if marker_type == 0xE1:
+            segment = file_obj.read(length - 2)
+            bytes_read += len(segment)
+            if len(segment) != length - 2:
+                raise ExifHeaderError("Segment APP1 tronqué")
+            if segment.startswith(EXIF_HEADER):
+                return segment[len(EXIF_HEADER):], position + 4 + len(EXIF_HEADER), bytes_read
+
+        position += 2 + length
+
+
+def _is_heif(start):
+    """Indique si les premiers octets sont ceux d'un fichier HEIF (HEIC)."""
+    return len(start) >= 12 and start[4:8] == b"ftyp" and start[8:12] in HEIF_BRANDS
+
+
+def _read_box_header(file_obj, position):
+    """
+    Lit l'en-tête d'une boîte ISOBMFF de premier niveau.
+
+    Returns:
+        tuple: (type, taille totale ou None si la boîte va jusqu'à la fin
+            du fichier, taille de l'en-tête), ou None en fin de fichier
+    """
+    file_obj.seek(position)
+    header = file_obj.read(8)
+    if len(header) < 8:
+        return None
+    size, box_type = struct.unpack(">L4s", header)
+    header_size = 8
+    if size == 1:
+        large = file_obj.read(8)
+        if len(large) < 8:
+            raise ExifHeaderError("Boîte HEIF tronquée")
+        size = struct.unpack(">Q", large)[0]
+        header_size = 16
+    elif size == 0:
+        size = None
+    if size is not None and size < header_size:
+        raise ExifHeaderError("Taille de boîte HEIF invalide")
+    return box_type, size, header_size
+
+
+def _iter_boxes(data, start, end):
+    """
+    Parcourt les boîtes contenues dans un bloc déjà en mémoire.
+
+    Yields:
+        tuple: (type, début du contenu, fin de la boîte)
+    """
+    position = start
+    while position + 8 <= end:
+        size, box_type = struct.unpack(">L4s", data[position:position + 8])
+        header_size = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[position + 8:position + 16])[0]
+            header_size = 16
+        elif size == 0:
+            size = end - position
+        if size < header_size or position + size > end:
+            raise ExifHeaderError("Boîte HEIF invalide")
+        yield box_type, position + header_size, position + size
+        position += size
+    if position != end:
+        # Reste de moins de 8 octets : boîte coupée
+        raise ExifHeaderError("Boîte HEIF tronquée")
+
+
+def _read_uint(data, offset, size):
+    """Lit un entier big-endian de 0, 4 ou 8 octets ; renvoie (valeur, offset suivant)."""
+    if size == 0:
+        return 0, offset
+    if size == 4:
+        return struct.unpack(">L", data[offset:offset + 4])[0], offset + 4
+    if size == 8:
+        return struct.unpack(">Q", data[offset:offset + 8])[0], offset + 8
+    raise ExifHeaderError(f"Taille d'entier iloc non gérée: {size}")
+
+
+def _find_heif_exif_item(meta, start, end):
+    """
+    Cherche l'élément Exif dans le contenu de la boîte 'meta'.
+
+    L'élément est déclaré dans 'iinf' (boîtes 'infe' de type Exif) et
+    localisé par 'iloc', dans le fichier ou dans la boîte 'idat'.
+
+    Returns:
+        tuple: (méthode de construction, liste de (offset, longueur), début
+            du contenu de 'idat' ou None), ou None sans élément Exif
+    """
+    exif_item_id = None
+    iloc = None
+    idat_start = None
+
+    for box_type, content_start, box_end in _iter_boxes(meta, start, end):
+        if box_type == b"iinf":
+            if content_start == box_end:
+                raise ExifHeaderError("Boîte 'iinf' tronquée")
+            # FullBox, puis nombre d'entrées sur 2 octets (version 0) ou 4
+            offset = content_start + 4 + (2 if meta[content_start] == 0 else 4)
+            for infe_type, infe_start, infe_end in _iter_boxes(meta, offset, box_end):
+                if infe_type != b"infe" or infe_start == infe_end or meta[infe_start] < 2:
+                    continue
+                infe_version = meta[infe_start]
+                if infe_version == 2:
+                    item_id = struct.unpack(">H", meta[infe_start + 4:infe_start + 6])[0]
+                    item_type = meta[infe_start + 8:infe_start + 12]
+                else:
+                    item_id = struct.unpack(">L", meta[infe_start + 4:infe_start + 8])[0]
+                    item_type = meta[infe_start + 10:infe_start + 14]
+                if item_type == b"Exif":
+                    exif_item_id = item_id
+                    break
+        elif box_type == b"iloc":
+            iloc = (content_start, box_end)
+        elif box_type == b"idat":
+            idat_start = content_start
+
+    if exif_item_id is None:
+        return None
+    if iloc is None:
+        raise ExifHeaderError("Boîte 'iloc' absente")
+
+    offset, iloc_end = iloc
+    # FullBox, tailles des champs puis nombre d'éléments
+    if iloc_end - offset < 8:
+        raise ExifHeaderError("Boîte 'iloc' tronquée")
+    version = meta[offset]
+    offset += 4
+    offset_size = meta[offset] >> 4
+    length_size = meta[offset] & 0x0F
+    base_offset_size = meta[offset + 1] >> 4
+    index_size = meta[offset + 1] & 0x0F if version in (1, 2) else 0
+    offset += 2
+    id_format, id_size = (">H", 2) if version < 2 else (">L", 4)
+    item_count = struct.unpack(id_format, meta[offset:offset + id_size])[0]
+    offset += id_size
+
+    for _ in range(item_count):
+        item_id = struct.unpack(id_format, meta[offset:offset + id_size])[0]
+        offset += id_size
+        construction_method = 0
+        if version in (1, 2):
+            construction_method = struct.unpack(">H", meta[offset:offset + 2])[0] & 0x0F
+            offset += 2
+        offset += 2  # data_reference_index
+        base_offset, offset = _read_uint(meta, offset, base_offset_size)
+        extent_count = struct.unpack(">H", meta[offset:offset + 2])[0]
+        offset += 2
+
+        extents = []
+        for _ in range(extent_count):
+            _, offset = _read_uint(meta, offset, index_size)
+            extent_offset, offset = _read_uint(meta, offset, offset_size)
+            extent_length, offset = _read_uint(meta, offset, length_size)
+            extents.append((base_offset + extent_offset, extent_length))
+        if offset > iloc_end:
+            raise ExifHeaderError("Boîte 'iloc' tronquée")
+
+        if item_id == exif_item_id:
+            if construction_method not in (0, 1):
+                raise ExifHeaderError(
+                    f"Méthode de construction iloc non gérée: {construction_method}"
+                )
+            return construction_method, extents, idat_start
+
+    raise ExifHeaderError("Élément Exif absent de 'iloc'")
+
+
+def _read_heif_exif(file_obj):
+    """
+    Localise et lit l'élément Exif d'un fichier HEIF sans décoder l'image.
+
+    Les boîtes de premier niveau sont sautées jusqu'à 'meta', dont le
+    contenu donne la position de l'élément Exif ; seuls ces octets sont
+    lus, jamais les données d'image ('mdat').
+
+    Returns:
+        tuple: (structure TIFF ou None, octets lus)
+    """
+    bytes_read = 0
+    position = 0
+    meta = None
+
+    while meta is None:
+        header = _read_box_header(file_obj, position)
+        if header is None:
+            return None, bytes_read
+        box_type, size, header_size = header
+        bytes_read += header_size
+        if box_type == b"meta":
+            if size is None or size > MAX_HEIF_META_SIZE:
+                raise ExifHeaderError("Boîte 'meta' trop grande")
+            meta = file_obj.read(size - header_size)
+            bytes_read += len(meta)
+            if len(meta) != size - header_size:
+                raise ExifHeaderError("Boîte 'meta' tronquée")
+        elif size is None:
+            return None, bytes_read
+        else:
+            position += size
+
+    # 'meta' est une FullBox : version et drapeaux avant les boîtes filles
+    location = _find_heif_exif_item(meta, 4, len(meta))
+    if location is None:
+        return None, bytes_read
+    construction_method, extents, idat_start = location
+
+    if sum(length for _, length in extents) > MAX_HEIF_EXIF_SIZE:
+        raise ExifHeaderError("Élément Exif trop grand")
+
+    chunks = []
+    for extent_offset, extent_length in extents:
+        if construction_method == 1:
+            if idat_start is None:
+                raise ExifHeaderError("Boîte 'idat' absente")
+            # Offsets relatifs au contenu de 'idat', déjà en mémoire
+            start = idat_start + extent_offset
+            chunk = meta[start:start + extent_length]
+        else:
+            file_obj.seek(extent_offset)
+            chunk = file_obj.read(extent_length)
+            bytes_read += len(chunk)
+        if len(chunk) != extent_length:
+            raise ExifHeaderError("Élément Exif tronqué")
+        chunks.append(chunk)
+
+    return strip_heif_exif_prefix(b"".join(chunks)), bytes_read
+
+
+def strip_heif_exif_prefix(data):
+    """
+    Retire l'en-tête d'un élément Exif HEIF pour ne garder que la structure TIFF.
+
+    L'élément commence par la position (4 octets) de l'en-tête TIFF, qui
+    suit en général la marque Exif et deux octets nuls.
+
+    Args:
+        data (bytes): Contenu de l'élément Exif
+
+    Returns:
+        bytes: Structure TIFF
+
+    Raises:
+        ExifHeaderError: Si l'en-tête TIFF est introuvable
+    """
+    if len(data) < 4:
+        raise ExifHeaderError("Élément Exif HEIF trop court")
+    tiff_offset = struct.unpack(">L", data[:4])[0]
+    tiff = data[4 + tiff_offset:]
+    if tiff[:2] not in (b"II", b"MM"):
+        # Position absente ou erronée : chercher la marque Exif
+        position = data.find(EXIF_HEADER)
+        if position < 0:
+            raise ExifHeaderError("En-tête TIFF introuvable dans l'élément Exif")
+        tiff = data[position + len(EXIF_HEADER):]
+    return tiff
+
+
+def read_exif_block(image_path, tiff_prefix_size=TIFF_PREFIX_SIZE):
+    """
+    Lit les octets de la structure EXIF sans les analyser.
+
+    Pour un JPEG, c'est le segment APP1 ; pour un TIFF, le début du fichier,
+    où se trouvent en général les IFD ; pour un HEIC, l'élément Exif. L'analyse est faite ensuite par
+    parse_exif_block, éventuellement dans un autre thread.
+
+    Args:
+        image_path (Path): Chemin vers l'image (JPEG, TIFF ou HEIC)
+        tiff_prefix_size (int): Nombre d'octets lus au début d'un TIFF
+
+    Returns:
+        tuple: (structure TIFF, b"" si l'image n'a pas d'EXIF ; octets lus)
+
+    Raises:
+        ExifHeaderError: Si la structure du fichier n'est pas gérée
+    """
+    with open(image_path, "rb", buffering=0) as f:
+        start = f.read(4)
+        if start[:2] == JPEG_SOI:
+            try:
+                segment, bytes_read = _read_jpeg_exif_segment(f)
+            except struct.error as e:
+                raise ExifHeaderError(str(e))
+            return segment or b"", bytes_read + len(start)
+
+        if start in (b"II*\x00", b"MM\x00*"):
+            block = start + f.read(tiff_prefix_size - len(start))
+            return block, len(block)
+
+        start += f.read(8)
+        if _is_heif(start):
+            try:
+                block, bytes_read = _read_heif_exif(f)
+            except struct.error as e:
+                raise ExifHeaderError(str(e))
+            return block or b"", bytes_read + len(start)
+
+    raise ExifHeaderError("Format non reconnu par la lecture rapide")
+
+
+def locate_jpeg_exif(image_path):
+    """
+    Lit le segment APP1 Exif d'un JPEG et sa position dans le fichier.
+
+    Args:
+        image_path (Path): Chemin vers le JPEG
+
+    Returns:
+        tuple: (structure TIFF ou None si l'image n'a pas d'EXIF, position
+            de la structure dans le fichier ou None, octets lus)
+
+    Raises:
+        ExifHeaderError: Si le fichier n'est pas un JPEG lisible
+    """
+    with open(image_path, "rb", buffering=0) as f:
+        if f.read(2) != JPEG_SOI:
+            raise ExifHeaderError("Pas un fichier JPEG")
+        try:
+            block, position, bytes_read = _find_jpeg_exif_segment(f)
+        except struct.error as e:
+            raise ExifHeaderError(str(e))
+    return block, position, bytes_read + 2
+
+
+def jpeg_exif_block(data):
+    """
+    Extrait la structure EXIF d'un JPEG déjà chargé en mémoire.
+
+    Args:
+        data (bytes): Contenu du fichier JPEG
+
+    Returns:
+        bytes: Structure TIFF du segment APP1, b"" si l'image n'a pas d'EXIF
+
+    Raises:
+        ExifHeaderError: Si les données ne sont pas celles d'un JPEG lisible
+    """
+    if data[:2] != JPEG_SOI:
+        raise ExifHeaderError("Pas un fichier JPEG")
+    try:
+        segment, _ = _read_jpeg_exif_segment(io.BytesIO(data))
+    except struct.error as e:
+        raise ExifHeaderError(str(e))
+    return segment or b""
+
+
+def parse_exif_block(block):
+    """
+    Analyse une structure lue par read_exif_block.
+
+    Args:
+        block (bytes): Structure TIFF (b"" pour une image sans EXIF)
+
+    Returns:
+        dict: Métadonnées au format piexif
+
+    Raises:
+        ExifHeaderError: Si la structure est invalide ou dépasse le bloc lu
+            (IFD placé loin dans un gros TIFF : relire avec read_exif_header)
+    """
+    if not block:
+        return _empty_exif()
+    try:
+        return _parse_tiff(_BytesSource(block))
+    except struct.error as e:
+        raise ExifHeaderError(str(e))
+
+
+def read_exif_header(image_path):
+    """
+    Lit les balises date et GPS en ne lisant que l'en-tête de l'image.
+
+    Args:
+        image_path (Path): Chemin vers l'image (JPEG, TIFF ou HEIC)
+
+    Returns:
+        tuple: (métadonnées au format piexif, nombre d'octets lus)
+
+    Raises:
+        ExifHeaderError: Si la structure du fichier n'est pas gérée
+    """
+    with open(image_path, "rb", buffering=0) as f:
+        start = f.read(4)
+        try:
+            if start[:2] == JPEG_SOI:
+                segment, bytes_read = _read_jpeg_exif_segment(f)
+                bytes_read += len(start)
+                if segment is None:
+                    return _empty_exif(), bytes_read
+                return _parse_tiff(_BytesSource(segment)), bytes_read
+
+            if start in (b"II*\x00", b"MM\x00*"):
+                source = _FileSource(f)
+                exif_dict = _parse_tiff(source)
+                return exif_dict, len(start) + source.bytes_read
+
+            start += f.read(8)
+            if _is_heif(start):
+                tiff, bytes_read = _read_heif_exif(f)
+                bytes_read += len(start)
+                if tiff is None:
+                    return _empty_exif(), bytes_read
+                return _parse_tiff(_BytesSource(tiff)), bytes_read
+        except struct.error as e:
+            raise ExifHeaderError(str(e))
+
+    raise ExifHeaderError("Format non reconnu par la lecture rapide")
+
+
+def _jpeg_scan_start(file_obj):
+    """
+    Parcourt les marqueurs JPEG jusqu'au marqueur SOS.
+
+    Returns:
+        tuple: (position du marqueur SOS ou None s'il est absent, octets lus)
+    """
+    bytes_read = 0
+    position = 2
+
+    while True:
+        file_obj.seek(position)
+        marker = file_obj.read(4)
+        bytes_read += len(marker)
+        if len(marker) < 4 or marker[0] != 0xFF:
+            raise ExifHeaderError("Structure JPEG inattendue")
+
+        marker_type = marker[1]
+        if marker_type == 0xFF:
+            position += 1
+            continue
+        if marker_type == 0xDA:
+            return position, bytes_read
+        if marker_type == 0xD9:
+            return None, bytes_read
+        if 0xD0 <= marker_type <= 0xD7 or marker_type == 0x01:
+            position += 2
+            continue
+
+        length = struct.unpack(">H", marker[2:])[0]
+        if length < 2:
+            raise ExifHeaderError("Longueur de segment JPEG invalide")
+        position += 2 + length
+
+
+def _heif_mdat_range(file_obj):
+    """
+    Cherche la boîte 'mdat' (données d'image) d'un fichier HEIF.
+
+    Returns:
+        tuple: (début du contenu, fin ou None jusqu'à la fin du fichier,
+            octets lus), ou None si la boîte est absente
+    """
+    bytes_read = 0
+    position = 0
+    while True:
+        header = _read_box_header(file_obj, position)
+        if header is None:
+            return None
+        box_type, size, header_size = header
+        bytes_read += header_size
+        if box_type == b"mdat":
+            return position + header_size, (position + size if size is not None else None), bytes_read
+        if size is None:
+            return None
+        position += size
+
+
+def image_data_range(file_obj):
+    """
+    Délimite les données d'image d'un fichier, sans ses métadonnées.
+
+    Pour un JPEG, ce sont les données compressées à partir du marqueur SOS ;
+    pour un HEIC, le contenu de la boîte 'mdat'. Une modification des EXIF
+    ne les change pas, seulement leur position. Pour un TIFF ou un format
+    non reconnu, c'est le fichier entier.
+
+    Args:
+        file_obj: Fichier ouvert en lecture binaire
+
+    Returns:
+        tuple: (début, fin, octets lus)
+    """
+    file_size = file_obj.seek(0, 2)
+    file_obj.seek(0)
+    start = file_obj.read(12)
+    try:
+        if start[:2] == JPEG_SOI:
+            scan_start, bytes_read = _jpeg_scan_start(file_obj)
+            if scan_start is not None:
+                return scan_start, file_size, bytes_read + len(start)
+        elif _is_heif(start):
+            mdat = _heif_mdat_range(file_obj)
+            if mdat is not None:
+                data_start, data_end, bytes_read = mdat
+                return data_start, min(data_end or file_size, file_size), bytes_read + len(start)
+    except (struct.error, ExifHeaderError):
+        pass
+    return 0, file_size, len(start)
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Modification sur place des valeurs de balises EXIF, sans reconstruire la
+structure.
+
+Une balise déjà présente dont la nouvelle valeur tient à la place de
+l'ancienne (même type, même nombre de valeurs, ou texte pas plus long)
+est réécrite octet pour octet : la taille du segment APP1 ne change pas et
+seuls quelques octets du fichier sont écrits. Si une balise manque ou que
+sa valeur ne tient pas, plan_tag_patches renvoie None et la photo doit être
+réécrite entièrement (piexif.insert).
+"""
+
+import os
+import struct
+
+from exif_header import (
+    EXIF_IFD_POINTER,
+    GPS_IFD_POINTER,
+    MAX_IFD_ENTRIES,
+    TYPE_SIZES,
+    ExifHeaderError,
+)
+
+
+def _ifd_entries(tiff, endian, offset):
+    """
+    Parcourt les entrées d'un IFD.
+
+    Yields:
+        tuple: (balise, type, nombre de valeurs, position de la valeur)
+    """
+    if offset + 2 > len(tiff):
+        raise ExifHeaderError("Pointeur d'IFD hors du segment EXIF")
+    count = struct.unpack_from(endian + "H", tiff, offset)[0]
+    if count > MAX_IFD_ENTRIES or offset + 2 + 12 * count > len(tiff):
+        raise ExifHeaderError("IFD invalide")
+
+    for i in range(count):
+        entry = offset + 2 + 12 * i
+        tag, value_type, value_count = struct.unpack_from(endian + "HHL", tiff, entry)
+        size = TYPE_SIZES.get(value_type, 0) * value_count
+        if size <= 4:
+            value_offset = entry + 8
+        else:
+            value_offset = struct.unpack_from(endian + "L", tiff, entry + 8)[0]
+        yield tag, value_type, value_count, value_offset
+
+
+def tag_locations(tiff):
+    """
+    Position des valeurs des balises des IFD 0th, Exif et GPS.
+
+    Args:
+        tiff (bytes): Structure TIFF du segment APP1
+
+    Returns:
+        tuple: (ordre des octets, {IFD: {balise: (type, nombre, position)}})
+
+    Raises:
+        ExifHeaderError: Si la structure est invalide
+    """
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        raise ExifHeaderError("Ordre des octets TIFF inconnu")
+    if len(tiff) < 8 or struct.unpack_from(endian + "H", tiff, 2)[0] != 42:
+        raise ExifHeaderError("En-tête TIFF invalide")
+
+    locations = {"0th": {}, "Exif": {}, "GPS": {}}
+    pointers = {}
+    ifd0_offset = struct.unpack_from(endian + "L", tiff, 4)[0]
+    for tag, value_type, value_count, value_offset in _ifd_entries(tiff, endian, ifd0_offset):
+        if tag == EXIF_IFD_POINTER:
+            pointers["Exif"] = struct.unpack_from(endian + "L", tiff, value_offset)[0]
+        elif tag == GPS_IFD_POINTER:
+            pointers["GPS"] = struct.unpack_from(endian + "L", tiff, value_offset)[0]
+        locations["0th"][tag] = (value_type, value_count, value_offset)
+
+    for ifd, offset in pointers.items():
+        for tag, value_type, value_count, value_offset in _ifd_entries(tiff, endian, offset):
+            locations[ifd][tag] = (value_type, value_count, value_offset)
+    return endian, locations
+
+
+def _encode_value(endian, value_type, value_count, value):
+    """
+    Encode une valeur au format piexif pour la place d'une balise existante.
+
+    Returns:
+        bytes: Octets de la valeur, exactement à la taille de l'ancienne,
+            ou None si elle n'y tient pas
+    """
+    if value_type == 2:
+        # ASCII : le texte et son caractère nul, complétés par des nuls
+        raw = value + b"\x00"
+        if len(raw) > value_count:
+            return None
+        return raw.ljust(value_count, b"\x00")
+    if value_type == 5:
+        pairs = (value,) if isinstance(value[0], int) else value
+        if len(pairs) != value_count:
+            return None
+        numbers = [number for pair in pairs for number in pair]
+        return struct.pack(endian + "L" * len(numbers), *numbers)
+    return None
+
+
+def plan_tag_patches(tiff, values):
+    """
+    Prépare la réécriture sur place de valeurs de balises.
+
+    Args:
+        tiff (bytes): Structure TIFF du segment APP1
+        values (dict): Nouvelles valeurs au format piexif
+            ({"0th": {balise: valeur}, "Exif": {...}, "GPS": {...}}) ;
+            seuls les textes ASCII et les rationnels sont gérés
+
+    Returns:
+        list: (position dans la structure, octets) des valeurs qui changent,
+            ou None si une balise manque ou que sa valeur ne tient pas
+
+    Raises:
+        ExifHeaderError: Si la structure est invalide
+    """
+    endian, locations = tag_locations(tiff)
+    patches = []
+    for ifd, tags in values.items():
+        for tag, value in tags.items():
+            location = locations.get(ifd, {}).get(tag)
+            if location is None:
+                return None
+            value_type, value_count, value_offset = location
+            raw = _encode_value(endian, value_type, value_count, value)
+            if raw is None or value_offset + len(raw) > len(tiff):
+                return None
+            if tiff[value_offset:value_offset + len(raw)] != raw:
+                patches.append((value_offset, raw))
+    return patches
+
+
+def apply_patches(data, patches):
+    """
+    Applique des modifications à une copie des octets.
+
+    Returns:
+        bytes: Octets modifiés
+    """
+    patched = bytearray(data)
+    for offset, raw in patches:
+        patched[offset:offset + len(raw)] = raw
+    return bytes(patched)
+
+
+def diff_patches(old, new):
+    """
+    Plus petite modification transformant `old` en `new`, de même taille.
+
+    Returns:
+        list: [(position, octets)], vide si les deux sont identiques
+    """
+    if len(old) != len(new):
+        raise ValueError("Structures de tailles differentes")
+    if old == new:
+        return []
+    start = next(i for i in range(len(old)) if old[i] != new[i])
+    end = len(old)
+    while old[end - 1] == new[end - 1]:
+        end -= 1
+    return [(start, new[start:end])]
+
+
+def write_patches(image_path, base_offset, patches):
+    """
+    Écrit des modifications dans un fichier, sans changer sa taille.
+
+    Les octets écrits sont forcés sur le disque avant le retour. L'écriture
+    n'est pas atomique, mais la structure du JPEG (longueurs, positions)
+    reste toujours intacte.
+
+    Args:
+        image_path (Path): Fichier à modifier
+        base_offset (int): Position dans le fichier de l'origine des patches
+        patches (list): (position, octets), comme plan_tag_patches
+
+    Returns:
+        int: Nombre d'octets écrits
+    """
+    written = 0
+    with open(image_path, "r+b", buffering=0) as f:
+        for offset, raw in patches:
+            f.seek(base_offset + offset)
+            f.write(raw)
+            written += len(raw)
+        os.fsync(f.fileno())
+    return written
@@ -3,19 +3,89 @@
 Script rapide pour extraire UNIQUEMENT : nom, date/heure, GPS
 """
 
-import sys
+import argparse
 import os
 from pathlib import Path
+from date_rules import DateCorrector
+from photo_dates import DEFAULT_DATE_PRECEDENCE, parse_date_precedence
+from photo_log import add_logging_arguments, configure_logging
+from photo_records import PhotoRecords
 from simple_metadata import SimplePhotoMetadata
 
 
+def parse_arguments():
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Extraction rapide : nom, date/heure, GPS")
+    parser.add_argument("dossier", nargs="?", help="Dossier des photos")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="Nombre d'extractions en parallele (defaut: 1)")
+    parser.add_argument("--processus", action="store_true",
+                        help="Paralleliser avec des processus plutot que des threads "
+                             "(incompatible avec --pipeline)")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Recouvrir parcours, lecture (N threads), analyse et ecriture "
+                             "et afficher les mesures de chaque etape")
+    parser.add_argument("--complet", action="store_true",
+                        help="Tout re-extraire sans reutiliser metadata_simple.json")
+    parser.add_argument("--format", choices=["json", "jsonl", "sqlite"], default=None,
+                        help="Format de sauvegarde (jsonl: une ligne par photo, "
+                             "ecrite au fil de l'extraction ; sqlite: base indexee)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Reprendre une extraction interrompue la ou elle s'est arretee")
+    parser.add_argument("--inclure", action="append", default=[], metavar="MOTIF",
+                        help="Ne scanner que les photos correspondant au motif "
+                             "(chemin relatif, ex: '2021/*'), option repetable")
+    parser.add_argument("--exclure", action="append", default=[], metavar="MOTIF",
+                        help="Ignorer les photos et dossiers correspondant au motif, "
+                             "option repetable")
+    parser.add_argument("--ignorer-caches", action="store_true",
+                        help="Ignorer les fichiers et dossiers caches (nom en '.', "
+                             "attribut cache ou systeme sous Windows)")
+    parser.add_argument("--ordre-dates", type=parse_date_precedence, default=None,
+                        metavar="SOURCES",
+                        help="Sources de la date de prise de vue par ordre de priorite "
+                             f"(defaut: {','.join(DEFAULT_DATE_PRECEDENCE)})")
+    parser.add_argument("--exif-complets", action="store_true",
+                        help="Sauvegarder aussi tous les EXIF des JPEG dans metadata_simple.exif "
+                             "(restauration sans perte)")
+    parser.add_argument("--empreintes", action="store_true",
+                        help="Enregistrer l'empreinte du contenu de chaque photo pour la "
+                             "retrouver a la restauration si elle a ete renommee")
+    parser.add_argument("--fuseaux", action="store_true",
+                        help="Enregistrer le decalage UTC de chaque photo (balise EXIF, sinon "
+                             "fuseau horaire de la position GPS)")
+    parser.add_argument("--polygones-fuseaux", metavar="FICHIER",
+                        help="Fichier GeoJSON des fuseaux horaires (defaut: fuseaux_horaires.json "
+                             "a cote des scripts, sinon estimation par la longitude) ; "
+                             "implique --fuseaux")
+    parser.add_argument("--lieux", action="store_true",
+                        help="Ajouter le pays, la region et la ville de chaque photo geolocalisee "
+                             "(hors ligne, fichier lieux.txt a cote des scripts)")
+    parser.add_argument("--fichier-lieux", metavar="FICHIER",
+                        help="Fichier des lieux GeoNames (ex: cities15000.txt) ; implique --lieux")
+    parser.add_argument("--regles-dates", metavar="FICHIER",
+                        help="Fichier JSON des regles de correction des dates (horloge decalee, "
+                             "derive mesuree, fuseau de l'appareil), voir date_rules.py")
+    parser.add_argument("--mesures", metavar="FICHIER",
+                        help="Mesurer chaque etape et ecrire les mesures dans FICHIER "
+                             "(format Prometheus pour un fichier .prom, JSON sinon)")
+    add_logging_arguments(parser)
+    args = parser.parse_args()
+    if args.pipeline and args.processus:
+        parser.error("--pipeline n'utilise que des threads, il exclut --processus")
+    return args
+
+
 def main():
     """Fonction principale pour extraction rapide."""
     
+    args = parse_arguments()
+    configure_logging(quiet=args.quiet, verbose=args.verbeux, event_log=args.journal)
+    
     try:
         # Déterminer le dossier à traiter
-        if len(sys.argv) > 1:
-            photo_dir = sys.argv[1]
+        if args.dossier:
+            photo_dir = args.dossier
         else:
             photo_dir = input("Dossier des photos: ").strip() or "."
         
@@ -24,22 +94,62 @@ def main():
             input("Appuyez sur Entree pour continuer...")
             return
         
-        print(f"Extraction simple des métadonnées: {photo_dir}")
-        print("Récupération de : Nom, Date/Heure, GPS")
-        print()
+        if not args.quiet:
+            print(f"Extraction simple des métadonnées: {photo_dir}")
+            print("Récupération de : Nom, Date/Heure, GPS")
+            print()
         
         # Créer le gestionnaire
-        manager = SimplePhotoMetadata(photo_dir)
+        manager = SimplePhotoMetadata(
+            photo_dir,
+            output_format=args.format,
+            include=args.inclure,
+            exclude=args.exclure,
+            skip_hidden=args.ignorer_caches,
+            date_precedence=args.ordre_dates,
+            instrument=bool(args.mesures),
+            exif_backup=args.exif_complets,
+            fingerprint=args.empreintes,
+            timezones=args.fuseaux,
+            timezone_polygons=args.polygones_fuseaux,
+            date_rules=DateCorrector.from_file(args.regles_dates) if args.regles_dates else None,
+            places=args.lieux,
+            places_file=args.fichier_lieux
+        )
         
         # Extraire les métadonnées
-        metadata = manager.scan_directory()
+        metadata = manager.iter_scan(
+            workers=args.jobs,
+            use_processes=args.processus,
+            incremental=not args.complet,
+            checkpoint=True,
+            resume=args.resume,
+            pipeline=args.pipeline
+        )
+        
+        if manager.output_format in ('jsonl', 'sqlite'):
+            # Chaque photo est écrite dès son extraction, puis relue pour le résumé
+            if manager.save_metadata(metadata):
+                metadata = manager.iter_metadata()
+            else:
+                metadata = None
+        else:
+            metadata = PhotoRecords(metadata)
+            if metadata:
+                # Sauvegarder
+                manager.save_metadata(metadata)
+        
+        # La sauvegarde finale est écrite : le point de reprise ne sert plus
+        manager.clear_checkpoint()
+        
+        if args.mesures and manager.stats is not None:
+            manager.stats.write(args.mesures)
+            print(f"Mesures ecrites: {args.mesures}")
         
         if metadata:
-            # Sauvegarder
-            manager.save_metadata(metadata)
-            
             # Afficher le résumé
-            manager.display_summary(metadata)
+            # En mode silencieux, seulement les statistiques
+            manager.display_summary(metadata, details=not args.quiet)
             
             print(f"\nExtraction terminée!")
             print(f"Fichier de sauvegarde: {manager.metadata_file}")
@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Stockage des métadonnées dans une base SQLite.
+
+Contrairement à metadata_simple.json, la base est indexée sur la date de
+prise de vue, les coordonnées GPS et le nom de fichier : on peut retrouver
+les photos d'une période ou d'un lieu sans relire toutes les entrées.
+
+Utilisation en ligne de commande :
+    python metadata_store.py importer "C:\\Dossier\\Photos"
+    python metadata_store.py exporter "C:\\Dossier\\Photos" --format jsonl
+    python metadata_store.py requete "C:\\Dossier\\Photos" --du 2021-07 --au 2021-07
+    python metadata_store.py requete "C:\\Dossier\\Photos" --lat 48.85 --lon 2.35 --rayon 5
+"""
+
+import argparse
+import json
+import math
+import os
+import sqlite3
+import sys
+
+from photo_dates import capture_timestamp, parse_date_argument
+
+
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# Nombre de photos insérées par requête groupée
+BATCH_SIZE = 1000
+
+EARTH_RADIUS_KM = 6371.0088
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS informations (
+    cle TEXT PRIMARY KEY,
+    valeur TEXT
+);
+CREATE TABLE IF NOT EXISTS photos (
+    chemin TEXT PRIMARY KEY,
+    nom TEXT NOT NULL,
+    horodatage INTEGER,
+    gps_latitude REAL,
+    gps_longitude REAL,
+    donnees TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_photos_horodatage ON photos (horodatage);
+CREATE INDEX IF NOT EXISTS idx_photos_gps ON photos (gps_latitude, gps_longitude);
+CREATE INDEX IF NOT EXISTS idx_photos_nom ON photos (nom);
+"""
+
+
+def is_sqlite_file(file_path):
+    """
+    Indique si un fichier est une base SQLite.
+
+    Args:
+        file_path (Path): Fichier à tester
+
+    Returns:
+        bool: True si le fichier commence par l'en-tête SQLite
+    """
+    with open(file_path, 'rb') as f:
+        return f.read(len(SQLITE_HEADER)) == SQLITE_HEADER
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """
+    Distance à vol d'oiseau entre deux points (formule de haversine).
+
+    Returns:
+        float: Distance en kilomètres
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    delta_phi = phi2 - phi1
+    delta_lambda = math.radians(lon2 - lon1)
+    a = (math.sin(delta_phi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(delta_lambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """
+    Rectangle de coordonnées contenant le cercle de rayon donné.
+
+    Returns:
+        tuple: (lat_min, lat_max, lon_min, lon_max) ; lon_min > lon_max
+            quand le rectangle traverse l'antiméridien
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    lat_min = max(-90.0, latitude - delta_lat)
+    lat_max = min(90.0, latitude + delta_lat)
+
+    cos_lat = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if cos_lat < 1e-9 or lat_min <= -90.0 or lat_max >= 90.0:
+        return lat_min, lat_max, -180.0, 180.0
+
+    delta_lon = math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat))
+    if delta_lon >= 180.0:
+        return lat_min, lat_max, -180.0, 180.0
+
+    lon_min = longitude - delta_lon
+    lon_max = longitude + delta_lon
+    if lon_min < -180.0:
+        lon_min += 360.0
+    if lon_max > 180.0:
+        lon_max -= 360.0
+    return lat_min, lat_max, lon_min, lon_max
+
+
+class SQLiteMetadataStore:
+    """Base SQLite des métadonnées photo."""
+
+    def __init__(self, db_path):
+        """
+        Ouvre (ou crée) la base.
+
+        Args:
+            db_path (Path): Chemin du fichier SQLite
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(str(db_path))
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        """Ferme la connexion à la base."""
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def save(self, items, extraction_date):
+        """
+        Remplace le contenu de la base par les photos fournies.
+
+        Les photos sont insérées par lots dans une seule transaction : en cas
+        d'erreur, la base garde son contenu précédent.
+
+        Args:
+            items: Itérable de couples (chemin, métadonnées sérialisables)
+            extraction_date (str): Date de l'extraction
+
+        Returns:
+            int: Nombre de photos enregistrées
+        """
+        total_photos = 0
+        with self.connection:
+            self.connection.execute("DELETE FROM photos")
+            batch = []
+            for filepath, metadata in items:
+                batch.append(self._row(filepath, metadata))
+                if len(batch) >= BATCH_SIZE:
+                    self._insert(batch)
+                    total_photos += len(batch)
+                    batch = []
+            if batch:
+                self._insert(batch)
+                total_photos += len(batch)
+
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO informations (cle, valeur) VALUES (?, ?)",
+                [('extraction_date', extraction_date), ('total_photos', str(total_photos))]
+            )
+        return total_photos
+
+    def _row(self, filepath, metadata):
+        """Prépare la ligne SQL d'une photo."""
+        return (
+            filepath,
+            metadata.get('nom') or os.path.basename(filepath),
+            capture_timestamp(metadata.get('date_creation'), metadata.get('heure_creation')),
+            metadata.get('gps_latitude'),
+            metadata.get('gps_longitude'),
+            json.dumps(metadata, ensure_ascii=False)
+        )
+
+    def _insert(self, rows):
+        """Insère un lot de photos."""
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO photos "
+            "(chemin, nom, horodatage, gps_latitude, gps_longitude, donnees) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+
+    def info(self):
+        """
+        Lit la date d'extraction et le nombre de photos.
+
+        Returns:
+            dict: 'extraction_date' et 'total_photos'
+        """
+        values = dict(self.connection.execute("SELECT cle, valeur FROM informations"))
+        return {
+            'extraction_date': values.get('extraction_date'),
+            'total_photos': int(values.get('total_photos', 0))
+        }
+
+    def iter_photos(self):
+        """
+        Parcourt toutes les photos de la base, dans l'ordre d'insertion.
+
+        Yields:
+            tuple: (chemin, métadonnées)
+        """
+        cursor = self.connection.execute("SELECT chemin, donnees FROM photos ORDER BY rowid")
+        for filepath, data in cursor:
+            yield filepath, json.loads(data)
+
+    def query(self, start=None, end=None, latitude=None, longitude=None,
+              radius_km=None, name=None, limit=None):
+        """
+        Recherche des photos par période, par lieu et/ou par nom.
+
+        Args:
+            start (int): Horodatage minimal de prise de vue (inclus)
+            end (int): Horodatage maximal de prise de vue (inclus)
+            latitude (float): Latitude du centre de recherche
+            longitude (float): Longitude du centre de recherche
+            radius_km (float): Rayon de recherche autour du centre
+            name (str): Nom de fichier, avec jokers * et ? éventuels
+            limit (int): Nombre maximal de résultats
+
+        Returns:
+            list: Couples (chemin, métadonnées), triés par date de prise de vue
+        """
+        conditions = []
+        parameters = []
+
+        if start is not None:
+            conditions.append("horodatage >= ?")
+            parameters.append(start)
+        if end is not None:
+            conditions.append("horodatage <= ?")
+            parameters.append(end)
+
+        use_radius = latitude is not None and longitude is not None and radius_km is not None
+        if use_radius:
+            # Pré-filtre sur l'index par un rectangle, affiné ensuite par la distance
+            lat_min, lat_max, lon_min, lon_max = bounding_box(latitude, longitude, radius_km)
+            conditions.append("gps_latitude BETWEEN ? AND ?")
+            parameters.extend([lat_min, lat_max])
+            if lon_min <= lon_max:
+                conditions.append("gps_longitude BETWEEN ? AND ?")
+                parameters.extend([lon_min, lon_max])
+            else:
+                conditions.append("(gps_longitude >= ? OR gps_longitude <= ?)")
+                parameters.extend([lon_min, lon_max])
+
+        if name:
+            if '*' in name or '?' in name:
+                conditions.append("nom GLOB ?")
+            else:
+                conditions.append("nom = ?")
+            parameters.append(name)
+
+        sql = "SELECT chemin, gps_latitude, gps_longitude, donnees FROM photos"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY horodatage, chemin"
+        if limit is not None and not use_radius:
+            sql += " LIMIT ?"
+            parameters.append(limit)
+
+        results = []
+        for filepath, lat, lon, data in self.connection.execute(sql, parameters):
+            if use_radius and distance_km(latitude, longitude, lat, lon) > radius_km:
+                continue
+            results.append((filepath, json.loads(data)))
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+def parse_arguments(argv=None):
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Base SQLite des metadonnees photo")
+    subparsers = parser.add_subparsers(dest="commande", required=True)
+
+    importer = subparsers.add_parser(
+        "importer", help="Importer metadata_simple.json(l) dans metadata_simple.db")
+    importer.add_argument("dossier", help="Dossier des photos")
+
+    exporter = subparsers.add_parser(
+        "exporter", help="Exporter metadata_simple.db vers metadata_simple.json(l)")
+    exporter.add_argument("dossier", help="Dossier des photos")
+    exporter.add_argument("--format", choices=["json", "jsonl"], default="json")
+
+    requete = subparsers.add_parser("requete", help="Rechercher des photos")
+    requete.add_argument("dossier", help="Dossier des photos")
+    requete.add_argument("--du", help="Date de debut (AAAA, AAAA-MM, AAAA-MM-JJ...)")
+    requete.add_argument("--au", help="Date de fin (AAAA, AAAA-MM, AAAA-MM-JJ...)")
+    requete.add_argument("--lat", type=float, help="Latitude du centre")
+    requete.add_argument("--lon", type=float, help="Longitude du centre")
+    requete.add_argument("--rayon", type=float, help="Rayon de recherche en km")
+    requete.add_argument("--nom", help="Nom de fichier (jokers * et ? acceptes)")
+    requete.add_argument("--limite", type=int, help="Nombre maximal de resultats")
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Fonction principale."""
+    # Import local : simple_metadata utilise lui-même ce module
+    from photo_log import configure_logging
+    from simple_metadata import SimplePhotoMetadata
+
+    args = parse_arguments(argv)
+    configure_logging()
+
+    if not os.path.exists(args.dossier):
+        print(f"Le dossier {args.dossier} n'existe pas.")
+        return 1
+
+    if args.commande == "importer":
+        source = SimplePhotoMetadata(args.dossier)
+        if not source.metadata_file.exists():
+            print(f"Fichier de metadonnees non trouve: {source.metadata_file}")
+            return 1
+        target = SimplePhotoMetadata(args.dossier, output_format='sqlite')
+        total = target.save_metadata(source.iter_metadata())
+        print(f"{total} photos importees depuis {source.metadata_file}")
+
+    elif args.commande == "exporter":
+        source = SimplePhotoMetadata(args.dossier, output_format='sqlite')
+        if not source.metadata_file.exists():
+            print(f"Base non trouvee: {source.metadata_file}")
+            return 1
+        target = SimplePhotoMetadata(args.dossier, output_format=args.format)
+        total = target.save_metadata(source.iter_metadata())
+        print(f"{total} photos exportees vers {target.metadata_file}")
+
+    else:
+        db_path = SimplePhotoMetadata(args.dossier, output_format='sqlite').metadata_file
+        if not db_path.exists():
+            print(f"Base non trouvee: {db_path}")
+            print("Utilisez d'abord: python metadata_store.py importer <dossier>")
+            return 1
+
+        try:
+            start = parse_date_argument(args.du) if args.du else None
+            end = parse_date_argument(args.au, end_of_day=True) if args.au else None
+        except ValueError as e:
+            print(e)
+            return 1
+
+        gps_arguments = [args.lat, args.lon, args.rayon]
+        if any(value is not None for value in gps_arguments) and None in gps_arguments:
+            print("--lat, --lon et --rayon doivent etre utilises ensemble.")
+            return 1
+
+        with SQLiteMetadataStore(db_path) as store:
+            results = store.query(
+                start=start, end=end,
+                latitude=args.lat, longitude=args.lon,
+                radius_km=args.rayon,
+                name=args.nom, limit=args.limite
+            )
+
+        for filepath, metadata in results:
+            date = metadata.get('date_creation') or "Date inconnue"
+            heure = metadata.get('heure_creation') or ""
+            if metadata.get('gps_latitude') is not None and metadata.get('gps_longitude') is not None:
+                gps_info = f"{metadata['gps_latitude']:.4f}, {metadata['gps_longitude']:.4f}"
+            else:
+                gps_info = "Pas de GPS"
+            print(f"{date} {heure}  {gps_info}  {filepath}")
+        print(f"\n{len(results)} photo(s) trouvee(s)")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Conversion des dates de prise de vue entre le format des métadonnées
+("16/05/2025" et "17:00:50") et un horodatage entier.
+
+L'horodatage compte les secondes depuis le 01/01/1970 en heure locale de
+l'appareil (sans fuseau) : il sert à trier et à filtrer les photos, pas à
+les situer dans le temps universel.
+
+Le module lit aussi les dates des sources possibles d'une photo (EXIF, nom
+du fichier) sans passer par datetime.strptime.
+"""
+
+import calendar
+import re
+import time
+from functools import lru_cache
+
+
+# Sources possibles de la date de prise de vue, dans l'ordre de priorité par
+# défaut : EXIF DateTimeOriginal, DateTimeDigitized puis DateTime, date
+# contenue dans le nom du fichier, date de création du fichier
+DATE_SOURCES = ('exif_original', 'exif_numerisation', 'exif_modification',
+                'nom_fichier', 'fichier')
+
+DEFAULT_DATE_PRECEDENCE = DATE_SOURCES
+
+DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Dates contenues dans les noms de fichiers, par style d'appareil ou
+# d'application (groupes Y, M, D et éventuellement h, m, s) : lues à
+# l'extraction (source 'nom_fichier') et par les règles de date_rules
+FILENAME_STYLES = {
+    # PXL_20210711_065821123.jpg
+    'pixel': r'PXL_(?P<Y>\d{4})(?P<M>\d{2})(?P<D>\d{2})_(?P<h>\d{2})(?P<m>\d{2})(?P<s>\d{2})',
+    # Screenshot_20210711-065821.png, Capture d'écran 2021-07-11 à 06.58.21.png
+    'capture': (r'(?i:screenshot|capture)\D*?(?P<Y>\d{4})-?(?P<M>\d{2})-?(?P<D>\d{2})'
+                r'[-_ ]\D{0,3}?(?P<h>\d{2})[-.:]?(?P<m>\d{2})[-.:]?(?P<s>\d{2})'),
+    # IMG-20210711-WA0000.jpg (sans heure)
+    'whatsapp': r'(?<!\d)(?P<Y>\d{4})(?P<M>\d{2})(?P<D>\d{2})-WA\d',
+    # 20210711_065821.jpg, IMG_20210711_065821.jpg
+    'samsung': r'(?<!\d)(?P<Y>\d{4})(?P<M>\d{2})(?P<D>\d{2})_(?P<h>\d{2})(?P<m>\d{2})(?P<s>\d{2})',
+    # 2021-07-11 06.58.21.jpg (Dropbox), 2021-07-11_06-58-21.jpg
+    'dropbox': (r'(?<!\d)(?P<Y>\d{4})-(?P<M>\d{2})-(?P<D>\d{2})[ _-](?P<h>\d{2})[.:-](?P<m>\d{2})'
+                r'[.:-](?P<s>\d{2})(?!\d)'),
+}
+
+
+def capture_timestamp(date_creation, heure_creation):
+    """
+    Convertit la date et l'heure d'une photo en horodatage.
+
+    Args:
+        date_creation (str): Date au format "JJ/MM/AAAA"
+        heure_creation (str): Heure au format "HH:MM:SS" (ou None pour minuit)
+
+    Returns:
+        int: Horodatage, ou None si la date n'est pas reconnue
+    """
+    if not date_creation:
+        return None
+    try:
+        day, month, year = date_creation.split('/')
+        if heure_creation:
+            hour, minute, second = heure_creation.split(':')
+        else:
+            hour = minute = second = 0
+        return calendar.timegm((
+            int(year), int(month), int(day),
+            int(hour), int(minute), int(second), 0, 0, 0
+        ))
+    except (ValueError, TypeError):
+        return None
+
+
+def parse_date_argument(value, end_of_day=False):
+    """
+    Convertit une date saisie par l'utilisateur en horodatage.
+
+    Formats acceptés : "AAAA-MM-JJ", "AAAA-MM-JJ HH:MM:SS", "JJ/MM/AAAA",
+    ainsi que "AAAA-MM" et "AAAA" pour désigner un mois ou une année.
+
+    Args:
+        value (str): Date saisie
+        end_of_day (bool): Pour une borne de fin, prendre la dernière
+            seconde de la période désignée
+
+    Returns:
+        int: Horodatage
+
+    Raises:
+        ValueError: Si la date n'est pas reconnue
+    """
+    value = value.strip()
+    formats = [
+        ("%Y-%m-%d %H:%M:%S", 0),
+        ("%Y-%m-%dT%H:%M:%S", 0),
+        ("%Y-%m-%d", 1),
+        ("%d/%m/%Y", 1),
+        ("%Y-%m", 2),
+        ("%Y", 3),
+    ]
+    for date_format, precision in formats:
+        try:
+            parsed = time.strptime(value, date_format)
+        except ValueError:
+            continue
+
+        timestamp = calendar.timegm(parsed)
+        if end_of_day and precision:
+            year, month = parsed.tm_year, parsed.tm_mon
+            if precision == 1:
+                timestamp += 86400
+            elif precision == 2:
+                month += 1
+                if month > 12:
+                    year, month = year + 1, 1
+                timestamp = calendar.timegm((year, month, 1, 0, 0, 0, 0, 0, 0))
+            else:
+                timestamp = calendar.timegm((year + 1, 1, 1, 0, 0, 0, 0, 0, 0))
+            timestamp -= 1
+        return timestamp
+
+    raise ValueError(f"Date non reconnue: {value}")
+
+
+def format_timestamp(timestamp):
+    """
+    Reconvertit un horodatage en date et heure au format des métadonnées.
+
+    Args:
+        timestamp (int): Horodatage
+
+    Returns:
+        tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS")
+    """
+    t = time.gmtime(timestamp)
+    return (
+        f"{t.tm_mday:02d}/{t.tm_mon:02d}/{t.tm_year:04d}",
+        f"{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}"
+    )
+
+
+def parse_date_precedence(value):
+    """
+    Lit un ordre de priorité des sources de date ("exif_original,fichier").
+
+    Args:
+        value (str | list): Noms de sources, séparés par des virgules
+
+    Returns:
+        tuple: Sources, dans l'ordre
+
+    Raises:
+        ValueError: Si une source est inconnue ou si la liste est vide
+    """
+    if isinstance(value, str):
+        value = value.split(',')
+    precedence = tuple(source.strip() for source in value if source.strip())
+    unknown = [source for source in precedence if source not in DATE_SOURCES]
+    if unknown:
+        raise ValueError(f"Source de date inconnue: {', '.join(unknown)} "
+                         f"(sources possibles: {', '.join(DATE_SOURCES)})")
+    if not precedence:
+        raise ValueError("Aucune source de date")
+    return precedence
+
+
+def _is_valid_datetime(year, month, day, hour, minute, second):
+    """Indique si une date et une heure existent dans le calendrier."""
+    if year < 1 or not 1 <= month <= 12 or hour > 23 or minute > 59 or second > 59:
+        return False
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return 1 <= day <= DAYS_IN_MONTH[month] + (leap and month == 2)
+
+
+def parse_exif_datetime(value):
+    """
+    Lit une date EXIF "AAAA:MM:JJ HH:MM:SS" sans datetime.strptime.
+
+    Les octets nuls ou espaces qui suivent la date (écrits par certains
+    appareils) sont ignorés ; une date incomplète ou impossible
+    ("0000:00:00 00:00:00") est refusée.
+
+    Args:
+        value (bytes | str): Valeur du champ EXIF
+
+    Returns:
+        tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS"), ou None
+    """
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    elif not isinstance(value, str):
+        return None
+    if (len(value) < 19 or value[4] != ':' or value[7] != ':' or value[10] != ' '
+            or value[13] != ':' or value[16] != ':' or value[19:].strip(' \x00')):
+        return None
+    digits = value[:4] + value[5:7] + value[8:10] + value[11:13] + value[14:16] + value[17:19]
+    if not (digits.isdigit() and digits.isascii()):
+        return None
+    if not _is_valid_datetime(int(digits[:4]), int(digits[4:6]), int(digits[6:8]),
+                              int(digits[8:10]), int(digits[10:12]), int(digits[12:])):
+        return None
+    return f"{value[8:10]}/{value[5:7]}/{value[:4]}", value[11:19]
+
+
+@lru_cache(maxsize=None)
+def filename_pattern(styles=tuple(FILENAME_STYLES)):
+    """
+    Motif unique reconnaissant les dates de plusieurs styles de noms.
+
+    Chaque style est une alternative nommée d'après lui ; ses groupes sont
+    préfixés par son nom (pixel_Y, pixel_M...).
+
+    Args:
+        styles (tuple): Styles de FILENAME_STYLES, par ordre de priorité
+
+    Returns:
+        re.Pattern: Motif compilé
+    """
+    alternatives = []
+    for style in styles:
+        pattern = re.sub(r'\(\?P<(\w)>', f'(?P<{style}_\\1>', FILENAME_STYLES[style])
+        alternatives.append(f'(?P<{style}>{pattern})')
+    return re.compile('|'.join(alternatives))
+
+
+def match_filename_date(pattern, filename):
+    """
+    Cherche une date dans un nom de fichier avec un motif de filename_pattern.
+
+    Returns:
+        tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS" ou None), ou None
+    """
+    for match in pattern.finditer(filename):
+        style = match.lastgroup
+        year, month, day = (match.group(f'{style}_{field}') for field in 'YMD')
+        clock = match.group(f'{style}_h') if f'{style}_h' in pattern.groupindex else None
+        if clock is not None:
+            hour, minute, second = clock, match.group(f'{style}_m'), match.group(f'{style}_s')
+        else:
+            hour = minute = second = '00'
+        if _is_valid_datetime(int(year), int(month), int(day),
+                              int(hour), int(minute), int(second)):
+            return f"{day}/{month}/{year}", (f"{hour}:{minute}:{second}" if clock is not None else None)
+    return None
+
+
+def parse_filename_datetime(filename):
+    """
+    Cherche une date de prise de vue dans un nom de fichier (tous les
+    styles de FILENAME_STYLES).
+
+    Args:
+        filename (str): Nom du fichier (20210711_065821.jpg, IMG-20210711-WA0000.jpg...)
+
+    Returns:
+        tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS" ou None), ou None
+    """
+    return match_filename_date(filename_pattern(), filename)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Empreinte du contenu d'une photo, pour la retrouver après un renommage.
+
+L'empreinte porte sur les données d'image seules (voir
+exif_header.image_data_range) : elle ne change pas quand les EXIF sont
+modifiés ou que le fichier est renommé ou déplacé. Elle est calculée sur
+un échantillon de taille bornée (SAMPLE_COUNT morceaux de SAMPLE_SIZE
+octets répartis dans les données, plus leur longueur) : son coût ne dépend
+pas de la taille de la photo.
+"""
+
+import hashlib
+import struct
+import threading
+
+from exif_header import image_data_range
+
+
+# Champ des métadonnées portant l'empreinte (32 caractères hexadécimaux)
+FINGERPRINT_FIELD = 'empreinte'
+
+FINGERPRINT_SIZE = 16
+
+SAMPLE_COUNT = 16
+SAMPLE_SIZE = 4096
+
+
+def content_fingerprint(image_path, sample_count=SAMPLE_COUNT, sample_size=SAMPLE_SIZE):
+    """
+    Calcule l'empreinte des données d'image d'une photo.
+
+    Args:
+        image_path (str | Path): Chemin vers l'image
+        sample_count (int): Nombre de morceaux lus
+        sample_size (int): Taille de chaque morceau
+
+    Returns:
+        tuple: (empreinte hexadécimale, octets lus)
+    """
+    with open(image_path, 'rb', buffering=0) as f:
+        start, end, bytes_read = image_data_range(f)
+        length = end - start
+        digest = hashlib.blake2b(struct.pack("<Q", length), digest_size=FINGERPRINT_SIZE)
+
+        if length <= sample_count * sample_size:
+            f.seek(start)
+            data = f.read(length)
+            digest.update(data)
+            bytes_read += len(data)
+        else:
+            # Morceaux régulièrement espacés, du début à la fin des données
+            step = (length - sample_size) // (sample_count - 1)
+            for index in range(sample_count):
+                f.seek(start + index * step)
+                data = f.read(sample_size)
+                digest.update(data)
+                bytes_read += len(data)
+
+    return digest.hexdigest(), bytes_read
+
+
+class FingerprintIndex:
+    """
+    Empreintes des photos d'un dossier cible, calculées à la demande.
+
+    L'empreinte d'une photo n'est calculée qu'une fois ; l'index complet
+    (empreinte -> chemins) n'est construit qu'à la première recherche d'une
+    photo absente sous son nom.
+    """
+
+    def __init__(self, paths, compute=None):
+        """
+        Args:
+            paths (iterable): Chemins des photos du dossier cible
+            compute: Fonction chemin -> empreinte (ou None si illisible) ;
+                par défaut content_fingerprint
+        """
+        self._paths = paths
+        self._compute = compute or (lambda path: content_fingerprint(path)[0])
+        self._fingerprints = {}
+        self._index = None
+        self._lock = threading.Lock()
+
+    def fingerprint(self, path):
+        """
+        Empreinte d'une photo du dossier cible.
+
+        Returns:
+            str: Empreinte, ou None si la photo est illisible
+        """
+        with self._lock:
+            if path in self._fingerprints:
+                return self._fingerprints[path]
+        value = self._compute(path)
+        with self._lock:
+            self._fingerprints[path] = value
+        return value
+
+    def find(self, fingerprint):
+        """
+        Photos du dossier cible ayant une empreinte donnée.
+
+        Returns:
+            list: Chemins (vide si aucune photo ne correspond)
+        """
+        if self._index is None:
+            index = {}
+            for path in self._paths:
+                value = self.fingerprint(path)
+                if value is not None:
+                    index.setdefault(value, []).append(path)
+            self._index = index
+        return self._index.get(fingerprint, [])
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Journal des traitements de photos, basé sur le module logging.
+
+Les modules écrivent leurs messages dans le logger "metadata_photo" (ou un
+logger enfant) ; les scripts choisissent ce qui en est fait avec
+configure_logging :
+- à l'écran, selon le niveau : détails photo par photo (DEBUG), photo
+  traitée (INFO), bilans (BILAN), problèmes (WARNING et au-delà) ;
+- en mode silencieux, seuls les bilans et les problèmes sont affichés,
+  avec une ligne de progression (photos traitées et débit) ;
+- dans un journal d'événements JSON lines, une ligne par message, avec le
+  nom de l'événement et ses champs, pour les outils d'analyse.
+
+Un message n'est mis en forme que s'il est affiché ou journalisé : les
+modules passent leurs arguments à la manière de logging ("%s") plutôt
+que des f-strings.
+"""
+
+import json
+import logging
+import sys
+import time
+from datetime import datetime
+
+
+LOGGER_NAME = 'metadata_photo'
+
+# Niveau des bilans : affichés même en mode silencieux
+SUMMARY = 25
+logging.addLevelName(SUMMARY, 'BILAN')
+
+# Attributs ajoutés aux enregistrements par log_event
+EVENT_ATTRIBUTE = 'evenement'
+FIELDS_ATTRIBUTE = 'champs'
+
+# Événements qui font avancer la ligne de progression
+PROGRESS_EVENTS = {'photo_extraite', 'photo_restauree'}
+
+# Intervalle minimal entre deux mises à jour de la ligne de progression
+PROGRESS_INTERVAL = 0.2
+
+
+def get_logger(name=None):
+    """
+    Logger du projet, ou l'un de ses loggers enfants.
+
+    Args:
+        name (str): Nom du logger enfant (par exemple 'restauration')
+
+    Returns:
+        logging.Logger: Logger
+    """
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
+
+
+def log_event(logger, level, event, message, *args, **fields):
+    """
+    Journalise un message accompagné d'un événement structuré.
+
+    Rien n'est fait (pas même la préparation de l'enregistrement) si le
+    niveau n'est pas actif.
+
+    Args:
+        logger (logging.Logger): Logger
+        level (int): Niveau du message
+        event (str): Nom de l'événement ('photo_extraite'...)
+        message (str): Message, avec des "%s" pour les arguments
+        *args: Arguments du message
+        **fields: Champs de l'événement dans le journal JSON lines
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args,
+                   extra={EVENT_ATTRIBUTE: event, FIELDS_ATTRIBUTE: fields})
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Met en forme un enregistrement sur une ligne JSON."""
+
+    def format(self, record):
+        entry = {
+            'horodatage': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'niveau': record.levelname,
+            'evenement': getattr(record, EVENT_ATTRIBUTE, 'message'),
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, FIELDS_ATTRIBUTE, {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ProgressHandler(logging.Handler):
+    """
+    Ligne de progression mise à jour sur place (photos traitées et débit).
+
+    Les enregistrements des événements de PROGRESS_EVENTS font avancer le
+    compteur ; avant un problème, la ligne est terminée pour que le message
+    s'affiche en dessous, et un bilan clôt le compte de l'étape.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(logging.DEBUG)
+        self.stream = stream or sys.stderr
+        self.count = 0
+        self.start = None
+        self._last_update = 0.0
+        self._line_open = False
+
+    def emit(self, record):
+        if record.levelno >= logging.WARNING:
+            # Problème : le message s'affiche sous la ligne, le compte continue
+            self._break_line()
+        elif record.levelno >= SUMMARY:
+            self.end_line()
+
+        if getattr(record, EVENT_ATTRIBUTE, None) in PROGRESS_EVENTS:
+            now = time.perf_counter()
+            if self.start is None:
+                self.start = self._last_update = now
+            self.count += 1
+            if now - self._last_update >= PROGRESS_INTERVAL:
+                self._last_update = now
+                self._draw(now)
+
+    def _draw(self, now):
+        elapsed = now - self.start
+        rate = self.count / elapsed if elapsed else 0.0
+        self.stream.write(f"\r{self.count} photos traitees ({rate:.1f} photos/s)")
+        self.stream.flush()
+        self._line_open = True
+
+    def _break_line(self):
+        if self._line_open:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._line_open = False
+
+    def end_line(self):
+        """Affiche le compteur final d'une étape et repart de zéro."""
+        if self.count:
+            self._draw(time.perf_counter())
+        self._break_line()
+        self.count = 0
+        self.start = None
+
+    def close(self):
+        self.end_line()
+        super().close()
+
+
+def configure_logging(quiet=False, verbose=False, event_log=None, stream=None):
+    """
+    Configure l'affichage et la journalisation des traitements.
+
+    Peut être appelée plusieurs fois : la configuration précédente est
+    remplacée.
+
+    Args:
+        quiet (bool): N'afficher que la progression, les bilans et les problèmes
+        verbose (bool): Afficher aussi les détails photo par photo
+        event_log (str | Path): Fichier du journal d'événements JSON lines
+            (complété s'il existe)
+        stream: Flux de l'affichage (par défaut sys.stdout)
+
+    Returns:
+        logging.Logger: Logger du projet
+    """
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.propagate = False
+
+    if quiet:
+        console_level = SUMMARY
+        logger.addHandler(ProgressHandler())
+    else:
+        console_level = logging.DEBUG if verbose else logging.INFO
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(console)
+    level = console_level
+
+    if event_log:
+        event_handler = logging.FileHandler(event_log, mode='a', encoding='utf-8')
+        event_handler.setLevel(logging.DEBUG if verbose else logging.INFO)
+        event_handler.setFormatter(JsonLinesFormatter())
+        logger.addHandler(event_handler)
+        level = min(level, event_handler.level)
+
+    if quiet:
+        # La progression a besoin des événements photo par photo
+        level = min(level, logging.INFO)
+
+    logger.setLevel(level)
+    return logger
+
+
+def add_logging_arguments(parser):
+    """Ajoute les options --quiet, --verbeux et --journal à un analyseur d'arguments."""
+    parser.add_argument("--quiet", "-q", action="store_true",
+                        help="N'afficher que la progression, les bilans et les erreurs")
+    parser.add_argument("--verbeux", "-v", action="store_true",
+                        help="Afficher le detail de chaque photo")
+    parser.add_argument("--journal", metavar="FICHIER",
+                        help="Ecrire aussi les evenements dans un journal JSON lines")
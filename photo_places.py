@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""
+Géocodage inverse hors ligne : pays, région et ville d'une position GPS.
+
+Les lieux viennent d'un fichier GeoNames (cities1000.txt, cities15000.txt...,
+voir le README), accompagné si possible de admin1CodesASCII.txt (noms des
+régions) et countryInfo.txt (noms des pays). Au premier usage, le fichier
+est compilé en un index binaire (même nom, extension .idx) :
+- les lieux sont rangés par case d'une grille de GRID_SIZE degrés ;
+- une carte d'un bit par case indique les cases occupées, pour passer
+  les cases vides (mer, déserts) sans recherche ;
+- les coordonnées, les débuts des cases et les noms sont des tableaux
+  contigus, lus directement dans le fichier par mmap.
+
+Les exécutions suivantes (et les processus d'extraction) ouvrent l'index
+sans rien analyser : seules les pages utiles sont lues par le système.
+L'index est recompilé quand le fichier des lieux change.
+
+Le lieu d'une photo est le lieu le plus proche de sa position, à moins de
+MAX_DISTANCE_KM.
+"""
+
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+
+
+# Champs ajoutés aux métadonnées, dans cet ordre
+PLACE_FIELDS = ('pays', 'region', 'ville')
+
+# Fichier des lieux cherché par défaut, à placer à côté des scripts
+DEFAULT_PLACES_FILE = Path(__file__).with_name('lieux.txt')
+
+# Fichiers complémentaires de GeoNames, cherchés à côté du fichier des lieux
+ADMIN1_FILE = 'admin1CodesASCII.txt'
+COUNTRY_FILE = 'countryInfo.txt'
+
+# Taille en degrés des cases de la grille
+GRID_SIZE = 0.1
+GRID_ROWS = round(180 / GRID_SIZE)
+GRID_COLUMNS = round(360 / GRID_SIZE)
+
+# Distance maximale entre une photo et le lieu retenu
+MAX_DISTANCE_KM = 50.0
+
+# Au-delà de ce nombre d'anneaux de cases autour d'une photo (près des
+# pôles), les rangées proches sont parcourues entières
+MAX_RINGS = 50
+
+# Longueur d'un degré de latitude
+KM_PER_DEGREE = 111.195
+
+# Positions gardées en cache (arrondies à 1e-4 degré, ~10 m)
+CACHE_SIZE = 65536
+CACHE_PRECISION = 4
+
+# Séparateur des noms d'un lieu dans l'index (ville, région, pays)
+LABEL_SEPARATOR = '\x1f'
+
+# En-tête de l'index : marque, ordre des octets, nombres de lieux et de
+# cases, taille des noms, taille et date de modification des sources
+INDEX_MAGIC = b'LIEUXv1\x00'
+INDEX_HEADER = struct.Struct('<8s?3xIIIqq')
+
+# Colonnes du fichier GeoNames
+GEONAMES_NAME = 1
+GEONAMES_LATITUDE = 4
+GEONAMES_LONGITUDE = 5
+GEONAMES_COUNTRY = 8
+GEONAMES_ADMIN1 = 10
+
+
+class PlaceIndexError(Exception):
+    """Fichier des lieux ou index invalide."""
+
+
+def _cell(latitude, longitude):
+    """
+    Ligne et colonne de la case d'une position (grille partagée avec
+    photo_query).
+
+    La longitude 180 reste dans la dernière colonne ; les autres longitudes
+    hors de [-180, 180[ sont ramenées dans la grille.
+    """
+    row = min(GRID_ROWS - 1, max(0, math.floor((latitude + 90) / GRID_SIZE)))
+    column = math.floor((longitude + 180) / GRID_SIZE)
+    if column != GRID_COLUMNS:
+        column %= GRID_COLUMNS
+    else:
+        column -= 1
+    return row, column
+
+
+def _read_names(path, key_column, name_column):
+    """Lit un fichier de noms GeoNames (code -> nom), vide s'il est absent."""
+    names = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.startswith('#'):
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) > max(key_column, name_column):
+                    names[fields[key_column]] = fields[name_column]
+    except FileNotFoundError:
+        pass
+    return names
+
+
+def _source_files(places_file):
+    """Fichiers dont dépend l'index (fichier des lieux et noms complémentaires)."""
+    return [places_file, places_file.with_name(ADMIN1_FILE), places_file.with_name(COUNTRY_FILE)]
+
+
+def _source_signature(places_file):
+    """Taille et date de modification cumulées des fichiers sources."""
+    size = mtime_ns = 0
+    for path in _source_files(places_file):
+        try:
+            stat_info = path.stat()
+        except FileNotFoundError:
+            continue
+        size += stat_info.st_size
+        mtime_ns = max(mtime_ns, stat_info.st_mtime_ns)
+    return size, mtime_ns
+
+
+def _aligned(data):
+    """Complète des octets pour que la section suivante soit alignée sur 8 octets."""
+    return data + bytes(-len(data) % 8)
+
+
+def build_index(places_file, index_file):
+    """
+    Compile un fichier GeoNames en index binaire.
+
+    Args:
+        places_file (Path): Fichier des lieux (format GeoNames)
+        index_file (Path): Index à écrire (remplacé d'un coup)
+
+    Returns:
+        int: Nombre de lieux indexés
+
+    Raises:
+        PlaceIndexError: Si le fichier ne contient aucun lieu
+    """
+    regions = _read_names(places_file.with_name(ADMIN1_FILE), 0, 1)
+    countries = _read_names(places_file.with_name(COUNTRY_FILE), 0, 4)
+
+    places = []
+    with open(places_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) <= GEONAMES_ADMIN1:
+                continue
+            try:
+                latitude = float(fields[GEONAMES_LATITUDE])
+                longitude = float(fields[GEONAMES_LONGITUDE])
+            except ValueError:
+                continue
+            country = fields[GEONAMES_COUNTRY]
+            region = regions.get(f"{country}.{fields[GEONAMES_ADMIN1]}", '')
+            label = LABEL_SEPARATOR.join((fields[GEONAMES_NAME], region,
+                                          countries.get(country, country)))
+            row, column = _cell(latitude, longitude)
+            places.append((row * GRID_COLUMNS + column, latitude, longitude, label))
+    if not places:
+        raise PlaceIndexError(f"Aucun lieu dans {places_file.name}")
+    places.sort()
+
+    cell_keys = array('i')
+    cell_starts = array('I')
+    latitudes = array('f')
+    longitudes = array('f')
+    label_starts = array('I', [0])
+    labels = bytearray()
+    for position, (key, latitude, longitude, label) in enumerate(places):
+        if not cell_keys or cell_keys[-1] != key:
+            cell_keys.append(key)
+            cell_starts.append(position)
+        latitudes.append(latitude)
+        longitudes.append(longitude)
+        labels += label.encode('utf-8')
+        label_starts.append(len(labels))
+    cell_starts.append(len(places))
+    occupied = bytearray((GRID_ROWS * GRID_COLUMNS + 7) // 8)
+    for key in cell_keys:
+        occupied[key >> 3] |= 1 << (key & 7)
+
+    size, mtime_ns = _source_signature(places_file)
+    header = INDEX_HEADER.pack(INDEX_MAGIC, sys.byteorder == 'big', len(places),
+                               len(cell_keys), len(labels), size, mtime_ns)
+    fd, temp_path = tempfile.mkstemp(dir=index_file.parent, prefix=index_file.name,
+                                     suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for section in (header, bytes(occupied), cell_keys.tobytes(), cell_starts.tobytes(),
+                            latitudes.tobytes(), longitudes.tobytes(),
+                            label_starts.tobytes(), bytes(labels)):
+                f.write(_aligned(section))
+        os.replace(temp_path, index_file)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return len(places)
+
+
+class PlaceIndex:
+    """
+    Index des lieux ouvert par mmap (voir le début du module).
+
+    Recherche du lieu le plus proche : la case de la position, puis les
+    anneaux de cases voisines, tant qu'un lieu plus proche peut s'y trouver.
+    """
+
+    def __init__(self, index_file):
+        """
+        Args:
+            index_file (Path): Index écrit par build_index
+
+        Raises:
+            PlaceIndexError: Si l'index est invalide
+        """
+        self.index_file = Path(index_file)
+        with open(self.index_file, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._map_sections()
+        except (PlaceIndexError, ValueError, TypeError, struct.error):
+            self._mmap.close()
+            raise PlaceIndexError(f"Index des lieux invalide: {self.index_file.name}")
+        self.lookup = lru_cache(maxsize=CACHE_SIZE)(self._lookup)
+
+    def _map_sections(self):
+        """Découpe le fichier en tableaux, sans copie."""
+        (magic, big_endian, self.place_count, cell_count, label_size,
+         self.source_size, self.source_mtime_ns) = INDEX_HEADER.unpack_from(self._mmap)
+        if magic != INDEX_MAGIC or big_endian != (sys.byteorder == 'big'):
+            raise PlaceIndexError("Index d'une autre version ou d'une autre machine")
+
+        view = memoryview(self._mmap)
+        offset = INDEX_HEADER.size + (-INDEX_HEADER.size % 8)
+
+        def section(size, item_format=None):
+            nonlocal offset
+            data = view[offset:offset + size]
+            if len(data) != size:
+                raise PlaceIndexError("Index tronque")
+            offset += size + (-size % 8)
+            return data.cast(item_format) if item_format else data
+
+        self._occupied = section((GRID_ROWS * GRID_COLUMNS + 7) // 8)
+        self._cell_keys = section(4 * cell_count, 'i')
+        self._cell_starts = section(4 * (cell_count + 1), 'I')
+        self._latitudes = section(4 * self.place_count, 'f')
+        self._longitudes = section(4 * self.place_count, 'f')
+        self._label_starts = section(4 * (self.place_count + 1), 'I')
+        self._labels = section(label_size)
+
+    @classmethod
+    def open(cls, places_file=None):
+        """
+        Ouvre l'index d'un fichier de lieux, en le compilant si besoin.
+
+        Args:
+            places_file (str | Path): Fichier GeoNames (par défaut DEFAULT_PLACES_FILE)
+
+        Raises:
+            FileNotFoundError: Si le fichier des lieux est absent
+            PlaceIndexError: Si le fichier ne contient aucun lieu
+        """
+        places_file = Path(places_file) if places_file is not None else DEFAULT_PLACES_FILE
+        if not places_file.exists():
+            raise FileNotFoundError(
+                f"Fichier des lieux non trouve: {places_file} (voir le README pour le telecharger)")
+        index_file = places_file.with_suffix('.idx')
+        if index_file.exists():
+            try:
+                index = cls(index_file)
+            except PlaceIndexError:
+                index = None
+            if index is not None:
+                if (index.source_size, index.source_mtime_ns) == _source_signature(places_file):
+                    return index
+                index.close()
+        build_index(places_file, index_file)
+        return cls(index_file)
+
+    def close(self):
+        """Libère le fichier (les tableaux ne doivent plus être utilisés)."""
+        for name in ('_occupied', '_cell_keys', '_cell_starts', '_latitudes', '_longitudes',
+                     '_label_starts', '_labels'):
+            getattr(self, name).release()
+        self._mmap.close()
+
+    def __getstate__(self):
+        # Chaque processus d'extraction ouvre l'index à son tour, une seule
+        # fois (voir simple_metadata._init_extract_process)
+        return {'index_file': self.index_file}
+
+    def __setstate__(self, state):
+        self.__init__(state['index_file'])
+
+    def __len__(self):
+        return self.place_count
+
+    def _nearest_in_cell(self, row, column, latitude, longitude, cos_latitude, best):
+        """Plus proche lieu d'une case s'il bat `best` (distance², position)."""
+        key = row * GRID_COLUMNS + column
+        if not self._occupied[key >> 3] & (1 << (key & 7)):
+            return best
+        cell_keys = self._cell_keys
+        index = bisect_left(cell_keys, key)
+        if index == len(cell_keys) or cell_keys[index] != key:
+            return best
+        return self._nearest_in_places(self._cell_starts[index], self._cell_starts[index + 1],
+                                       latitude, longitude, cos_latitude, best)
+
+    def _nearest_in_row(self, row, latitude, longitude, cos_latitude, best):
+        """Plus proche lieu d'une rangée entière de cases s'il bat `best`."""
+        # Les cases occupées d'une rangée se suivent dans _cell_keys
+        cell_keys = self._cell_keys
+        first = bisect_left(cell_keys, row * GRID_COLUMNS)
+        last = bisect_left(cell_keys, (row + 1) * GRID_COLUMNS, first)
+        return self._nearest_in_places(self._cell_starts[first], self._cell_starts[last],
+                                       latitude, longitude, cos_latitude, best)
+
+    def _nearest_in_places(self, start, end, latitude, longitude, cos_latitude, best):
+        """Plus proche lieu des positions start à end s'il bat `best`."""
+        latitudes, longitudes = self._latitudes, self._longitudes
+        for position in range(start, end):
+            delta_lon = longitudes[position] - longitude
+            if delta_lon > 180:
+                delta_lon -= 360
+            elif delta_lon < -180:
+                delta_lon += 360
+            delta_lat = latitudes[position] - latitude
+            distance = delta_lat * delta_lat + (delta_lon * cos_latitude) ** 2
+            if distance < best[0]:
+                best = (distance, position)
+        return best
+
+    def _lookup(self, latitude, longitude, max_distance_km):
+        """Voir nearest (sans cache)."""
+        row, column = _cell(latitude, longitude)
+        cos_latitude = math.cos(math.radians(latitude))
+        max_degrees = max_distance_km / KM_PER_DEGREE
+        best = (max_degrees * max_degrees, None)
+
+        if GRID_SIZE * cos_latitude * (MAX_RINGS - 1) < max_degrees:
+            # Près des pôles, une case ne couvre presque rien en longitude :
+            # les rangées assez proches en latitude sont parcourues entières
+            reach = int(max_degrees / GRID_SIZE) + 1
+            for ring_row in range(max(0, row - reach), min(GRID_ROWS, row + reach + 1)):
+                best = self._nearest_in_row(ring_row, latitude, longitude, cos_latitude, best)
+        else:
+            ring = 0
+            while True:
+                # Distance minimale d'un lieu de l'anneau : au moins `ring - 1`
+                # cases complètes en latitude ou en longitude (la longitude
+                # est ramenée à la latitude de la photo, comme la distance)
+                ring_distance = max(0, ring - 1) * GRID_SIZE * cos_latitude
+                if ring_distance * ring_distance >= best[0]:
+                    break
+                # Rangées assez proches en latitude, quelle que soit la longitude
+                reach = min(ring, int(math.sqrt(best[0]) / GRID_SIZE) + 1)
+                for ring_row in range(max(0, row - reach), min(GRID_ROWS, row + reach + 1)):
+                    if ring_row in (row - ring, row + ring):
+                        columns = range(column - ring, column + ring + 1)
+                    else:
+                        columns = (column - ring, column + ring)
+                    for ring_column in columns:
+                        best = self._nearest_in_cell(ring_row, ring_column % GRID_COLUMNS,
+                                                     latitude, longitude, cos_latitude, best)
+                ring += 1
+
+        position = best[1]
+        if position is None:
+            return None
+        label = bytes(self._labels[self._label_starts[position]:self._label_starts[position + 1]])
+        city, region, country = label.decode('utf-8').split(LABEL_SEPARATOR)
+        return country, region or None, city
+
+    def nearest(self, latitude, longitude, max_distance_km=MAX_DISTANCE_KM):
+        """
+        Lieu le plus proche d'une position.
+
+        Args:
+            latitude (float): Latitude en degrés
+            longitude (float): Longitude en degrés
+            max_distance_km (float): Distance maximale du lieu
+
+        Returns:
+            tuple: (pays, région ou None, ville), ou None si aucun lieu
+                n'est assez proche
+        """
+        return self.lookup(round(latitude, CACHE_PRECISION), round(longitude, CACHE_PRECISION),
+                           max_distance_km)
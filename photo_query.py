@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Recherche des photos par période, par lieu et par proximité, sur les
+métadonnées chargées en mémoire (metadata_simple.json, .jsonl ou .db).
+
+Deux index sont construits une fois au chargement :
+- les photos datées, triées par horodatage de prise de vue : une période
+  se trouve par deux recherches dichotomiques ;
+- les photos géolocalisées, rangées par case de la grille de
+  photo_places, cases triées ligne par ligne : les cases d'une même ligne
+  couvertes par un rectangle forment une tranche contiguë de l'index.
+
+Une recherche part de l'index qui donne le moins de candidats et ne
+vérifie que ceux-ci : aucune recherche ne parcourt toutes les photos.
+
+Utilisation en ligne de commande :
+    python photo_query.py "C:\\Dossier\\Photos" --du 2021-07 --au 2021-07
+    python photo_query.py "C:\\Dossier\\Photos" --lat 48.85 --lon 2.35 --rayon 5
+    python photo_query.py "C:\\Dossier\\Photos" --rectangle 48,49,2,3 --du 2021
+    python photo_query.py "C:\\Dossier\\Photos" --lat 48.85 --lon 2.35 --proches 10
+"""
+
+import argparse
+import heapq
+import math
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from fnmatch import fnmatchcase
+
+from metadata_store import EARTH_RADIUS_KM, bounding_box, distance_km
+from photo_dates import parse_date_argument
+from photo_log import configure_logging
+from photo_places import GRID_COLUMNS, _cell
+from photo_records import PhotoRecords
+from simple_metadata import SimplePhotoMetadata
+
+
+# Premier rayon essayé par nearest, doublé tant qu'il manque des photos
+NEAREST_START_KM = 1.0
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Valeur des horodatages absents dans l'index
+NO_TIME = -2 ** 63
+
+
+def _cell_key(latitude, longitude):
+    """Numéro de la case d'une position (ligne par ligne), grille de photo_places."""
+    row, column = _cell(latitude, longitude)
+    return row * GRID_COLUMNS + column
+
+
+def parse_rectangle(value):
+    """
+    Lit un rectangle "lat_min,lat_max,lon_min,lon_max".
+
+    Returns:
+        tuple: (lat_min, lat_max, lon_min, lon_max)
+
+    Raises:
+        ValueError: Si le rectangle est invalide
+    """
+    try:
+        lat_min, lat_max, lon_min, lon_max = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError(f"Rectangle invalide: {value} (attendu: lat_min,lat_max,lon_min,lon_max)")
+    if lat_min > lat_max:
+        raise ValueError(f"Rectangle invalide: {value} (lat_min > lat_max)")
+    return lat_min, lat_max, lon_min, lon_max
+
+
+class PhotoQueryIndex:
+    """
+    Index des dates et des positions d'une collection de photos.
+
+    L'index est une photographie de la collection à sa construction : il
+    doit être reconstruit si la collection change.
+    """
+
+    def __init__(self, records):
+        """
+        Args:
+            records: PhotoRecords, ou dictionnaire / itérable de couples
+                (chemin, métadonnées), converti en PhotoRecords
+        """
+        if not isinstance(records, PhotoRecords):
+            records = PhotoRecords(records)
+        self.records = records
+
+        # Date et position de chaque photo, par position dans records
+        self._timestamps = array('q')
+        self._latitudes = array('d')
+        self._longitudes = array('d')
+        self._positions = array('q')
+        dated = []
+        located = []
+        for position, timestamp, latitude, longitude in records.iter_positions():
+            missing = position + 1 - len(self._timestamps)
+            self._timestamps.extend([NO_TIME] * missing)
+            self._latitudes.extend([math.nan] * missing)
+            self._longitudes.extend([math.nan] * missing)
+            self._positions.append(position)
+            if timestamp is not None:
+                dated.append((timestamp, position))
+                self._timestamps[position] = timestamp
+            if latitude is not None:
+                located.append((_cell_key(latitude, longitude), position))
+                self._latitudes[position] = latitude
+                self._longitudes[position] = longitude
+        dated.sort()
+        located.sort()
+
+        # Index des dates : horodatages triés et positions correspondantes
+        self._sorted_times = array('q', (timestamp for timestamp, _ in dated))
+        self._by_time = array('q', (position for _, position in dated))
+
+        # Index des positions : cases occupées triées, début de chaque case
+        # dans les positions triées par case
+        self._cell_keys = array('q')
+        self._cell_starts = array('q')
+        self._by_cell = array('q')
+        for index, (key, position) in enumerate(located):
+            if not self._cell_keys or self._cell_keys[-1] != key:
+                self._cell_keys.append(key)
+                self._cell_starts.append(index)
+            self._by_cell.append(position)
+        self._cell_starts.append(len(located))
+
+    def __len__(self):
+        return len(self.records)
+
+    def _time_range(self, start, end):
+        """Tranche de _by_time des photos prises entre start et end (inclus)."""
+        low = bisect_left(self._sorted_times, start) if start is not None else 0
+        high = (bisect_right(self._sorted_times, end) if end is not None
+                else len(self._sorted_times))
+        return low, max(low, high)
+
+    def _box_slices(self, lat_min, lat_max, lon_min, lon_max):
+        """
+        Tranches de _by_cell des cases couvertes par un rectangle.
+
+        Returns:
+            list: (début, fin) dans _by_cell ; lon_min > lon_max pour un
+                rectangle qui traverse l'antiméridien
+        """
+        if lon_min <= lon_max:
+            spans = [(lon_min, lon_max)]
+        else:
+            spans = [(lon_min, 180.0), (-180.0, lon_max)]
+        first_row = _cell_key(lat_min, 0) // GRID_COLUMNS
+        last_row = _cell_key(lat_max, 0) // GRID_COLUMNS
+        slices = []
+        for row in range(first_row, last_row + 1):
+            for west, east in spans:
+                first = row * GRID_COLUMNS + _cell_key(0, west) % GRID_COLUMNS
+                last = row * GRID_COLUMNS + _cell_key(0, east) % GRID_COLUMNS
+                low = bisect_left(self._cell_keys, first)
+                high = bisect_right(self._cell_keys, last)
+                if low < high:
+                    slices.append((self._cell_starts[low], self._cell_starts[high]))
+        return slices
+
+    def _in_box(self, position, lat_min, lat_max, lon_min, lon_max):
+        """Indique si une photo géolocalisée est dans un rectangle."""
+        latitude = self._latitudes[position]
+        longitude = self._longitudes[position]
+        if not lat_min <= latitude <= lat_max:
+            return False
+        if lon_min <= lon_max:
+            return lon_min <= longitude <= lon_max
+        return longitude >= lon_min or longitude <= lon_max
+
+    def query(self, start=None, end=None, latitude=None, longitude=None, radius_km=None,
+              box=None, name=None, limit=None):
+        """
+        Recherche des photos par période, par lieu et/ou par nom (mêmes
+        critères que SQLiteMetadataStore.query).
+
+        Args:
+            start (int): Horodatage minimal de prise de vue (inclus)
+            end (int): Horodatage maximal de prise de vue (inclus)
+            latitude (float): Latitude du centre de recherche
+            longitude (float): Longitude du centre de recherche
+            radius_km (float): Rayon de recherche autour du centre
+            box (tuple): Rectangle (lat_min, lat_max, lon_min, lon_max) ;
+                lon_min > lon_max s'il traverse l'antiméridien
+            name (str): Nom de fichier, avec jokers * et ? éventuels
+            limit (int): Nombre maximal de résultats
+
+        Returns:
+            list: Couples (chemin, métadonnées), triés par date de prise de
+                vue (photos non datées à la fin)
+        """
+        use_radius = latitude is not None and longitude is not None and radius_km is not None
+        boxes = []
+        if box is not None:
+            boxes.append(tuple(box))
+        if use_radius:
+            boxes.append(bounding_box(latitude, longitude, radius_km))
+        use_time = start is not None or end is not None
+
+        # Candidats : l'index qui en donne le moins
+        if not use_time and not boxes:
+            # Sans critère de date ni de lieu : toutes les photos, les
+            # photos non datées à la fin
+            results = list(self._by_time)
+            results.extend(position for position in self._positions
+                           if self._timestamps[position] == NO_TIME)
+        else:
+            # Candidats : l'index qui en donne le moins, déjà trié par date
+            # pour l'index des dates
+            in_time_order = False
+            if use_time:
+                low, high = self._time_range(start, end)
+            if boxes:
+                slices = self._box_slices(*boxes[-1])
+            if use_time and (not boxes or high - low <= sum(b - a for a, b in slices)):
+                candidates = self._by_time[low:high]
+                in_time_order = True
+            else:
+                candidates = [position for low, high in slices
+                              for position in self._by_cell[low:high]]
+
+            results = []
+            for position in candidates:
+                if use_time and not in_time_order:
+                    timestamp = self._timestamps[position]
+                    if timestamp == NO_TIME or (start is not None and timestamp < start) or (
+                            end is not None and timestamp > end):
+                        continue
+                if boxes:
+                    if math.isnan(self._latitudes[position]) or not all(
+                            self._in_box(position, *rectangle) for rectangle in boxes):
+                        continue
+                    if use_radius and distance_km(latitude, longitude, self._latitudes[position],
+                                                  self._longitudes[position]) > radius_km:
+                        continue
+                results.append(position)
+
+            if not in_time_order:
+                results.sort(key=lambda position: (self._timestamps[position] == NO_TIME,
+                                                   self._timestamps[position], position))
+
+        entries = []
+        for position in results:
+            filepath, metadata = self.records.entry(position)
+            if name and not fnmatchcase(metadata.get('nom') or '', name):
+                continue
+            entries.append((filepath, metadata))
+            if limit is not None and len(entries) >= limit:
+                break
+        return entries
+
+    def between(self, start, end, limit=None):
+        """Photos prises entre deux horodatages (inclus), par date."""
+        return self.query(start=start, end=end, limit=limit)
+
+    def within(self, latitude, longitude, radius_km, limit=None):
+        """Photos prises à moins de radius_km d'une position, par date."""
+        return self.query(latitude=latitude, longitude=longitude, radius_km=radius_km,
+                          limit=limit)
+
+    def in_box(self, lat_min, lat_max, lon_min, lon_max, limit=None):
+        """Photos prises dans un rectangle de coordonnées, par date."""
+        return self.query(box=(lat_min, lat_max, lon_min, lon_max), limit=limit)
+
+    def nearest(self, latitude, longitude, count=1, max_distance_km=None):
+        """
+        Photos les plus proches d'une position.
+
+        Le rayon de recherche part de NEAREST_START_KM et double tant qu'il
+        contient moins de `count` photos : seules les cases proches sont lues.
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            count (int): Nombre de photos voulues
+            max_distance_km (float): Distance maximale des photos
+
+        Returns:
+            list: Triplets (distance en km, chemin, métadonnées), du plus proche
+                au plus lointain
+        """
+        limit = min(max_distance_km or MAX_DISTANCE_KM, MAX_DISTANCE_KM)
+        radius = min(NEAREST_START_KM, limit)
+        while True:
+            found = []
+            for low, high in self._box_slices(*bounding_box(latitude, longitude, radius)):
+                for position in self._by_cell[low:high]:
+                    distance = distance_km(latitude, longitude, self._latitudes[position],
+                                           self._longitudes[position])
+                    if distance <= radius:
+                        found.append((distance, position))
+            if len(found) >= count or radius >= limit:
+                break
+            radius = min(radius * 2, limit)
+
+        return [(distance, *self.records.entry(position))
+                for distance, position in heapq.nsmallest(count, found)]
+
+
+def parse_arguments(argv=None):
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Recherche des photos par date et par lieu")
+    parser.add_argument("dossier", help="Dossier des photos (avec metadata_simple.json)")
+    parser.add_argument("--du", help="Date de debut (AAAA, AAAA-MM, AAAA-MM-JJ...)")
+    parser.add_argument("--au", help="Date de fin (AAAA, AAAA-MM, AAAA-MM-JJ...)")
+    parser.add_argument("--lat", type=float, help="Latitude du centre")
+    parser.add_argument("--lon", type=float, help="Longitude du centre")
+    parser.add_argument("--rayon", type=float, help="Rayon de recherche en km")
+    parser.add_argument("--rectangle", type=parse_rectangle, metavar="LAT_MIN,LAT_MAX,LON_MIN,LON_MAX",
+                        help="Rectangle de coordonnees")
+    parser.add_argument("--proches", type=int, metavar="N",
+                        help="Les N photos les plus proches de --lat/--lon")
+    parser.add_argument("--nom", help="Nom de fichier (jokers * et ? acceptes)")
+    parser.add_argument("--limite", type=int, help="Nombre maximal de resultats")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Fonction principale."""
+    args = parse_arguments(argv)
+    configure_logging()
+
+    try:
+        start = parse_date_argument(args.du) if args.du else None
+        end = parse_date_argument(args.au, end_of_day=True) if args.au else None
+    except ValueError as e:
+        print(e)
+        return 1
+    centre = [args.lat, args.lon]
+    if None in centre and (any(value is not None for value in centre)
+                           or args.rayon is not None or args.proches):
+        print("--lat, --lon et --rayon ou --proches doivent etre utilises ensemble.")
+        return 1
+    if None not in centre and args.rayon is None and not args.proches:
+        print("--lat et --lon demandent --rayon ou --proches.")
+        return 1
+
+    manager = SimplePhotoMetadata(args.dossier)
+    if not manager.metadata_file.exists():
+        print(f"Fichier de metadonnees non trouve: {manager.metadata_file}")
+        return 1
+
+    load_start = time.perf_counter()
+    index = PhotoQueryIndex(manager.load_metadata())
+    print(f"{len(index)} photos chargees et indexees en {time.perf_counter() - load_start:.2f} s")
+
+    query_start = time.perf_counter()
+    if args.proches:
+        results = [(filepath, metadata, distance) for distance, filepath, metadata in
+                   index.nearest(args.lat, args.lon, args.proches, args.rayon)]
+    else:
+        results = [(filepath, metadata, None) for filepath, metadata in index.query(
+            start=start, end=end, latitude=args.lat, longitude=args.lon, radius_km=args.rayon,
+            box=args.rectangle, name=args.nom, limit=args.limite)]
+    duration = time.perf_counter() - query_start
+
+    for filepath, metadata, distance in results:
+        date = metadata.get('date_creation') or "Date inconnue"
+        heure = metadata.get('heure_creation') or ""
+        if metadata.get('gps_latitude') is not None and metadata.get('gps_longitude') is not None:
+            gps_info = f"{metadata['gps_latitude']:.4f}, {metadata['gps_longitude']:.4f}"
+        else:
+            gps_info = "Pas de GPS"
+        if distance is not None:
+            gps_info += f" ({distance:.2f} km)"
+        print(f"{date} {heure}  {gps_info}  {filepath}")
+    print(f"\n{len(results)} photo(s) trouvee(s) en {duration * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
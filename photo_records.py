@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+"""
+Représentation compacte des métadonnées d'un grand nombre de photos.
+
+Les métadonnées sont rangées par colonnes (tableaux array) : la date sous
+forme d'horodatage entier, les coordonnées en flottants, la taille et la
+date de modification en entiers ; le lien de localisation est recalculé à
+la demande, la source de la date est un numéro, le décalage UTC un nombre
+de minutes, le lieu (pays, région, ville) un numéro dans une table des
+lieux et l'empreinte du contenu est gardée en binaire. Les chemins sont
+découpés en dossier et nom de fichier, chaque dossier n'étant stocké
+qu'une fois.
+
+PhotoRecords se manipule comme un dictionnaire chemin -> métadonnées : les
+métadonnées sont converties en dictionnaire (forme des fichiers JSON) à la
+lecture seulement, et ces dictionnaires ne sont pas conservés.
+"""
+
+import calendar
+import math
+from array import array
+from collections.abc import ItemsView, MutableMapping
+
+from photo_dates import DATE_SOURCES, _is_valid_datetime, capture_timestamp
+from photo_fingerprint import FINGERPRINT_FIELD, FINGERPRINT_SIZE
+from photo_places import PLACE_FIELDS
+from photo_timezones import (OFFSET_FIELD, OFFSET_SOURCE_FIELD, OFFSET_SOURCES, format_offset,
+                             parse_offset)
+
+
+# Champs présents dans toutes les métadonnées extraites, dans l'ordre des fichiers
+BASE_FIELDS = ('nom', 'date_creation', 'heure_creation', 'gps_latitude',
+               'gps_longitude', 'localisation')
+
+# Champ facultatif (absent des fichiers plus anciens), écrit après l'heure
+SOURCE_FIELD = 'source_date'
+
+# Numéro de chaque source de date dans la colonne des sources ; valeurs
+# négatives : champ absent, source None, autre valeur (champs complémentaires)
+SOURCE_CODES = {source: code for code, source in enumerate(DATE_SOURCES)}
+SOURCE_ABSENT = -1
+SOURCE_NONE = -2
+SOURCE_OTHER = -3
+
+# Décalage UTC et sa source (champs facultatifs, écrits ensemble juste
+# après la localisation) : numéro de la source, décalage en minutes
+OFFSET_SOURCE_CODES = {source: code for code, source in enumerate(OFFSET_SOURCES)}
+NO_OFFSET = -2 ** 15
+
+# Lieu absent dans la colonne des lieux (champs facultatifs, écrits après
+# le décalage UTC)
+NO_PLACE = -1
+
+# Champs écrits après les champs complémentaires (taille et date de modification)
+FILE_FIELDS = ('taille', 'mtime_ns')
+
+# Empreinte absente dans la colonne des empreintes
+NO_FINGERPRINT = bytes(FINGERPRINT_SIZE)
+
+# Valeur des colonnes entières pour un champ absent
+MISSING = -2 ** 63
+INT_MIN = MISSING + 1
+INT_MAX = 2 ** 63 - 1
+
+# Ensembles pour tester les champs d'un dictionnaire d'un coup
+BASE_FIELD_SET = frozenset(BASE_FIELDS)
+KNOWN_FIELDS = BASE_FIELD_SET | frozenset(FILE_FIELDS) | {SOURCE_FIELD, FINGERPRINT_FIELD,
+                                                           OFFSET_FIELD, OFFSET_SOURCE_FIELD,
+                                                           *PLACE_FIELDS}
+
+# Champs facultatifs rangés dans des colonnes s'ils suivent la localisation
+OPTIONAL_FIELDS = (OFFSET_FIELD, OFFSET_SOURCE_FIELD) + PLACE_FIELDS
+OPTIONAL_FIELD_SET = frozenset(OPTIONAL_FIELDS)
+
+# Marque des métadonnées gardées telles quelles dans les champs complémentaires
+_RAW = '__brut__'
+
+
+def maps_link(latitude, longitude):
+    """Lien Google Maps d'une position, tel que l'écrit l'extraction."""
+    if latitude and longitude:
+        return f"https://www.google.com/maps?q={latitude},{longitude}"
+    return None
+
+
+def split_path(filepath):
+    """
+    Sépare un chemin en dossier (avec son séparateur final) et nom de fichier.
+
+    Le chemin d'origine est toujours dossier + nom, quel que soit le
+    système qui l'a écrit.
+    """
+    cut = max(filepath.rfind('/'), filepath.rfind('\\')) + 1
+    return filepath[:cut], filepath[cut:]
+
+
+def _timestamp_of(date_creation, heure_creation):
+    """
+    Horodatage d'une date "JJ/MM/AAAA" et d'une heure "HH:MM:SS".
+
+    Seules les valeurs que _format_timestamp redonne à l'identique sont
+    converties (même résultat que photo_dates.capture_timestamp).
+
+    Returns:
+        int: Horodatage, ou None si la date doit être gardée telle quelle
+    """
+    if (type(date_creation) is not str or type(heure_creation) is not str
+            or len(date_creation) != 10 or len(heure_creation) != 8
+            or date_creation[2] != '/' or date_creation[5] != '/'
+            or heure_creation[2] != ':' or heure_creation[5] != ':'):
+        return None
+    digits = date_creation[:2] + date_creation[3:5] + date_creation[6:] + \
+        heure_creation[:2] + heure_creation[3:5] + heure_creation[6:]
+    if not (digits.isdigit() and digits.isascii()):
+        return None
+
+    day, month, year = int(digits[:2]), int(digits[2:4]), int(digits[4:8])
+    hour, minute, second = int(digits[8:10]), int(digits[10:12]), int(digits[12:])
+    if not _is_valid_datetime(year, month, day, hour, minute, second):
+        return None
+    return calendar.timegm((year, month, day, hour, minute, second, 0, 0, 0))
+
+
+def _format_timestamp(timestamp):
+    """
+    Reconvertit un horodatage en date et heure, sans passer par time.gmtime
+    (qui refuse les dates antérieures à 1970 sous Windows).
+
+    Returns:
+        tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS")
+    """
+    days, seconds = divmod(timestamp, 86400)
+    # Conversion jours -> date du calendrier grégorien (ères de 400 ans)
+    shifted = days + 719468
+    era = shifted // 146097
+    day_of_era = shifted - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4 - year_of_era // 100)
+    month_index = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month_index + 2) // 5 + 1
+    month = month_index + 3 if month_index < 10 else month_index - 9
+    year = year_of_era + era * 400 + (month <= 2)
+
+    hour, rest = divmod(seconds, 3600)
+    minute, second = divmod(rest, 60)
+    return f"{day:02d}/{month:02d}/{year:04d}", f"{hour:02d}:{minute:02d}:{second:02d}"
+
+
+def _is_int(value):
+    """Entier représentable dans une colonne (bool exclu)."""
+    return type(value) is int and INT_MIN <= value <= INT_MAX
+
+
+def _fingerprint_bytes(value):
+    """Empreinte hexadécimale sous forme binaire, ou None si elle ne se reconvertit pas à l'identique."""
+    if type(value) is not str or len(value) != FINGERPRINT_SIZE * 2:
+        return None
+    try:
+        data = bytes.fromhex(value)
+    except ValueError:
+        return None
+    return data if data.hex() == value and data != NO_FINGERPRINT else None
+
+
+def _optional_columns(metadata):
+    """
+    Décalage UTC, numéro de sa source et lieu, pour les colonnes.
+
+    Ces champs ne sont rangés dans les colonnes que s'ils suivent la
+    localisation, dans l'ordre de OPTIONAL_FIELDS, et se reconvertissent à
+    l'identique ; sinon ils restent dans les champs complémentaires.
+
+    Returns:
+        tuple: (minutes ou NO_OFFSET, numéro de la source, lieu ou None)
+    """
+    keys = list(metadata)
+    position = keys.index('localisation') + 1
+    offset, offset_source = NO_OFFSET, 0
+    if keys[position:position + 2] == [OFFSET_FIELD, OFFSET_SOURCE_FIELD]:
+        value = parse_offset(metadata[OFFSET_FIELD])
+        source = metadata[OFFSET_SOURCE_FIELD]
+        if (value is None or format_offset(value) != metadata[OFFSET_FIELD]
+                or type(source) is not str or source not in OFFSET_SOURCE_CODES):
+            # Le lieu éventuel doit rester après le décalage
+            return NO_OFFSET, 0, None
+        offset, offset_source = value, OFFSET_SOURCE_CODES[source]
+        position += 2
+
+    place = None
+    if keys[position:position + 3] == list(PLACE_FIELDS):
+        value = tuple(metadata[key] for key in PLACE_FIELDS)
+        if all(item is None or type(item) is str for item in value):
+            place = value
+    return offset, offset_source, place
+
+
+def _is_coordinate(value):
+    """Coordonnée représentable dans une colonne (None ou flottant fini)."""
+    return value is None or (type(value) is float and not math.isnan(value))
+
+
+class _RecordItems(ItemsView):
+    """Parcours des couples (chemin, métadonnées) sans recherche par chemin."""
+
+    def __iter__(self):
+        mapping = self._mapping
+        directories = mapping._directories
+        directory_of = mapping._directory_of
+        for position, name in enumerate(mapping._names):
+            if name is not None:
+                yield directories[directory_of[position]] + name, mapping._decode(position)
+
+
+class PhotoRecords(MutableMapping):
+    """
+    Dictionnaire compact chemin -> métadonnées.
+
+    L'ordre d'insertion est conservé, comme pour un dictionnaire. Un
+    dictionnaire lu dans la collection est une copie : le modifier ne
+    change pas la collection (il faut le réaffecter).
+    """
+
+    def __init__(self, items=None):
+        """
+        Args:
+            items: Dictionnaire ou itérable de couples (chemin, métadonnées)
+        """
+        # Table des dossiers
+        self._directories = []
+        self._directory_ids = {}
+        # Par dossier : nom de fichier -> position dans les colonnes
+        self._positions = []
+
+        # Colonnes, une case par photo (nom None : photo supprimée)
+        self._names = []
+        self._directory_of = array('L')
+        self._timestamps = array('q')
+        self._date_sources = array('b')
+        self._latitudes = array('d')
+        self._longitudes = array('d')
+        self._sizes = array('q')
+        self._mtimes = array('q')
+        # Décalage UTC en minutes (NO_OFFSET : absent) et numéro de sa source
+        self._offsets = array('h')
+        self._offset_sources = array('b')
+        # Numéro du lieu dans la table des lieux (NO_PLACE : absent)
+        self._place_of = array('l')
+        self._places = []
+        self._place_ids = {}
+        # FINGERPRINT_SIZE octets par photo (NO_FINGERPRINT : absente)
+        self._fingerprints = bytearray()
+        # Position -> champs qui ne se déduisent pas des colonnes (erreur,
+        # date non reconnue, nom différent du fichier...)
+        self._extras = {}
+        self._deleted = 0
+
+        if items is not None:
+            self.update(items)
+
+    def _locate(self, filepath, create=False):
+        """Renvoie (numéro du dossier, nom) d'un chemin, ou None s'il est inconnu."""
+        directory, name = split_path(filepath)
+        directory_id = self._directory_ids.get(directory)
+        if directory_id is None:
+            if not create:
+                return None
+            directory_id = len(self._directories)
+            self._directories.append(directory)
+            self._directory_ids[directory] = directory_id
+            self._positions.append({})
+        return directory_id, name
+
+    def _position(self, filepath):
+        """Position d'un chemin dans les colonnes, ou None."""
+        location = self._locate(filepath)
+        if location is None:
+            return None
+        directory_id, name = location
+        return self._positions[directory_id].get(name)
+
+    def _encode(self, position, name, metadata):
+        """Range les métadonnées d'une photo dans les colonnes, à une position."""
+        extra = {}
+        if not metadata.keys() <= KNOWN_FIELDS:
+            for key, value in metadata.items():
+                if key not in KNOWN_FIELDS:
+                    extra[key] = value
+
+        timestamp = MISSING
+        date_source = SOURCE_ABSENT
+        latitude = longitude = math.nan
+        size = mtime_ns = MISSING
+        offset, offset_source = NO_OFFSET, 0
+        place_id = NO_PLACE
+        fingerprint = NO_FINGERPRINT
+
+        if not BASE_FIELD_SET <= metadata.keys():
+            # Métadonnées incomplètes : garder le dictionnaire tel quel
+            extra = dict(metadata)
+            extra[_RAW] = True
+        else:
+            if metadata['nom'] != name:
+                extra['nom'] = metadata['nom']
+
+            date_creation = metadata['date_creation']
+            heure_creation = metadata['heure_creation']
+            if date_creation is not None or heure_creation is not None:
+                value = _timestamp_of(date_creation, heure_creation)
+                if value is not None:
+                    timestamp = value
+                else:
+                    extra['date_creation'] = date_creation
+                    extra['heure_creation'] = heure_creation
+
+            if SOURCE_FIELD in metadata:
+                source = metadata[SOURCE_FIELD]
+                if source is None:
+                    date_source = SOURCE_NONE
+                elif type(source) is str and source in SOURCE_CODES:
+                    date_source = SOURCE_CODES[source]
+                else:
+                    date_source = SOURCE_OTHER
+                    extra[SOURCE_FIELD] = source
+
+            gps_latitude = metadata['gps_latitude']
+            gps_longitude = metadata['gps_longitude']
+            if _is_coordinate(gps_latitude) and _is_coordinate(gps_longitude):
+                if gps_latitude is not None:
+                    latitude = gps_latitude
+                if gps_longitude is not None:
+                    longitude = gps_longitude
+            else:
+                extra['gps_latitude'] = gps_latitude
+                extra['gps_longitude'] = gps_longitude
+            if metadata['localisation'] != maps_link(gps_latitude, gps_longitude):
+                extra['localisation'] = metadata['localisation']
+
+            if not OPTIONAL_FIELD_SET.isdisjoint(metadata):
+                offset, offset_source, place = _optional_columns(metadata)
+                stored = OPTIONAL_FIELDS[:2] if offset != NO_OFFSET else ()
+                if place is not None:
+                    stored += PLACE_FIELDS
+                    place_id = self._place_ids.get(place)
+                    if place_id is None:
+                        place_id = len(self._places)
+                        self._places.append(place)
+                        self._place_ids[place] = place_id
+                for key in metadata:
+                    if key in OPTIONAL_FIELD_SET and key not in stored:
+                        extra[key] = metadata[key]
+
+            if FINGERPRINT_FIELD in metadata:
+                value = _fingerprint_bytes(metadata[FINGERPRINT_FIELD])
+                if value is not None:
+                    fingerprint = value
+                else:
+                    extra[FINGERPRINT_FIELD] = metadata[FINGERPRINT_FIELD]
+
+            for key in FILE_FIELDS:
+                if key in metadata:
+                    if _is_int(metadata[key]):
+                        if key == 'taille':
+                            size = metadata[key]
+                        else:
+                            mtime_ns = metadata[key]
+                    else:
+                        extra[key] = metadata[key]
+
+        if position == len(self._names):
+            self._timestamps.append(timestamp)
+            self._date_sources.append(date_source)
+            self._latitudes.append(latitude)
+            self._longitudes.append(longitude)
+            self._sizes.append(size)
+            self._mtimes.append(mtime_ns)
+            self._offsets.append(offset)
+            self._offset_sources.append(offset_source)
+            self._place_of.append(place_id)
+            self._fingerprints += fingerprint
+        else:
+            self._timestamps[position] = timestamp
+            self._date_sources[position] = date_source
+            self._latitudes[position] = latitude
+            self._longitudes[position] = longitude
+            self._sizes[position] = size
+            self._mtimes[position] = mtime_ns
+            self._offsets[position] = offset
+            self._offset_sources[position] = offset_source
+            self._place_of[position] = place_id
+            start = position * FINGERPRINT_SIZE
+            self._fingerprints[start:start + FINGERPRINT_SIZE] = fingerprint
+
+        if extra:
+            self._extras[position] = extra
+        else:
+            self._extras.pop(position, None)
+
+    def _decode(self, position):
+        """
+        Reconstruit les métadonnées d'une photo au format des fichiers JSON.
+
+        Returns:
+            dict: Nouveau dictionnaire
+        """
+        extra = self._extras.get(position, {})
+        if _RAW in extra:
+            return {key: value for key, value in extra.items() if key != _RAW}
+
+        timestamp = self._timestamps[position]
+        if timestamp != MISSING:
+            date_creation, heure_creation = _format_timestamp(timestamp)
+        else:
+            date_creation = extra.get('date_creation')
+            heure_creation = extra.get('heure_creation')
+
+        latitude = self._latitudes[position]
+        longitude = self._longitudes[position]
+        latitude = extra.get('gps_latitude', None if math.isnan(latitude) else latitude)
+        longitude = extra.get('gps_longitude', None if math.isnan(longitude) else longitude)
+
+        metadata = {
+            'nom': extra.get('nom', self._names[position]),
+            'date_creation': date_creation,
+            'heure_creation': heure_creation
+        }
+        date_source = self._date_sources[position]
+        if date_source >= 0:
+            metadata[SOURCE_FIELD] = DATE_SOURCES[date_source]
+        elif date_source == SOURCE_NONE:
+            metadata[SOURCE_FIELD] = None
+        elif date_source == SOURCE_OTHER:
+            metadata[SOURCE_FIELD] = extra[SOURCE_FIELD]
+        metadata['gps_latitude'] = latitude
+        metadata['gps_longitude'] = longitude
+        metadata['localisation'] = extra.get('localisation', maps_link(latitude, longitude))
+        offset = self._offsets[position]
+        if offset != NO_OFFSET:
+            metadata[OFFSET_FIELD] = format_offset(offset)
+            metadata[OFFSET_SOURCE_FIELD] = OFFSET_SOURCES[self._offset_sources[position]]
+        place_id = self._place_of[position]
+        if place_id != NO_PLACE:
+            metadata.update(zip(PLACE_FIELDS, self._places[place_id]))
+        for key, value in extra.items():
+            if key not in metadata and key not in FILE_FIELDS:
+                metadata[key] = value
+        start = position * FINGERPRINT_SIZE
+        fingerprint = self._fingerprints[start:start + FINGERPRINT_SIZE]
+        if fingerprint != NO_FINGERPRINT:
+            metadata[FINGERPRINT_FIELD] = fingerprint.hex()
+
+        if self._sizes[position] != MISSING:
+            metadata['taille'] = self._sizes[position]
+        elif 'taille' in extra:
+            metadata['taille'] = extra['taille']
+        if self._mtimes[position] != MISSING:
+            metadata['mtime_ns'] = self._mtimes[position]
+        elif 'mtime_ns' in extra:
+            metadata['mtime_ns'] = extra['mtime_ns']
+        return metadata
+
+    def __setitem__(self, filepath, metadata):
+        directory_id, name = self._locate(filepath, create=True)
+        positions = self._positions[directory_id]
+        position = positions.get(name)
+        if position is None:
+            position = len(self._names)
+            self._encode(position, name, metadata)
+            positions[name] = position
+            self._names.append(name)
+            self._directory_of.append(directory_id)
+        else:
+            self._encode(position, name, metadata)
+
+    def __getitem__(self, filepath):
+        position = self._position(filepath)
+        if position is None:
+            raise KeyError(filepath)
+        return self._decode(position)
+
+    def __contains__(self, filepath):
+        return self._position(filepath) is not None
+
+    def __delitem__(self, filepath):
+        position = self._position(filepath)
+        if position is None:
+            raise KeyError(filepath)
+        name = self._names[position]
+        del self._positions[self._directory_of[position]][name]
+        self._names[position] = None
+        self._extras.pop(position, None)
+        self._deleted += 1
+
+    def __iter__(self):
+        directories = self._directories
+        directory_of = self._directory_of
+        for position, name in enumerate(self._names):
+            if name is not None:
+                yield directories[directory_of[position]] + name
+
+    def __len__(self):
+        return len(self._names) - self._deleted
+
+    def items(self):
+        return _RecordItems(self)
+
+    def timestamp(self, filepath):
+        """
+        Horodatage de prise de vue d'une photo, sans conversion.
+
+        Returns:
+            int: Horodatage (voir photo_dates), ou None
+        """
+        position = self._position(filepath)
+        if position is None:
+            raise KeyError(filepath)
+        timestamp = self._timestamps[position]
+        return None if timestamp == MISSING else timestamp
+
+    def iter_positions(self):
+        """
+        Parcourt les photos sans reconstruire leurs métadonnées (pour les
+        index de photo_query).
+
+        Yields:
+            tuple: (position, horodatage ou None, latitude ou None,
+                longitude ou None) ; entry redonne la photo d'une position
+        """
+        timestamps, latitudes, longitudes = self._timestamps, self._latitudes, self._longitudes
+        extras = self._extras
+        for position, name in enumerate(self._names):
+            if name is None:
+                continue
+            timestamp = timestamps[position]
+            if timestamp == MISSING:
+                extra = extras.get(position, {})
+                timestamp = capture_timestamp(extra.get('date_creation'), extra.get('heure_creation'))
+            latitude, longitude = latitudes[position], longitudes[position]
+            if math.isnan(latitude) or math.isnan(longitude):
+                latitude = longitude = None
+            yield position, timestamp, latitude, longitude
+
+    def entry(self, position):
+        """
+        Photo rangée à une position donnée par iter_positions.
+
+        Returns:
+            tuple: (chemin, métadonnées)
+        """
+        filepath = self._directories[self._directory_of[position]] + self._names[position]
+        return filepath, self._decode(position)
+
+    def directory_count(self):
+        """Nombre de dossiers distincts dans la table des dossiers."""
+        return len(self._directories)
+
+    def __repr__(self):
+        return f"<PhotoRecords: {len(self)} photos, {len(self._directories)} dossiers>"
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Mesures détaillées d'une extraction ou d'une restauration.
+
+Activées avec SimplePhotoMetadata(..., instrument=True), elles indiquent où
+passe le temps d'un traitement lent : durée de chaque étape (parcours,
+lecture des EXIF, piexif, écriture...), octets lus et écrits, photos par
+seconde, erreurs par type d'exception et photos les plus lentes.
+
+Exemple :
+    manager = SimplePhotoMetadata(dossier, instrument=True)
+    manager.scan_directory()
+    print(manager.stats.to_json())
+    Path("mesures.prom").write_text(manager.stats.to_prometheus())
+"""
+
+import heapq
+import json
+import threading
+import time
+from collections import Counter
+
+
+# Nombre de photos les plus lentes conservées
+DEFAULT_SLOWEST_COUNT = 10
+
+# Préfixe des métriques au format Prometheus
+PROMETHEUS_PREFIX = 'metadata_photo'
+
+
+class _StageTimer:
+    """Chronomètre d'une étape, utilisé comme gestionnaire de contexte."""
+
+    __slots__ = ('stats', 'stage', 'start')
+
+    def __init__(self, stats, stage):
+        self.stats = stats
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats.add_time(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class ProcessingStats:
+    """
+    Compteurs et chronomètres d'un traitement.
+
+    Les méthodes peuvent être appelées depuis plusieurs threads.
+    """
+
+    def __init__(self, operation='traitement', slowest_count=DEFAULT_SLOWEST_COUNT):
+        """
+        Args:
+            operation (str): Nom du traitement mesuré ('extraction'...)
+            slowest_count (int): Nombre de photos les plus lentes conservées
+        """
+        self.operation = operation
+        self.slowest_count = slowest_count
+        # Étape -> [nombre de passages, durée totale]
+        self.stages = {}
+        self.counters = Counter()
+        self.errors = Counter()
+        # Tas (durée, chemin) des photos les plus lentes
+        self._slowest = []
+        self.started = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # Le verrou ne peut pas être transmis aux processus d'extraction
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def timer(self, stage):
+        """
+        Chronomètre une étape : with stats.timer('lecture_exif'): ...
+
+        Args:
+            stage (str): Nom de l'étape
+        """
+        return _StageTimer(self, stage)
+
+    def add_time(self, stage, seconds, calls=1):
+        """Ajoute une durée (en secondes) à une étape."""
+        with self._lock:
+            totals = self.stages.get(stage)
+            if totals is None:
+                self.stages[stage] = [calls, seconds]
+            else:
+                totals[0] += calls
+                totals[1] += seconds
+
+    def timed_iter(self, iterable, stage):
+        """
+        Parcourt un itérable en chronométrant chaque élément fourni.
+
+        Yields:
+            Éléments de l'itérable
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add_time(stage, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, value=1):
+        """Ajoute une valeur à un compteur ('octets_lus', 'fichiers'...)."""
+        with self._lock:
+            self.counters[name] += value
+
+    def error(self, exception):
+        """Compte une erreur, par type d'exception."""
+        with self._lock:
+            self.errors[type(exception).__name__] += 1
+
+    def file_done(self, filepath, seconds):
+        """
+        Compte une photo traitée et garde les plus lentes.
+
+        Args:
+            filepath (str | Path): Chemin de la photo
+            seconds (float): Durée de son traitement
+        """
+        with self._lock:
+            self.counters['fichiers'] += 1
+            entry = (seconds, str(filepath))
+            if len(self._slowest) < self.slowest_count:
+                heapq.heappush(self._slowest, entry)
+            elif entry > self._slowest[0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def merge(self, other):
+        """Ajoute les mesures d'un autre objet (par exemple d'un processus d'extraction)."""
+        with self._lock:
+            for stage, (calls, seconds) in other.stages.items():
+                totals = self.stages.setdefault(stage, [0, 0.0])
+                totals[0] += calls
+                totals[1] += seconds
+            self.counters.update(other.counters)
+            self.errors.update(other.errors)
+            for entry in other._slowest:
+                if len(self._slowest) < self.slowest_count:
+                    heapq.heappush(self._slowest, entry)
+                elif entry > self._slowest[0]:
+                    heapq.heapreplace(self._slowest, entry)
+
+    def finish(self):
+        """Arrête le chronomètre du traitement."""
+        self.duration = time.perf_counter() - self.started
+
+    @property
+    def elapsed(self):
+        """Durée du traitement (jusqu'à maintenant s'il n'est pas terminé)."""
+        return self.duration if self.duration is not None else time.perf_counter() - self.started
+
+    @property
+    def slowest(self):
+        """Photos les plus lentes : liste de (durée, chemin), la plus lente en premier."""
+        with self._lock:
+            return sorted(self._slowest, reverse=True)
+
+    def as_dict(self):
+        """
+        Mesures sous forme de dictionnaire sérialisable en JSON.
+
+        Returns:
+            dict: Durée, débit, étapes, compteurs, erreurs et photos lentes
+        """
+        elapsed = self.elapsed
+        with self._lock:
+            stages = {
+                stage: {
+                    'appels': calls,
+                    'duree_s': round(seconds, 6),
+                    'duree_moyenne_ms': round(seconds / calls * 1000, 3) if calls else 0.0
+                }
+                for stage, (calls, seconds) in sorted(self.stages.items(), key=lambda item: -item[1][1])
+            }
+            counters = dict(self.counters)
+            errors = dict(self.errors)
+        files = counters.get('fichiers', 0)
+        return {
+            'operation': self.operation,
+            'duree_s': round(elapsed, 6),
+            'fichiers': files,
+            'fichiers_par_s': round(files / elapsed, 1) if elapsed else None,
+            'octets_lus': counters.get('octets_lus', 0),
+            'octets_ecrits': counters.get('octets_ecrits', 0),
+            'compteurs': counters,
+            'etapes': stages,
+            'erreurs': errors,
+            'plus_lentes': [{'fichier': filepath, 'duree_s': round(seconds, 6)}
+                            for seconds, filepath in self.slowest]
+        }
+
+    def to_json(self, indent=2):
+        """Mesures au format JSON."""
+        return json.dumps(self.as_dict(), indent=indent, ensure_ascii=False)
+
+    def to_prometheus(self, prefix=PROMETHEUS_PREFIX):
+        """
+        Mesures au format texte de Prometheus (node_exporter textfile, pushgateway).
+
+        Args:
+            prefix (str): Préfixe des noms de métriques
+
+        Returns:
+            str: Métriques, une par ligne
+        """
+        data = self.as_dict()
+        labels = {'operation': data['operation']}
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for extra_labels, value in samples:
+                all_labels = {**labels, **extra_labels}
+                label_text = ','.join(f'{key}="{_escape_label(text)}"' for key, text in all_labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+
+        metric('duration_seconds', 'gauge', "Duree du traitement",
+               [({}, data['duree_s'])])
+        metric('files_total', 'counter', "Photos traitees",
+               [({}, data['fichiers'])])
+        metric('files_per_second', 'gauge', "Photos traitees par seconde",
+               [({}, data['fichiers_par_s'] or 0)])
+        metric('read_bytes_total', 'counter', "Octets lus",
+               [({}, data['octets_lus'])])
+        metric('written_bytes_total', 'counter', "Octets ecrits",
+               [({}, data['octets_ecrits'])])
+        metric('stage_seconds_total', 'counter', "Temps passe dans chaque etape",
+               [({'stage': stage}, values['duree_s']) for stage, values in data['etapes'].items()])
+        metric('stage_calls_total', 'counter', "Passages dans chaque etape",
+               [({'stage': stage}, values['appels']) for stage, values in data['etapes'].items()])
+        metric('errors_total', 'counter', "Erreurs par type d'exception",
+               [({'type': name}, count) for name, count in data['erreurs'].items()])
+        metric('slowest_file_seconds', 'gauge', "Photos les plus lentes",
+               [({'file': entry['fichier']}, entry['duree_s']) for entry in data['plus_lentes']])
+        return "\n".join(lines) + "\n"
+
+    def write(self, output_path):
+        """
+        Écrit les mesures dans un fichier : format Prometheus pour un fichier
+        .prom, JSON sinon.
+
+        Args:
+            output_path (str | Path): Fichier à écrire
+        """
+        output_path = str(output_path)
+        content = self.to_prometheus() if output_path.endswith('.prom') else self.to_json() + "\n"
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+
+def _escape_label(value):
+    """Échappe une valeur d'étiquette Prometheus."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
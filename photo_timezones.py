@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Décalage horaire (UTC) des photos.
+
+Les dates EXIF sont en heure locale de l'appareil, sans fuseau : deux
+photos d'un voyage prises dans des fuseaux différents ne se trient pas
+correctement. Le décalage de chaque photo est déduit, dans l'ordre :
+- des balises EXIF OffsetTimeOriginal, OffsetTimeDigitized ou OffsetTime
+  (celle qui accompagne la date retenue), écrites par les appareils récents ;
+- de la position GPS, par le fuseau horaire qui la contient (polygones des
+  fuseaux, voir TimezonePolygons) et ses règles d'heure d'été (zoneinfo) ;
+- sans polygones, de la longitude seule (heure nautique, une heure par
+  tranche de 15°) : approximation à vérifier sur terre ;
+- pour une date lue dans le système de fichiers, du fuseau de l'ordinateur,
+  même si la photo est géolocalisée.
+
+Le décalage est enregistré en texte ("+02:00", champ decalage_utc) avec sa
+source (source_decalage) ; utc_timestamp en déduit un horodatage commun à
+toutes les photos.
+"""
+
+import json
+import math
+from datetime import datetime, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+    ZoneInfoNotFoundError = KeyError
+
+from photo_dates import capture_timestamp
+
+
+OFFSET_FIELD = 'decalage_utc'
+OFFSET_SOURCE_FIELD = 'source_decalage'
+
+# Sources possibles du décalage
+OFFSET_SOURCES = ('exif', 'fuseau', 'longitude', 'systeme')
+
+# Polygones des fuseaux horaires cherchés par défaut (GeoJSON de
+# timezone-boundary-builder, propriété 'tzid'), à placer à côté des scripts
+DEFAULT_POLYGON_FILE = Path(__file__).with_name('fuseaux_horaires.json')
+
+# Taille en degrés des cases de la grille des polygones
+GRID_SIZE = 1.0
+
+# Hauteur en degrés des bandes de latitude des côtés d'un polygone
+BAND_SIZE = 0.05
+
+# Positions gardées en cache (arrondies à 1e-4 degré, ~10 m)
+CACHE_SIZE = 65536
+CACHE_PRECISION = 4
+
+# Décalages extrêmes en minutes (UTC-12 à UTC+14)
+MIN_OFFSET = -12 * 60
+MAX_OFFSET = 14 * 60
+
+
+def parse_offset(value):
+    """
+    Lit un décalage "+02:00", "-0530" ou "Z".
+
+    Args:
+        value (str | bytes): Valeur (par exemple balise EXIF OffsetTimeOriginal)
+
+    Returns:
+        int: Décalage en minutes, ou None s'il n'est pas reconnu
+    """
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    if not isinstance(value, str):
+        return None
+    value = value.strip(' \x00')
+    if value in ('Z', '+00:00', '-00:00'):
+        return 0
+    if len(value) not in (5, 6) or value[0] not in '+-':
+        return None
+    digits = value[1:].replace(':', '', 1) if len(value) == 6 else value[1:]
+    if len(value) == 6 and value[3] != ':':
+        return None
+    if len(digits) != 4 or not (digits.isdigit() and digits.isascii()):
+        return None
+    hours, minutes = int(digits[:2]), int(digits[2:])
+    if minutes > 59:
+        return None
+    offset = hours * 60 + minutes
+    offset = -offset if value[0] == '-' else offset
+    return offset if MIN_OFFSET <= offset <= MAX_OFFSET else None
+
+
+def format_offset(minutes):
+    """Écrit un décalage en minutes sous la forme "+02:00"."""
+    sign = '-' if minutes < 0 else '+'
+    hours, rest = divmod(abs(minutes), 60)
+    return f"{sign}{hours:02d}:{rest:02d}"
+
+
+def utc_timestamp(metadata):
+    """
+    Horodatage UTC d'une photo, pour trier des photos de fuseaux différents.
+
+    Args:
+        metadata (dict): Métadonnées (date_creation, heure_creation, decalage_utc)
+
+    Returns:
+        int: Horodatage UTC, ou None si la date ou le décalage manque
+    """
+    timestamp = capture_timestamp(metadata.get('date_creation'), metadata.get('heure_creation'))
+    offset = parse_offset(metadata.get(OFFSET_FIELD))
+    if timestamp is None or offset is None:
+        return None
+    return timestamp - offset * 60
+
+
+@lru_cache(maxsize=None)
+def _zone(tzid):
+    """Fuseau zoneinfo d'un identifiant, ou None s'il est inconnu."""
+    if ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(tzid)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def zone_offset(tzid, date_creation, heure_creation):
+    """
+    Décalage d'un fuseau à une date locale, heure d'été comprise.
+
+    Args:
+        tzid (str): Identifiant du fuseau ("Europe/Paris")
+        date_creation (str): Date "JJ/MM/AAAA"
+        heure_creation (str): Heure "HH:MM:SS" (ou None pour midi)
+
+    Returns:
+        int: Décalage en minutes, ou None (fuseau ou date inconnus)
+    """
+    zone = _zone(tzid)
+    timestamp = capture_timestamp(date_creation, heure_creation or '12:00:00')
+    if zone is None or timestamp is None:
+        return None
+    local = datetime(1970, 1, 1) + timedelta(seconds=timestamp)
+    return int(local.replace(tzinfo=zone).utcoffset().total_seconds() // 60)
+
+
+def longitude_offset(longitude):
+    """Décalage de l'heure nautique d'une longitude (une heure par 15°)."""
+    return max(-12, min(12, round(longitude / 15))) * 60
+
+
+def system_offset(date_creation, heure_creation):
+    """
+    Décalage du fuseau de l'ordinateur à une date locale.
+
+    Sert aux dates lues dans le système de fichiers, converties en heure
+    locale de l'ordinateur par datetime.fromtimestamp.
+
+    Returns:
+        int: Décalage en minutes, ou None si la date est invalide
+    """
+    timestamp = capture_timestamp(date_creation, heure_creation)
+    if timestamp is None:
+        return None
+    local = datetime(1970, 1, 1) + timedelta(seconds=timestamp)
+    try:
+        return int(local.astimezone().utcoffset().total_seconds() // 60)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+class TimezonePolygons:
+    """
+    Recherche du fuseau horaire d'une position, hors ligne.
+
+    Les polygones sont rangés dans une grille de cases de GRID_SIZE degrés :
+    une position n'est comparée qu'aux polygones dont le rectangle englobant
+    touche sa case. Les côtés de chaque polygone sont rangés par bandes de
+    latitude : le test d'appartenance (nombre de côtés traversés par une
+    demi-droite) ne parcourt que les côtés de la bande de la position.
+    """
+
+    def __init__(self, zones):
+        """
+        Args:
+            zones: Itérable de (identifiant du fuseau, liste de polygones),
+                chaque polygone étant une liste d'anneaux de (longitude,
+                latitude) ; le premier anneau est le contour, les suivants
+                des trous
+        """
+        self.zone_ids = []
+        # Par polygone : (numéro du fuseau, rectangle englobant, bandes)
+        self._parts = []
+        self._grid = {}
+        for tzid, polygons in zones:
+            zone_number = len(self.zone_ids)
+            self.zone_ids.append(tzid)
+            for rings in polygons:
+                self._add_polygon(zone_number, rings)
+        self.lookup = lru_cache(maxsize=CACHE_SIZE)(self._lookup)
+
+    @classmethod
+    def load(cls, polygon_file):
+        """
+        Lit les polygones d'un fichier GeoJSON (FeatureCollection dont chaque
+        élément porte la propriété 'tzid', comme ceux de timezone-boundary-builder).
+
+        Raises:
+            ValueError: Si le fichier n'a pas cette structure
+        """
+        with open(polygon_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get('features'), list):
+            raise ValueError(f"{Path(polygon_file).name} n'est pas une FeatureCollection GeoJSON")
+
+        def zones():
+            for feature in data['features']:
+                tzid = (feature.get('properties') or {}).get('tzid')
+                geometry = feature.get('geometry') or {}
+                if not tzid:
+                    continue
+                if geometry.get('type') == 'Polygon':
+                    yield tzid, [geometry['coordinates']]
+                elif geometry.get('type') == 'MultiPolygon':
+                    yield tzid, geometry['coordinates']
+
+        return cls(zones())
+
+    def _add_polygon(self, zone_number, rings):
+        """Range les côtés d'un polygone par bandes de latitude et l'inscrit dans la grille."""
+        bands = {}
+        min_lon = min_lat = math.inf
+        max_lon = max_lat = -math.inf
+        for ring in rings:
+            for (x1, y1), (x2, y2) in zip(ring, ring[1:] + ring[:1]):
+                min_lon, max_lon = min(min_lon, x1), max(max_lon, x1)
+                min_lat, max_lat = min(min_lat, y1), max(max_lat, y1)
+                if y1 == y2:
+                    # Côté horizontal : jamais traversé par la demi-droite
+                    continue
+                edge = (min(y1, y2), max(y1, y2), x1, y1, (x2 - x1) / (y2 - y1))
+                for band in range(math.floor(edge[0] / BAND_SIZE), math.floor(edge[1] / BAND_SIZE) + 1):
+                    bands.setdefault(band, []).append(edge)
+        if not bands:
+            return
+
+        part = len(self._parts)
+        self._parts.append((zone_number, (min_lon, min_lat, max_lon, max_lat), bands))
+        for row in range(math.floor(min_lat / GRID_SIZE), math.floor(max_lat / GRID_SIZE) + 1):
+            for column in range(math.floor(min_lon / GRID_SIZE), math.floor(max_lon / GRID_SIZE) + 1):
+                self._grid.setdefault((row, column), []).append(part)
+
+    def __getstate__(self):
+        # Le cache de lookup ne peut pas être transmis aux processus d'extraction
+        state = self.__dict__.copy()
+        del state['lookup']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lookup = lru_cache(maxsize=CACHE_SIZE)(self._lookup)
+
+    def __len__(self):
+        return len(self.zone_ids)
+
+    def _contains(self, bands, latitude, longitude):
+        """Indique si un point est dans un polygone (règle pair-impair)."""
+        inside = False
+        for low, high, x1, y1, slope in bands.get(math.floor(latitude / BAND_SIZE), ()):
+            if low <= latitude < high and longitude < x1 + (latitude - y1) * slope:
+                inside = not inside
+        return inside
+
+    def _lookup(self, latitude, longitude):
+        """Voir lookup (sans cache)."""
+        for part in self._grid.get((math.floor(latitude / GRID_SIZE),
+                                    math.floor(longitude / GRID_SIZE)), ()):
+            zone_number, (min_lon, min_lat, max_lon, max_lat), bands = self._parts[part]
+            if (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon
+                    and self._contains(bands, latitude, longitude)):
+                return self.zone_ids[zone_number]
+        return None
+
+    def zone_at(self, latitude, longitude):
+        """
+        Fuseau horaire d'une position.
+
+        Args:
+            latitude (float): Latitude en degrés
+            longitude (float): Longitude en degrés
+
+        Returns:
+            str: Identifiant du fuseau ("Europe/Paris"), ou None hors des polygones
+        """
+        return self.lookup(round(latitude, CACHE_PRECISION), round(longitude, CACHE_PRECISION))
+
+
+class TimezoneResolver:
+    """Déduit le décalage UTC d'une photo (voir le début du module)."""
+
+    def __init__(self, polygons=None):
+        """
+        Args:
+            polygons (TimezonePolygons): Polygones des fuseaux, ou None pour
+                n'utiliser que la longitude
+        """
+        self.polygons = polygons
+
+    @classmethod
+    def from_file(cls, polygon_file=None):
+        """
+        Crée un résolveur avec les polygones d'un fichier GeoJSON.
+
+        Args:
+            polygon_file (str | Path): Fichier des polygones ; par défaut
+                DEFAULT_POLYGON_FILE s'il existe, sinon la longitude seule
+        """
+        if polygon_file is None:
+            if not DEFAULT_POLYGON_FILE.exists():
+                return cls()
+            polygon_file = DEFAULT_POLYGON_FILE
+        return cls(TimezonePolygons.load(polygon_file))
+
+    def resolve(self, metadata, exif_offset=None):
+        """
+        Décalage UTC d'une photo.
+
+        Args:
+            metadata (dict): Métadonnées extraites (date, source, GPS)
+            exif_offset (str | bytes): Balise EXIF de décalage de la date retenue
+
+        Returns:
+            tuple: (décalage en minutes, source), ou (None, None)
+        """
+        offset = parse_offset(exif_offset) if exif_offset else None
+        if offset is not None:
+            return offset, 'exif'
+
+        date_creation = metadata.get('date_creation')
+        heure_creation = metadata.get('heure_creation')
+        if metadata.get('source_date') == 'fichier':
+            # Date déjà à l'heure de l'ordinateur, quel que soit le lieu de la photo
+            offset = system_offset(date_creation, heure_creation)
+            return (offset, 'systeme') if offset is not None else (None, None)
+
+        latitude = metadata.get('gps_latitude')
+        longitude = metadata.get('gps_longitude')
+        if date_creation and latitude is not None and longitude is not None:
+            if self.polygons is not None:
+                tzid = self.polygons.zone_at(latitude, longitude)
+                offset = zone_offset(tzid, date_creation, heure_creation) if tzid else None
+                if offset is not None:
+                    return offset, 'fuseau'
+            return longitude_offset(longitude), 'longitude'
+        return None, None
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Parcours rapide d'un dossier de photos avec os.scandir.
+
+Les informations de type et de taille fournies par scandir sont réutilisées,
+les fichiers sont filtrés sur leur extension avant toute autre opération et
+les photos sont fournies au fur et à mesure du parcours. Comme Path.rglob,
+le parcours suit les liens symboliques vers des dossiers (chaque dossier
+n'est parcouru qu'une fois, ce qui évite les boucles).
+"""
+
+import os
+import stat
+from fnmatch import fnmatch
+
+from photo_log import get_logger
+
+
+logger = get_logger()
+
+# Dossiers créés par les systèmes ou les NAS, jamais parcourus
+SYSTEM_DIRECTORIES = {
+    '$RECYCLE.BIN',
+    'System Volume Information',
+    '@eaDir',
+    '#recycle',
+    '__MACOSX',
+}
+
+# Attributs Windows des fichiers cachés et système
+HIDDEN_ATTRIBUTES = (
+    getattr(stat, 'FILE_ATTRIBUTE_HIDDEN', 2) | getattr(stat, 'FILE_ATTRIBUTE_SYSTEM', 4)
+)
+
+
+def _is_hidden(entry):
+    """Indique si une entrée est cachée (nom en '.' ou attribut Windows)."""
+    if entry.name.startswith('.'):
+        return True
+    if os.name == 'nt':
+        try:
+            # Sous Windows, stat() d'une entrée scandir ne coûte rien
+            return bool(entry.stat(follow_symlinks=False).st_file_attributes & HIDDEN_ATTRIBUTES)
+        except OSError:
+            return False
+    return False
+
+
+def _matches(relative_path, patterns):
+    """Indique si un chemin relatif correspond à l'un des motifs glob."""
+    return any(fnmatch(relative_path, pattern) for pattern in patterns)
+
+
+def iter_photo_files(root, extensions, include=None, exclude=None, skip_hidden=False):
+    """
+    Parcourt un dossier et ses sous-dossiers à la recherche de photos.
+
+    Les dossiers sont parcourus en profondeur ; dans chaque dossier, les
+    fichiers puis les sous-dossiers sont pris dans l'ordre alphabétique,
+    pour que deux parcours du même dossier donnent le même ordre.
+
+    Args:
+        root (str | Path): Dossier à parcourir
+        extensions (set): Extensions acceptées, en minuscules avec le point
+        include (list): Motifs glob (chemin relatif avec '/') que les
+            fichiers doivent respecter, par exemple ['2021/*']
+        exclude (list): Motifs glob des fichiers et dossiers à ignorer
+        skip_hidden (bool): Ignorer aussi les fichiers et dossiers cachés
+            (nom en '.', attribut caché ou système sous Windows) ; les
+            dossiers de SYSTEM_DIRECTORIES sont toujours ignorés
+
+    Yields:
+        tuple: (chemin du fichier, os.stat_result)
+    """
+    include = include or []
+    exclude = exclude or []
+    root = os.fspath(root)
+    pending = [(root, '')]
+    # Dossiers déjà parcourus (périphérique, inode), pour les liens en boucle
+    visited = set()
+
+    while pending:
+        directory, relative_directory = pending.pop()
+        try:
+            directory_stat = os.stat(directory)
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError as e:
+            logger.warning("Dossier inaccessible ignore: %s (%s)", directory, e)
+            continue
+        directory_key = (directory_stat.st_dev, directory_stat.st_ino)
+        if directory_key in visited:
+            continue
+        visited.add(directory_key)
+
+        subdirectories = []
+        for entry in entries:
+            name = entry.name
+
+            # Filtre sur l'extension avant toute autre opération
+            extension = os.path.splitext(name)[1].lower()
+            if extension in extensions:
+                if skip_hidden and _is_hidden(entry):
+                    continue
+                relative_path = relative_directory + name
+                if include and not _matches(relative_path, include):
+                    continue
+                if exclude and _matches(relative_path, exclude):
+                    continue
+                try:
+                    if entry.is_file():
+                        yield entry.path, entry.stat()
+                        continue
+                except OSError:
+                    continue
+
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                continue
+            if not is_directory or name in SYSTEM_DIRECTORIES:
+                continue
+            if skip_hidden and _is_hidden(entry):
+                continue
+            relative_path = relative_directory + name
+            if exclude and _matches(relative_path, exclude):
+                continue
+            subdirectories.append((entry.path, relative_path + '/'))
+
+        # Pile : inverser pour parcourir les sous-dossiers dans l'ordre alphabétique
+        pending.extend(reversed(subdirectories))
@@ -3,18 +3,55 @@
 Script rapide pour restaurer les métadonnées simplifiées
 """
 
-import sys
+import argparse
 import os
+from itertools import islice
 from pathlib import Path
+from date_rules import DateCorrector
+from photo_log import add_logging_arguments, configure_logging
 from simple_metadata import SimplePhotoMetadata
 
 
+def parse_arguments():
+    """Analyse les arguments de la ligne de commande."""
+    parser = argparse.ArgumentParser(description="Restauration rapide des metadonnees")
+    parser.add_argument("source", nargs="?", help="Dossier source (avec metadata_simple.json)")
+    parser.add_argument("cible", nargs="?", help="Dossier cible (par defaut: dossier source)")
+    parser.add_argument("--jobs", "-j", type=int, default=1, metavar="N",
+                        help="Nombre de photos restaurees en parallele (defaut: 1)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Afficher les photos qui seraient modifiees, sans rien ecrire")
+    parser.add_argument("--dates-gps-seulement", action="store_true",
+                        help="Ne restaurer que la date et le GPS, meme si metadata_simple.exif existe")
+    parser.add_argument("--sur-place", action="store_true",
+                        help="Ne reecrire que les octets modifies des EXIF des JPEG quand leur "
+                             "taille ne change pas, au lieu de recopier chaque photo")
+    parser.add_argument("--regles-dates", metavar="FICHIER",
+                        help="Corriger les dates restaurees avec les regles de FICHIER "
+                             "(voir date_rules.py), sans modifier le fichier de metadonnees")
+    parser.add_argument("--mesures", metavar="FICHIER",
+                        help="Mesurer chaque etape et ecrire les mesures dans FICHIER "
+                             "(format Prometheus pour un fichier .prom, JSON sinon)")
+    add_logging_arguments(parser)
+    return parser.parse_args()
+
+
+def _write_stats(manager, output_path):
+    """Écrit les mesures de la restauration si --mesures est demandé."""
+    if output_path and manager.stats is not None:
+        manager.stats.write(output_path)
+        print(f"Mesures ecrites: {output_path}")
+
+
 def main():
     """Fonction principale pour restauration rapide."""
     
+    args = parse_arguments()
+    configure_logging(quiet=args.quiet, verbose=args.verbeux, event_log=args.journal)
+    
     # Déterminer les dossiers
-    if len(sys.argv) > 1:
-        source_dir = sys.argv[1]
+    if args.source:
+        source_dir = args.source
     else:
         source_dir = input("Dossier source (avec metadata_simple.json): ").strip() or "."
     
@@ -22,8 +59,8 @@ def main():
         print(f"Le dossier source {source_dir} n'existe pas.")
         return
     
-    if len(sys.argv) > 2:
-        target_dir = sys.argv[2]
+    if args.cible:
+        target_dir = args.cible
     else:
         target_dir = input("Dossier cible (ou Entrée pour dossier source): ").strip()
         if not target_dir:
@@ -37,8 +74,15 @@ def main():
     print(f"Source: {source_dir}")
     print(f"Cible: {target_dir if target_dir else source_dir}")
     
+    # Règles de correction des dates, vérifiées avant toute lecture
+    try:
+        date_rules = DateCorrector.from_file(args.regles_dates) if args.regles_dates else None
+    except (OSError, ValueError) as e:
+        print(f"Regles de dates invalides: {e}")
+        return
+    
     # Créer le gestionnaire
-    manager = SimplePhotoMetadata(source_dir)
+    manager = SimplePhotoMetadata(source_dir, instrument=bool(args.mesures), date_rules=date_rules)
     
     # Vérifier si le fichier de métadonnées existe
     if not manager.metadata_file.exists():
@@ -49,25 +93,21 @@ def main():
     # Charger et afficher les métadonnées extraites
     print(f"\nLecture des metadonnees depuis: {manager.metadata_file}")
     
-    # Essayons de lire le fichier JSON brut d'abord
+    # Lire les informations générales du fichier d'abord
     try:
-        import json
-        with open(manager.metadata_file, 'r', encoding='utf-8') as f:
-            raw_data = json.load(f)
+        file_info = manager.read_file_info()
         
         print(f"\nINFORMATIONS DU FICHIER:")
         print("=" * 50)
-        print(f"Date d'extraction: {raw_data.get('extraction_date', 'Non specifiee')}")
-        print(f"Nombre total de photos: {raw_data.get('total_photos', 0)}")
+        print(f"Date d'extraction: {file_info.get('extraction_date') or 'Non specifiee'}")
+        print(f"Nombre total de photos: {file_info.get('total_photos', 0)}")
         
         # Afficher quelques échantillons de données
-        photos = raw_data.get('photos', {})
-        if photos:
+        samples = list(islice(manager.iter_metadata(), 3))  # Limiter à 3 exemples
+        if samples and not args.quiet:
             print(f"\nECHANTILLON DES DONNEES EXTRAITES:")
             print("-" * 50)
-            for i, (filepath, metadata) in enumerate(photos.items()):
-                if i >= 3:  # Limiter à 3 exemples
-                    break
+            for filepath, metadata in samples:
                 print(f"{Path(filepath).name}")
                 print(f"   Date extraite: {metadata.get('date_creation', 'Non trouvée')}")
                 print(f"   Heure extraite: {metadata.get('heure_creation', 'Non trouvée')}")
@@ -78,19 +118,23 @@ def main():
                 print()
         
     except Exception as e:
-        print(f"Erreur lecture fichier JSON: {e}")
+        print(f"Erreur lecture fichier de metadonnees: {e}")
         return
     
-    # Maintenant charger via le gestionnaire
-    metadata_dict = manager.load_metadata()
-    
-    if not metadata_dict:
+    if not samples:
         print("Aucune metadonnees trouvees dans le fichier via le gestionnaire.")
         return
     
-    # Afficher les métadonnées qui ont été extraites
+    # Afficher les métadonnées qui ont été extraites (lues au fil du fichier)
     print(f"\nRESUME DES METADONNEES:")
-    manager.display_summary(metadata_dict)
+    manager.display_summary(manager.iter_metadata(), details=not args.quiet)
+    
+    if args.dry_run:
+        print(f"\nSimulation de la restauration (aucun fichier modifie)...")
+        manager.restore_metadata(target_dir, workers=args.jobs, dry_run=True,
+                                 full_exif=not args.dates_gps_seulement, in_place=args.sur_place)
+        _write_stats(manager, args.mesures)
+        return
     
     # Demander confirmation avant restauration
     print(f"\nVoulez-vous restaurer ces metadonnees sur les photos ?")
@@ -99,7 +143,9 @@ def main():
     if confirmation in ['oui', 'o', 'yes', 'y']:
         print(f"\nRestauration en cours...")
         # Restaurer les métadonnées
-        manager.restore_metadata(target_dir)
+        manager.restore_metadata(target_dir, workers=args.jobs, full_exif=not args.dates_gps_seulement,
+                                 in_place=args.sur_place)
+        _write_stats(manager, args.mesures)
         print("\nRestauration terminee!")
     else:
         print("\nRestauration annulee.")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Extraction en pipeline : parcours -> lecture -> analyse -> écriture.
+
+Chaque étape tourne dans ses propres threads et transmet son travail à la
+suivante par une file bornée. Quand une étape prend du retard, les étapes
+précédentes attendent (contre-pression) : le nombre de photos en cours de
+traitement, et donc la mémoire utilisée, ne dépend pas de la taille du
+dossier. Les lectures disque, l'analyse des EXIF et l'écriture du fichier
+de sauvegarde se recouvrent au lieu de s'enchaîner.
+
+L'étape d'écriture est le code qui consomme les résultats (par exemple
+save_metadata) : elle tourne dans le thread appelant, et les photos lui
+sont rendues dans l'ordre du parcours.
+"""
+
+import queue
+import threading
+import time
+
+from photo_log import SUMMARY, get_logger, log_event
+
+
+logger = get_logger()
+
+# Capacité par défaut de chaque file entre deux étapes
+DEFAULT_QUEUE_SIZE = 64
+
+# Délai d'attente sur une file avant de vérifier si le pipeline est arrêté
+POLL_INTERVAL = 0.1
+
+# Marque de fin transmise d'une étape à la suivante
+_END = object()
+
+
+class _Interrupted(Exception):
+    """Le pipeline a été arrêté pendant qu'une étape attendait."""
+
+
+class StageStats:
+    """Temps passé par une étape : à travailler et à attendre les autres."""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, busy=0.0, waiting=0.0, items=0):
+        with self._lock:
+            self.busy += busy
+            self.waiting += waiting
+            self.items += items
+
+    def as_dict(self):
+        return {
+            'threads': self.workers,
+            'elements': self.items,
+            'duree_active': round(self.busy, 4),
+            'duree_attente': round(self.waiting, 4)
+        }
+
+
+class MonitoredQueue:
+    """File bornée qui relève sa profondeur à chaque dépôt."""
+
+    def __init__(self, name, maxsize, stop_event):
+        self.name = name
+        self.maxsize = maxsize
+        self._queue = queue.Queue(maxsize)
+        self._stop_event = stop_event
+        self._lock = threading.Lock()
+        self.max_depth = 0
+        self.total_depth = 0
+        self.samples = 0
+
+    def put(self, item):
+        """
+        Dépose un élément en attendant qu'il y ait de la place.
+
+        Returns:
+            float: Temps passé à attendre
+
+        Raises:
+            _Interrupted: Si le pipeline est arrêté pendant l'attente
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                break
+            except queue.Full:
+                if self._stop_event.is_set():
+                    raise _Interrupted()
+
+        depth = self._queue.qsize()
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self.total_depth += depth
+            self.samples += 1
+        return time.perf_counter() - start
+
+    def get(self):
+        """
+        Retire un élément en attendant qu'il y en ait un.
+
+        Returns:
+            tuple: (élément, temps passé à attendre)
+
+        Raises:
+            _Interrupted: Si le pipeline est arrêté pendant l'attente
+        """
+        start = time.perf_counter()
+        while True:
+            try:
+                item = self._queue.get(timeout=POLL_INTERVAL)
+                return item, time.perf_counter() - start
+            except queue.Empty:
+                if self._stop_event.is_set():
+                    raise _Interrupted()
+
+    def as_dict(self):
+        return {
+            'capacite': self.maxsize,
+            'profondeur_max': self.max_depth,
+            'profondeur_moyenne': round(self.total_depth / self.samples, 2) if self.samples else 0
+        }
+
+
+class ScanPipeline:
+    """
+    Pipeline d'extraction des métadonnées d'un ensemble de photos.
+
+    Utilisation :
+        pipeline = ScanPipeline(manager, readers=4)
+        for metadata, block in pipeline.run(photo_files):
+            ...
+        print(pipeline.stats)
+    """
+
+    def __init__(self, manager, readers=4, parsers=1, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            manager (SimplePhotoMetadata): Gestionnaire utilisé pour la
+                lecture et l'analyse
+            readers (int): Threads de lecture des fichiers
+            parsers (int): Threads d'analyse des EXIF
+            queue_size (int): Capacité de chaque file entre deux étapes
+        """
+        self.manager = manager
+        self.readers = max(1, readers)
+        self.parsers = max(1, parsers)
+        self.queue_size = max(1, queue_size)
+        self.stats = None
+
+    def run(self, photo_files):
+        """
+        Extrait les métadonnées des photos fournies par un itérateur.
+
+        L'itérateur est lu dans un thread dédié (étape de parcours) : il peut
+        s'agir d'un parcours de dossier encore en cours.
+
+        Args:
+            photo_files (iterator): Chemins (Path) des photos à traiter
+
+        Yields:
+            tuple: (métadonnées, structure EXIF lue ou None) de chaque photo,
+                dans l'ordre de photo_files
+
+        Raises:
+            Exception: Erreur inattendue d'une étape, qui arrête le pipeline
+        """
+        from simple_metadata import _extract_worker, _log_extracted
+
+        stop_event = threading.Event()
+        read_queue = MonitoredQueue('lecture', self.queue_size, stop_event)
+        parse_queue = MonitoredQueue('analyse', self.queue_size, stop_event)
+        output_queue = MonitoredQueue('ecriture', self.queue_size, stop_event)
+        queues = (read_queue, parse_queue, output_queue)
+
+        stages = {
+            'parcours': StageStats('parcours', 1),
+            'lecture': StageStats('lecture', self.readers),
+            'analyse': StageStats('analyse', self.parsers),
+            'ecriture': StageStats('ecriture', 1),
+        }
+        errors = []
+        remaining = {'lecture': self.readers, 'analyse': self.parsers}
+        remaining_lock = threading.Lock()
+
+        def finish(stage, next_queue, next_workers):
+            # Le dernier thread d'une étape prévient tous ceux de la suivante
+            with remaining_lock:
+                remaining[stage] -= 1
+                last = remaining[stage] == 0
+            if last:
+                for _ in range(next_workers):
+                    next_queue.put(_END)
+
+        def walk():
+            stats = stages['parcours']
+            try:
+                iterator = iter(photo_files)
+                sequence = 0
+                while True:
+                    start = time.perf_counter()
+                    file_path = next(iterator, _END)
+                    busy = time.perf_counter() - start
+                    if file_path is _END:
+                        stats.add(busy)
+                        break
+                    waiting = read_queue.put((sequence, file_path))
+                    stats.add(busy, waiting, 1)
+                    sequence += 1
+                for _ in range(self.readers):
+                    read_queue.put(_END)
+            except _Interrupted:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+
+        def read():
+            stats = stages['lecture']
+            try:
+                while True:
+                    item, waiting = read_queue.get()
+                    if item is _END:
+                        stats.add(waiting=waiting)
+                        break
+                    sequence, file_path = item
+                    start = time.perf_counter()
+                    block = self.manager.read_exif_block(file_path)
+                    busy = time.perf_counter() - start
+                    waiting += parse_queue.put((sequence, file_path, block))
+                    stats.add(busy, waiting, 1)
+                finish('lecture', parse_queue, self.parsers)
+            except _Interrupted:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+
+        def parse():
+            stats = stages['analyse']
+            try:
+                while True:
+                    item, waiting = parse_queue.get()
+                    if item is _END:
+                        stats.add(waiting=waiting)
+                        break
+                    sequence, file_path, block = item
+                    start = time.perf_counter()
+                    exif_dict = self.manager.parse_exif_block(file_path, block)
+                    metadata, _ = _extract_worker(self.manager, file_path, exif_dict)
+                    # Structure réutilisée par la sauvegarde complète des EXIF
+                    if not (block and self.manager.exif_backup):
+                        block = None
+                    busy = time.perf_counter() - start
+                    waiting += output_queue.put((sequence, file_path, (metadata, block)))
+                    stats.add(busy, waiting, 1)
+                finish('analyse', output_queue, 1)
+            except _Interrupted:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                stop_event.set()
+
+        threads = [threading.Thread(target=walk, name='pipeline-parcours', daemon=True)]
+        threads += [threading.Thread(target=read, name=f'pipeline-lecture-{i}', daemon=True)
+                    for i in range(self.readers)]
+        threads += [threading.Thread(target=parse, name=f'pipeline-analyse-{i}', daemon=True)
+                    for i in range(self.parsers)]
+
+        logger.info("Pipeline: %d lecteur(s), %d analyseur(s), files de %d",
+                    self.readers, self.parsers, self.queue_size)
+
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        writer = stages['ecriture']
+        # Résultats arrivés avant leur tour : au plus le nombre de photos en
+        # cours dans le pipeline, donc borné par la taille des files
+        reordered = {}
+        next_sequence = 0
+        try:
+            while True:
+                try:
+                    item, waiting = output_queue.get()
+                except _Interrupted:
+                    break
+                writer.add(waiting=waiting)
+                if item is _END:
+                    break
+
+                sequence, file_path, extracted = item
+                reordered[sequence] = (file_path, extracted)
+                while next_sequence in reordered:
+                    file_path, extracted = reordered.pop(next_sequence)
+                    next_sequence += 1
+                    _log_extracted(file_path, extracted[0])
+                    # Le temps passé hors du générateur est celui de l'écriture
+                    start = time.perf_counter()
+                    yield extracted
+                    writer.add(time.perf_counter() - start, items=1)
+        finally:
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+            self.stats = {
+                'duree': round(time.perf_counter() - start_time, 4),
+                'etapes': {name: stage.as_dict() for name, stage in stages.items()},
+                'files': {q.name: q.as_dict() for q in queues}
+            }
+
+        if errors:
+            raise errors[0]
+
+        self.print_stats()
+
+    def print_stats(self):
+        """Affiche le temps passé dans chaque étape et l'occupation des files."""
+        if not self.stats:
+            return
+        log_event(logger, SUMMARY, 'pipeline_bilan', "Pipeline termine en %.2f s",
+                  self.stats['duree'], **self.stats)
+        for name, stage in self.stats['etapes'].items():
+            logger.log(SUMMARY, "  Etape %s: %d photos, %.2f s actives, %.2f s d'attente (%d thread(s))",
+                       name, stage['elements'], stage['duree_active'], stage['duree_attente'],
+                       stage['threads'])
+        for name, queue_stats in self.stats['files'].items():
+            logger.log(SUMMARY, "  File %s: profondeur max %d/%d, moyenne %s",
+                       name, queue_stats['profondeur_max'], queue_stats['capacite'],
+                       queue_stats['profondeur_moyenne'])
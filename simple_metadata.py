@@ -6,28 +6,322 @@ Programme simplifié pour extraire uniquement :
 - Nom du fichier
 """
 
+import io
 import os
 import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
 from datetime import datetime
+from functools import partial
+from itertools import chain
 from pathlib import Path
 from PIL import Image
 import piexif
 
+from exif_archive import ARCHIVED_SUFFIXES, ExifArchive, ExifArchiveError, ExifArchiveWriter
+from exif_header import (EXIF_HEADER, ExifHeaderError, jpeg_exif_block, locate_jpeg_exif,
+                         parse_exif_block, read_exif_block, read_exif_header,
+                         strip_heif_exif_prefix)
+from exif_patch import apply_patches, diff_patches, plan_tag_patches, write_patches
+from metadata_store import SQLiteMetadataStore, is_sqlite_file
+from photo_fingerprint import FINGERPRINT_FIELD, FingerprintIndex, content_fingerprint
+from photo_dates import (DEFAULT_DATE_PRECEDENCE, parse_date_precedence, parse_exif_datetime,
+                         parse_filename_datetime)
+from photo_log import SUMMARY, configure_logging, get_logger, log_event
+from photo_places import PLACE_FIELDS, PlaceIndex
+from photo_records import PhotoRecords
+from photo_stats import ProcessingStats
+from photo_timezones import OFFSET_FIELD, OFFSET_SOURCE_FIELD, TimezoneResolver, format_offset
+from photo_walker import iter_photo_files
+from scan_pipeline import ScanPipeline
+
+
+logger = get_logger()
+
+# Extension du fichier de métadonnées pour chaque format de sauvegarde,
+# dans l'ordre de préférence quand plusieurs fichiers sont présents
+STORAGE_EXTENSIONS = {'json': 'json', 'jsonl': 'jsonl', 'sqlite': 'db'}
+
+# Champ EXIF (IFD, étiquette piexif) de chaque source de date EXIF
+EXIF_DATE_TAGS = {
+    'exif_original': ('Exif', piexif.ExifIFD.DateTimeOriginal),
+    'exif_numerisation': ('Exif', piexif.ExifIFD.DateTimeDigitized),
+    'exif_modification': ('0th', piexif.ImageIFD.DateTime),
+}
+
+# Champ EXIF du décalage UTC qui accompagne chaque source de date EXIF
+EXIF_OFFSET_TAGS = {
+    'exif_original': ('Exif', piexif.ExifIFD.OffsetTimeOriginal),
+    'exif_numerisation': ('Exif', piexif.ExifIFD.OffsetTimeDigitized),
+    'exif_modification': ('Exif', piexif.ExifIFD.OffsetTime),
+}
+
+# Champ des métadonnées signalant des EXIF illisibles (photo datée sans eux)
+EXIF_WARNING_FIELD = 'avertissement_exif'
+
+# Écart en degrés en dessous duquel deux positions GPS sont identiques
+# (le GPS est écrit au millième de seconde d'arc, soit ~2.8e-7 degré)
+GPS_TOLERANCE = 1e-6
+
+# Extensions des photos dont les EXIF peuvent être modifiés sur place
+IN_PLACE_SUFFIXES = {'.jpg', '.jpeg'}
+
 
 class SimplePhotoMetadata:
     """Gestionnaire simplifié des métadonnées des photos."""
     
-    def __init__(self, photo_directory):
+    def __init__(self, photo_directory, output_format=None, include=None, exclude=None,
+                 skip_hidden=False, date_precedence=None, instrument=False, exif_backup=False,
+                 fingerprint=False, metadata_file=None, timezones=False,
+                 timezone_polygons=None, date_rules=None, places=False, places_file=None):
         """
         Initialise le gestionnaire avec le dossier des photos.
         
         Args:
             photo_directory (str): Chemin vers le dossier contenant les photos
+            output_format (str): 'json' (un seul document), 'jsonl' (une
+                ligne par photo, écrite au fil de l'extraction) ou 'sqlite'
+                (base indexée). Par défaut, le format du fichier déjà présent
+                dans le dossier, sinon 'json'.
+            include (list): Motifs glob des photos à scanner, relatifs au
+                dossier (par exemple '2021/*'). Par défaut, toutes les photos.
+            exclude (list): Motifs glob des photos et dossiers à ignorer
+            skip_hidden (bool): Ignorer aussi les fichiers et dossiers cachés
+            date_precedence (list): Sources de la date de prise de vue, par
+                ordre de priorité (voir photo_dates.DATE_SOURCES)
+            instrument (bool): Mesurer chaque étape des extractions et des
+                restaurations (voir stats)
+            exif_backup (bool): Sauvegarder aussi tous les EXIF des JPEG dans
+                metadata_simple.exif, pour les restaurer sans perte
+            fingerprint (bool): Enregistrer l'empreinte du contenu de chaque
+                photo, pour la retrouver à la restauration si elle a été renommée
+            metadata_file (str): Fichier de métadonnées à utiliser à la place
+                de metadata_simple.<format> dans le dossier ; son format par
+                défaut est déduit de son extension
+            timezones (bool): Enregistrer le décalage UTC de chaque photo
+                (voir photo_timezones)
+            timezone_polygons (str): Fichier GeoJSON des fuseaux horaires
+                (par défaut photo_timezones.DEFAULT_POLYGON_FILE s'il existe)
+            date_rules (DateCorrector): Règles de correction des dates
+                (voir date_rules) appliquées aux photos extraites et aux
+                photos restaurées
+            places (bool): Ajouter le pays, la région et la ville de chaque
+                photo géolocalisée (voir photo_places)
+            places_file (str): Fichier des lieux GeoNames (par défaut
+                photo_places.DEFAULT_PLACES_FILE)
         """
         self.photo_directory = Path(photo_directory)
-        self.metadata_file = self.photo_directory / "metadata_simple.json"
+        
+        if output_format is None and metadata_file is not None:
+            suffix = Path(metadata_file).suffix.lstrip('.').lower()
+            output_format = next((candidate for candidate, extension in STORAGE_EXTENSIONS.items()
+                                  if extension == suffix), 'json')
+        if output_format is None:
+            output_format = 'json'
+            for candidate in STORAGE_EXTENSIONS:
+                if (self.photo_directory / f"metadata_simple.{STORAGE_EXTENSIONS[candidate]}").exists():
+                    output_format = candidate
+                    break
+        if output_format not in STORAGE_EXTENSIONS:
+            raise ValueError(f"Format de sauvegarde inconnu: {output_format}")
+        
+        self.output_format = output_format
+        if metadata_file is not None:
+            self.metadata_file = Path(metadata_file)
+        else:
+            self.metadata_file = (
+                self.photo_directory / f"metadata_simple.{STORAGE_EXTENSIONS[output_format]}"
+            )
+        
+        # Progression d'une extraction en cours, pour pouvoir la reprendre
+        self.checkpoint_file = self.photo_directory / "metadata_simple.reprise.jsonl"
+        
+        # Sauvegarde complète des EXIF (voir exif_archive)
+        self.exif_backup = exif_backup
+        self.exif_archive_file = self.photo_directory / "metadata_simple.exif"
+        
+        # Empreinte du contenu des photos (voir photo_fingerprint)
+        self.fingerprint = fingerprint
+        
+        # Décalage UTC des photos (voir photo_timezones) : les polygones des
+        # fuseaux sont chargés une seule fois
+        self.timezone_resolver = (TimezoneResolver.from_file(timezone_polygons)
+                                  if timezones or timezone_polygons else None)
+        
+        # Corrections des dates (horloge décalée, fuseau de l'appareil...)
+        self.date_rules = date_rules
+        
+        # Géocodage inverse hors ligne (voir photo_places) : l'index des
+        # lieux est compilé au premier usage puis ouvert par mmap
+        self.place_index = PlaceIndex.open(places_file) if places or places_file else None
+        
+        self.checkpoint_interval = 100
         self.supported_formats = {'.jpg', '.jpeg', '.tiff', '.tif', '.heic'}
         
+        # Filtres du parcours du dossier
+        self.include_patterns = list(include or [])
+        self.exclude_patterns = list(exclude or [])
+        self.skip_hidden = skip_hidden
+        
+        # Ordre de priorité des sources de la date de prise de vue
+        self.date_precedence = parse_date_precedence(date_precedence or DEFAULT_DATE_PRECEDENCE)
+        
+        # Compteurs de lecture (partagés entre les threads d'extraction)
+        self.bytes_read = 0
+        self.files_read = 0
+        self._counters_lock = threading.Lock()
+        
+        # Bilan du dernier scan incrémental
+        self.scan_summary = None
+        
+        # Mesures par étape du dernier scan en pipeline
+        self.pipeline_stats = None
+        
+        # Mesures détaillées du dernier scan ou de la dernière restauration
+        # (ProcessingStats), seulement si instrument est activé
+        self.instrument = instrument
+        self.stats = None
+    
+    def __getstate__(self):
+        # Le verrou ne peut pas être transmis aux processus d'extraction
+        state = self.__dict__.copy()
+        del state['_counters_lock']
+        if self.stats is not None:
+            # Chaque processus mesure sa part, additionnée ensuite par merge
+            state['stats'] = ProcessingStats(self.stats.operation, self.stats.slowest_count)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._counters_lock = threading.Lock()
+    
+    def _start_stats(self, operation):
+        """Démarre les mesures d'un traitement si instrument est activé."""
+        self.stats = ProcessingStats(operation) if self.instrument else None
+    
+    def _timer(self, stage):
+        """Chronomètre une étape si les mesures sont activées."""
+        stats = self.stats
+        return stats.timer(stage) if stats is not None else _NO_TIMER
+    
+    def _count_error(self, exception):
+        """Compte une erreur dans les mesures, si elles sont activées."""
+        if self.stats is not None:
+            self.stats.error(exception)
+    
+    def count_bytes_read(self, bytes_read, files_read=1):
+        """
+        Ajoute des octets lus aux compteurs de lecture.
+        
+        Args:
+            bytes_read (int): Nombre d'octets lus
+            files_read (int): Nombre de fichiers lus
+        """
+        with self._counters_lock:
+            self.bytes_read += bytes_read
+            self.files_read += files_read
+    
+    def load_exif(self, image_path):
+        """
+        Charge les EXIF date et GPS d'une image JPEG, TIFF ou HEIC.
+        
+        Seul l'en-tête du fichier est lu ; en secours, quand la structure du
+        fichier n'est pas gérée par la lecture rapide, piexif (JPEG, TIFF)
+        ou pyheif (HEIC) lisent le fichier entier.
+        
+        Args:
+            image_path (Path): Chemin vers l'image
+            
+        Returns:
+            dict: Métadonnées EXIF au format piexif
+        """
+        try:
+            with self._timer('lecture_exif'):
+                exif_dict, bytes_read = read_exif_header(image_path)
+        except ExifHeaderError as e:
+            if image_path.suffix.lower() == '.heic':
+                logger.info("Lecture rapide HEIC impossible pour %s: %s", image_path.name, e)
+                with self._timer('heic_pyheif'):
+                    exif_dict = self._load_heic_exif_pyheif(image_path)
+            else:
+                # piexif lit le fichier entier
+                with self._timer('piexif_load'):
+                    exif_dict = piexif.load(str(image_path))
+            bytes_read = image_path.stat().st_size
+        
+        self.count_bytes_read(bytes_read)
+        return exif_dict
+    
+    def _load_heic_exif_pyheif(self, image_path):
+        """
+        Lit les EXIF d'un HEIC avec pyheif (secours de la lecture rapide).
+        
+        pyheif.open ne décode pas l'image ; les anciennes versions n'ont que
+        pyheif.read, qui la décode.
+        
+        Args:
+            image_path (Path): Chemin vers l'image HEIC
+            
+        Returns:
+            dict: Métadonnées EXIF au format piexif (vides si absentes)
+        """
+        try:
+            import pyheif
+            open_heif = getattr(pyheif, 'open', pyheif.read)
+            heif_file = open_heif(str(image_path))
+            for meta in heif_file.metadata or []:
+                if meta['type'] == 'Exif':
+                    return parse_exif_block(strip_heif_exif_prefix(meta['data']))
+        except Exception as e:
+            logger.warning("Erreur lecture EXIF HEIC pour %s: %s", image_path.name, e)
+            self._count_error(e)
+        return {"0th": {}, "Exif": {}, "GPS": {}}
+    
+    def read_exif_block(self, image_path):
+        """
+        Lit la structure EXIF d'une image sans l'analyser (voir scan_pipeline).
+        
+        Args:
+            image_path (Path): Chemin vers l'image
+            
+        Returns:
+            bytes: Structure lue, ou None si l'analyse devra relire le
+                fichier (structure non gérée par la lecture rapide)
+        """
+        try:
+            with self._timer('lecture_exif'):
+                block, bytes_read = read_exif_block(image_path)
+        except (ExifHeaderError, OSError):
+            return None
+        
+        self.count_bytes_read(bytes_read)
+        return block
+    
+    def parse_exif_block(self, image_path, block):
+        """
+        Analyse une structure lue par read_exif_block.
+        
+        Args:
+            image_path (Path): Chemin vers l'image
+            block (bytes): Structure lue, ou None
+            
+        Returns:
+            dict: EXIF au format piexif, ou None pour les relire dans le fichier
+        """
+        if block is None:
+            return None
+        try:
+            with self._timer('analyse_exif'):
+                return parse_exif_block(block)
+        except ExifHeaderError:
+            return None
+        
     def get_decimal_from_dms(self, dms, ref):
         """
         Convertit les coordonnées DMS en décimal.
@@ -55,158 +349,73 @@ class SimplePhotoMetadata:
             
         return result
     
-    def extract_simple_metadata(self, image_path):
+    def extract_simple_metadata(self, image_path, exif_dict=None):
         """
         Extrait uniquement les métadonnées essentielles d'une image.
         
         Args:
             image_path (Path): Chemin vers l'image
+            exif_dict (dict): EXIF déjà lus (format piexif), sinon ils sont
+                lus dans le fichier
             
         Returns:
             dict: Dictionnaire contenant les métadonnées essentielles
         """
+        return self._extract_with_block(image_path, exif_dict)[0]
+    
+    def _extract_with_block(self, image_path, exif_dict=None):
+        """
+        Extrait les métadonnées essentielles d'une image, ainsi que la
+        structure EXIF lue pour la sauvegarde complète (exif_backup).
+        
+        Args:
+            image_path (Path): Chemin vers l'image
+            exif_dict (dict): EXIF déjà lus (format piexif), sinon ils sont
+                lus dans le fichier
+            
+        Returns:
+            tuple: (métadonnées, structure EXIF lue ou None)
+        """
+        block = None
+        exif_warning = None
         metadata = {
             'nom': image_path.name,
             'date_creation': None,
             'heure_creation': None,
+            'source_date': None,
             'gps_latitude': None,
             'gps_longitude': None,
             'localisation': None
         }
         
         try:
-            # DATE DE CREATION DU FICHIER SYSTEME (priorite)
-            try:
-                import platform
-                if platform.system() == "Windows":
-                    import ctypes
-                    from ctypes import wintypes
-                    import os
-                    kernel32 = ctypes.windll.kernel32
-                    handle = kernel32.CreateFileW(
-                        str(image_path),
-                        0x80000000,  # GENERIC_READ
-                        1,           # FILE_SHARE_READ
-                        None,        # Default security
-                        3,           # OPEN_EXISTING
-                        0,           # Normal attributes
-                        None         # No template
-                    )
-                    if handle != -1:
-                        class FILETIME(ctypes.Structure):
-                            _fields_ = [("dwLowDateTime", wintypes.DWORD),
-                                      ("dwHighDateTime", wintypes.DWORD)]
-                        creation_time = FILETIME()
-                        access_time = FILETIME()
-                        write_time = FILETIME()
-                        success = kernel32.GetFileTime(
-                            handle,
-                            ctypes.byref(creation_time),
-                            ctypes.byref(access_time),
-                            ctypes.byref(write_time)
-                        )
-                        kernel32.CloseHandle(handle)
-                        if success:
-                            timestamp_100ns = (creation_time.dwHighDateTime << 32) + creation_time.dwLowDateTime
-                            epoch_as_filetime = 116444736000000000
-                            timestamp = (timestamp_100ns - epoch_as_filetime) / 10000000.0
-                            creation_datetime = datetime.fromtimestamp(timestamp)
-                            metadata['date_creation'] = creation_datetime.strftime("%d/%m/%Y")
-                            metadata['heure_creation'] = creation_datetime.strftime("%H:%M:%S")
-                            print(f"Date creation fichier: {metadata['date_creation']} {metadata['heure_creation']}")
-                else:
-                    stat_info = image_path.stat()
-                    if hasattr(stat_info, 'st_birthtime'):
-                        creation_time = stat_info.st_birthtime
-                    else:
-                        creation_time = stat_info.st_ctime
-                    creation_datetime = datetime.fromtimestamp(creation_time)
-                    metadata['date_creation'] = creation_datetime.strftime("%d/%m/%Y")
-                    metadata['heure_creation'] = creation_datetime.strftime("%H:%M:%S")
-            except Exception as e:
-                print(f"Erreur lecture date creation fichier pour {image_path.name}: {e}")
-
-            # Extraire les données EXIF (en complément)
-            exif_dict = None
-            if image_path.suffix.lower() == '.heic':
-                # Extraction EXIF pour HEIC
-                try:
-                    import pyheif
-                    import exifread
-                    heif_file = pyheif.read(str(image_path))
-                    # Les métadonnées EXIF sont dans heif_file.metadata
-                    exif_bytes = None
-                    for meta in heif_file.metadata:
-                        if meta['type'] == 'Exif':
-                            exif_bytes = meta['data']
-                            break
-                    if exif_bytes:
-                        import io
-                        tags = exifread.process_file(io.BytesIO(exif_bytes), details=False)
-                        # On va chercher DateTimeOriginal ou DateTime
-                        date_exif = None
-                        if 'EXIF DateTimeOriginal' in tags:
-                            date_exif = str(tags['EXIF DateTimeOriginal'])
-                        elif 'Image DateTime' in tags:
-                            date_exif = str(tags['Image DateTime'])
-                        if date_exif:
-                            try:
-                                dt = datetime.strptime(date_exif, "%Y:%m:%d %H:%M:%S")
-                                metadata['date_creation'] = dt.strftime("%d/%m/%Y")
-                                metadata['heure_creation'] = dt.strftime("%H:%M:%S")
-                                print(f"Date EXIF HEIC utilisee: {metadata['date_creation']} {metadata['heure_creation']}")
-                            except Exception as e:
-                                print(f"Erreur conversion date EXIF HEIC: {e}")
-                except Exception as e:
-                    print(f"Erreur lecture EXIF HEIC pour {image_path.name}: {e}")
-                exif_dict = {}  # Pour ne pas casser la suite
-            else:
-                exif_dict = piexif.load(str(image_path))
-            
-            # DATE ET HEURE EXIF (si pas de date fichier systeme)
-            if not metadata['date_creation']:
-                date_creation = None
-                
-                # Essayer d'abord DateTimeOriginal (date de prise de vue)
-                if "Exif" in exif_dict and piexif.ExifIFD.DateTimeOriginal in exif_dict["Exif"]:
-                    date_creation = exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal].decode('utf-8')
-                
-                # Sinon, essayer DateTime (date de modification)
-                elif "0th" in exif_dict and piexif.ImageIFD.DateTime in exif_dict["0th"]:
-                    date_creation = exif_dict["0th"][piexif.ImageIFD.DateTime].decode('utf-8')
-                
-                if date_creation:
-                    # Format: "2020:09:12 14:30:25"
-                    try:
-                        dt = datetime.strptime(date_creation, "%Y:%m:%d %H:%M:%S")
-                        metadata['date_creation'] = dt.strftime("%d/%m/%Y")
-                        metadata['heure_creation'] = dt.strftime("%H:%M:%S")
-                        print(f"Date EXIF utilisee: {metadata['date_creation']} {metadata['heure_creation']}")
-                    except:
-                        metadata['date_creation'] = date_creation
-                        metadata['heure_creation'] = date_creation
-            
-            # FORCER L'UTILISATION DE LA DATE EXIF DE PRISE DE VUE
-            # Cette section remplace la date du système par celle des EXIF si disponible
-            date_exif = None
-            
-            # Essayer d'abord DateTimeOriginal (date de prise de vue)
-            if "Exif" in exif_dict and piexif.ExifIFD.DateTimeOriginal in exif_dict["Exif"]:
-                date_exif = exif_dict["Exif"][piexif.ExifIFD.DateTimeOriginal].decode('utf-8')
-            
-            # Sinon, essayer DateTime (date de modification)
-            elif "0th" in exif_dict and piexif.ImageIFD.DateTime in exif_dict["0th"]:
-                date_exif = exif_dict["0th"][piexif.ImageIFD.DateTime].decode('utf-8')
-            
-            if date_exif:
-                # Format: "2020:09:12 14:30:25"
-                try:
-                    dt = datetime.strptime(date_exif, "%Y:%m:%d %H:%M:%S")
-                    metadata['date_creation'] = dt.strftime("%d/%m/%Y")
-                    metadata['heure_creation'] = dt.strftime("%H:%M:%S")
-                    print(f"Date EXIF de prise de vue utilisee: {metadata['date_creation']} {metadata['heure_creation']}")
-                except Exception as e:
-                    print(f"Erreur conversion date EXIF: {e}")
+            # Extraire les données EXIF : seul l'en-tête est lu, l'image d'un
+            # HEIC n'est jamais décodée
+            if exif_dict is None and self.exif_backup and image_path.suffix.lower() in ARCHIVED_SUFFIXES:
+                # La structure lue sert à l'analyse et à la sauvegarde complète
+                block = self.read_exif_block(image_path)
+                if block is not None:
+                    exif_dict = self.parse_exif_block(image_path, block)
+            if exif_dict is None:
+                exif_dict = self.load_exif(image_path)
+        except Exception as e:
+            # EXIF illisibles : le nom et la date du fichier peuvent encore
+            # donner la date de prise de vue. Ce n'est pas une erreur
+            # d'extraction : la photo est réutilisée aux scans suivants et
+            # les règles de dates s'y appliquent.
+            logger.warning("EXIF illisibles pour %s: %s", image_path.name, e)
+            self._count_error(e)
+            exif_warning = str(e)
+            exif_dict = {}
+        
+        try:
+            # DATE ET HEURE DE PRISE DE VUE (première source disponible)
+            date_creation, heure_creation, source = self.resolve_capture_date(image_path, exif_dict)
+            if source:
+                metadata['date_creation'] = date_creation
+                metadata['heure_creation'] = heure_creation
+                metadata['source_date'] = source
+                logger.debug("Date retenue (%s): %s %s", source, date_creation, heure_creation or '')
             
             # LOCALISATION GPS
             if "GPS" in exif_dict:
@@ -227,325 +436,2094 @@ class SimplePhotoMetadata:
                 # Créer un lien Google Maps si on a les coordonnées
                 if metadata['gps_latitude'] and metadata['gps_longitude']:
                     metadata['localisation'] = f"https://www.google.com/maps?q={metadata['gps_latitude']},{metadata['gps_longitude']}"
+            
+            # DÉCALAGE UTC (balise EXIF, sinon position GPS)
+            if self.timezone_resolver is not None and metadata['date_creation']:
+                with self._timer('fuseau'):
+                    self.resolve_utc_offset(metadata, exif_dict)
+            
+            # PAYS, RÉGION ET VILLE (lieu connu le plus proche)
+            if self.place_index is not None:
+                self.add_place(metadata)
                 
         except Exception as e:
-            print(f"Erreur pour {image_path.name}: {e}")
+            logger.warning("Erreur pour %s: %s", image_path.name, e)
+            self._count_error(e)
             metadata['erreur'] = str(e)
         
-        return metadata
+        if exif_warning is not None:
+            metadata[EXIF_WARNING_FIELD] = exif_warning
+        
+        if self.fingerprint:
+            fingerprint = self.content_fingerprint(image_path)
+            if fingerprint is not None:
+                metadata[FINGERPRINT_FIELD] = fingerprint
+        
+        return metadata, block
     
-    def scan_directory(self):
+    def content_fingerprint(self, image_path):
         """
-        Scanne le dossier et extrait les métadonnées essentielles.
+        Calcule l'empreinte du contenu d'une photo (voir photo_fingerprint).
         
+        Args:
+            image_path (Path): Chemin vers l'image
+            
         Returns:
-            dict: Dictionnaire contenant les métadonnées de toutes les photos
+            str: Empreinte, ou None si le fichier est illisible
         """
-        all_metadata = {}
+        try:
+            with self._timer('empreinte'):
+                fingerprint, bytes_read = content_fingerprint(image_path)
+        except OSError as e:
+            logger.warning("Empreinte impossible pour %s: %s", Path(image_path).name, e)
+            self._count_error(e)
+            return None
         
-        print(f"Scan du dossier: {self.photo_directory}")
+        self.count_bytes_read(bytes_read, files_read=0)
+        return fingerprint
+    
+    def resolve_capture_date(self, image_path, exif_dict):
+        """
+        Détermine la date de prise de vue d'une photo.
         
-        for file_path in self.photo_directory.rglob('*'):
-            if file_path.is_file() and file_path.suffix.lower() in self.supported_formats:
-                print(f"Traitement de: {file_path.name}")
-                metadata = self.extract_simple_metadata(file_path)
-                all_metadata[str(file_path)] = metadata
+        Les sources sont essayées dans l'ordre de date_precedence, chacune une
+        seule fois : la date de création du fichier n'est lue que si aucune
+        source prioritaire ne donne de date valide.
         
-        return all_metadata
+        Args:
+            image_path (Path): Chemin vers l'image
+            exif_dict (dict): EXIF de la photo (format piexif)
+            
+        Returns:
+            tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS", source), ou
+                (None, None, None) si aucune source ne donne de date
+        """
+        for source in self.date_precedence:
+            if source == 'fichier':
+                with self._timer('date_fichier'):
+                    resolved = self._file_creation_date(image_path)
+            elif source == 'nom_fichier':
+                resolved = parse_filename_datetime(image_path.name)
+            else:
+                ifd, tag = EXIF_DATE_TAGS[source]
+                value = (exif_dict.get(ifd) or {}).get(tag)
+                resolved = parse_exif_datetime(value) if value else None
+            if resolved:
+                return resolved[0], resolved[1], source
+        return None, None, None
     
-    def save_metadata(self, metadata_dict):
+    def resolve_utc_offset(self, metadata, exif_dict):
         """
-        Sauvegarde les métadonnées dans un fichier JSON.
+        Ajoute aux métadonnées le décalage UTC de la date de prise de vue.
         
         Args:
-            metadata_dict (dict): Dictionnaire des métadonnées
+            metadata (dict): Métadonnées extraites (modifiées sur place)
+            exif_dict (dict): EXIF de la photo (format piexif)
         """
-        # Préparer les données pour la sauvegarde
-        save_data = {
-            'extraction_date': datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-            'total_photos': len(metadata_dict),
-            'photos': {}
-        }
+        exif_offset = None
+        if metadata['source_date'] in EXIF_OFFSET_TAGS:
+            ifd, tag = EXIF_OFFSET_TAGS[metadata['source_date']]
+            exif_offset = (exif_dict.get(ifd) or {}).get(tag)
+        offset, source = self.timezone_resolver.resolve(metadata, exif_offset)
+        if offset is not None:
+            metadata[OFFSET_FIELD] = format_offset(offset)
+            metadata[OFFSET_SOURCE_FIELD] = source
+    
+    def nearest_place(self, metadata):
+        """
+        Lieu le plus proche de la position GPS d'une photo.
         
-        for filepath, metadata in metadata_dict.items():
-            # Copier les métadonnées sans les données EXIF brutes
-            clean_metadata = {k: v for k, v in metadata.items() if k != 'raw_exif'}
-            save_data['photos'][filepath] = clean_metadata
+        Args:
+            metadata (dict): Métadonnées de la photo
             
-            # Sauvegarder les données EXIF pour la restauration
-            if 'raw_exif' in metadata:
-                try:
-                    exif_bytes = piexif.dump(metadata['raw_exif'])
-                    import base64
-                    clean_metadata['raw_exif_b64'] = base64.b64encode(exif_bytes).decode('utf-8')
-                except Exception as e:
-                    print(f"Erreur sauvegarde EXIF pour {filepath}: {e}")
-        
-        with open(self.metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(save_data, f, indent=2, ensure_ascii=False)
+        Returns:
+            dict: Champs PLACE_FIELDS, ou None (pas de GPS, aucun lieu proche)
+        """
+        if metadata.get('gps_latitude') is None or metadata.get('gps_longitude') is None:
+            return None
+        with self._timer('lieu'):
+            place = self.place_index.nearest(metadata['gps_latitude'], metadata['gps_longitude'])
+        return dict(zip(PLACE_FIELDS, place)) if place is not None else None
+    
+    def add_place(self, metadata):
+        """Ajoute aux métadonnées extraites le lieu le plus proche (voir nearest_place)."""
+        place = self.nearest_place(metadata)
+        if place is not None:
+            metadata.update(place)
+    
+    def _complete_place(self, metadata):
+        """
+        Ajoute le lieu à des métadonnées réutilisées qui n'en ont pas encore,
+        sans relire la photo.
         
-        print(f"Metadonnees sauvegardees: {self.metadata_file}")
+        Returns:
+            dict: Métadonnées, complétées dans l'ordre des champs d'une extraction
+        """
+        if self.place_index is None or PLACE_FIELDS[0] in metadata:
+            return metadata
+        located = self.nearest_place(metadata)
+        if located is None:
+            return metadata
+        completed = {}
+        for key, value in metadata.items():
+            if located and key in (FINGERPRINT_FIELD, 'taille', 'mtime_ns'):
+                completed.update(located)
+                located = None
+            completed[key] = value
+        completed.update(located or {})
+        return completed
     
-    def display_summary(self, metadata_dict):
+    def correct_date(self, filepath, metadata):
         """
-        Affiche un résumé des métadonnées extraites.
+        Applique les règles de correction des dates à une photo.
+        
+        Appelé dans le thread principal : les compteurs des règles ne sont
+        jamais partagés entre threads ou processus.
         
         Args:
-            metadata_dict (dict): Dictionnaire des métadonnées
+            filepath (str): Chemin de la photo
+            metadata (dict): Métadonnées (modifiées sur place)
         """
-        print("\n" + "="*60)
-        print("RESUME DES METADONNEES EXTRAITES")
-        print("="*60)
+        if self.date_rules is None or metadata.get('erreur'):
+            return
+        with self._timer('regles_dates'):
+            rule = self.date_rules.correct(str(filepath), metadata)
+        if rule is not None:
+            log_event(logger, logging.INFO, 'date_corrigee', "Correction de %s -> %s %s (%s)",
+                      metadata['nom'], metadata['date_creation'], metadata['heure_creation'], rule,
+                      fichier=str(filepath), regle=rule, date_creation=metadata['date_creation'],
+                      heure_creation=metadata['heure_creation'])
+            if self.stats is not None:
+                self.stats.count('dates_corrigees')
+    
+    def log_date_rules(self):
+        """Journalise le bilan des règles de correction des dates."""
+        rules = self.date_rules
+        if rules is None:
+            return
+        log_event(logger, SUMMARY, 'correction_bilan', "Dates corrigees: %d sur %d photos",
+                  rules.corrected, rules.total, corrigees=rules.corrected, photos=rules.total,
+                  regles=dict(rules.hits))
+    
+    def _file_creation_date(self, image_path):
+        """
+        Lit la date de création du fichier dans le système de fichiers.
         
-        total_photos = len(metadata_dict)
-        photos_avec_gps = 0
-        photos_avec_date = 0
+        Returns:
+            tuple: (date "JJ/MM/AAAA", heure "HH:MM:SS"), ou None
+        """
+        try:
+            import platform
+            if platform.system() == "Windows":
+                import ctypes
+                from ctypes import wintypes
+                kernel32 = ctypes.windll.kernel32
+                handle = kernel32.CreateFileW(
+                    str(image_path),
+                    0x80000000,  # GENERIC_READ
+                    1,           # FILE_SHARE_READ
+                    None,        # Default security
+                    3,           # OPEN_EXISTING
+                    0,           # Normal attributes
+                    None         # No template
+                )
+                if handle == -1:
+                    return None
+                class FILETIME(ctypes.Structure):
+                    _fields_ = [("dwLowDateTime", wintypes.DWORD),
+                              ("dwHighDateTime", wintypes.DWORD)]
+                creation_time = FILETIME()
+                access_time = FILETIME()
+                write_time = FILETIME()
+                success = kernel32.GetFileTime(
+                    handle,
+                    ctypes.byref(creation_time),
+                    ctypes.byref(access_time),
+                    ctypes.byref(write_time)
+                )
+                kernel32.CloseHandle(handle)
+                if not success:
+                    return None
+                timestamp_100ns = (creation_time.dwHighDateTime << 32) + creation_time.dwLowDateTime
+                epoch_as_filetime = 116444736000000000
+                timestamp = (timestamp_100ns - epoch_as_filetime) / 10000000.0
+            else:
+                stat_info = image_path.stat()
+                if hasattr(stat_info, 'st_birthtime'):
+                    timestamp = stat_info.st_birthtime
+                else:
+                    timestamp = stat_info.st_ctime
+            creation_datetime = datetime.fromtimestamp(timestamp)
+            return creation_datetime.strftime("%d/%m/%Y"), creation_datetime.strftime("%H:%M:%S")
+        except Exception as e:
+            logger.warning("Erreur lecture date creation fichier pour %s: %s", image_path.name, e)
+            self._count_error(e)
+            return None
+    
+    def scan_directory(self, workers=1, use_processes=False, incremental=True, pipeline=False):
+        """
+        Scanne le dossier et extrait les métadonnées essentielles.
         
-        print(f"Total des photos: {total_photos}")
-        print("\nDETAILS PAR PHOTO:")
-        print("-" * 60)
+        En mode incrémental, les entrées du fichier de métadonnées existant
+        sont réutilisées pour les photos dont la taille et la date de
+        modification n'ont pas changé ; les photos supprimées sont retirées.
         
-        for metadata in metadata_dict.values():
-            nom = metadata['nom']
-            date = metadata['date_creation'] or "Non trouvee"
-            heure = metadata['heure_creation'] or "Non trouvee"
+        Args:
+            workers (int): Nombre d'extractions menées en parallèle
+            use_processes (bool): Utiliser des processus plutôt que des threads
+                (utile quand l'analyse est limitée par le CPU plutôt que le disque)
+            incremental (bool): Réutiliser les métadonnées déjà extraites
+            pipeline (bool): Extraire en pipeline (voir iter_scan)
             
-            if metadata['gps_latitude'] and metadata['gps_longitude']:
-                gps_info = f"GPS: {metadata['gps_latitude']:.4f}, {metadata['gps_longitude']:.4f}"
-                photos_avec_gps += 1
-            else:
-                gps_info = "Pas de GPS"
+        Returns:
+            PhotoRecords: Métadonnées de toutes les photos (se lit comme un
+                dictionnaire chemin -> métadonnées)
+        """
+        return PhotoRecords(self.iter_scan(workers, use_processes, incremental, pipeline=pipeline))
+    
+    def iter_scan(self, workers=1, use_processes=False, incremental=True,
+                  checkpoint=False, resume=False, pipeline=False):
+        """
+        Scanne le dossier et fournit les métadonnées au fur et à mesure.
+        
+        La lecture des métadonnées existantes est faite immédiatement ; le
+        dossier est ensuite parcouru pendant l'extraction, et chaque photo
+        est fournie dès que son extraction est terminée, dans l'ordre du
+        parcours.
+        
+        Avec checkpoint, chaque photo extraite est aussi ajoutée au fichier
+        de reprise (checkpoint_file) ; avec resume, les photos déjà présentes
+        dans ce fichier ne sont pas ré-extraites.
+        
+        Avec pipeline, le parcours, la lecture des fichiers (workers threads)
+        et l'analyse des EXIF tournent dans des threads séparés reliés par
+        des files bornées, pendant que l'appelant écrit les résultats ; les
+        mesures de chaque étape sont ensuite dans pipeline_stats. Le
+        pipeline n'utilise que des threads : il exclut use_processes.
+        
+        Args:
+            workers (int): Nombre d'extractions menées en parallèle
+            use_processes (bool): Utiliser des processus plutôt que des threads
+            incremental (bool): Réutiliser les métadonnées déjà extraites
+            checkpoint (bool): Enregistrer la progression dans le fichier de reprise
+            resume (bool): Reprendre depuis le fichier de reprise existant
+            pipeline (bool): Extraire avec ScanPipeline
             
-            if metadata['date_creation']:
-                photos_avec_date += 1
+        Returns:
+            iterator: Couples (chemin, métadonnées)
             
-            print(f"{nom}")
-            print(f"   Date: {date} a {heure}")
-            print(f"   {gps_info}")
-            if metadata.get('localisation'):
-                print(f"   Carte: {metadata['localisation']}")
-            print()
+        Raises:
+            ValueError: Si pipeline et use_processes sont demandés ensemble
+        """
+        if pipeline and use_processes:
+            raise ValueError("Le pipeline n'utilise que des threads: pipeline et use_processes "
+                             "sont incompatibles")
         
-        print("-" * 60)
-        print(f"STATISTIQUES:")
-        print(f"   - Photos avec date: {photos_avec_date}/{total_photos}")
-        print(f"   - Photos avec GPS: {photos_avec_gps}/{total_photos}")
-        print("=" * 60)
+        log_event(logger, logging.INFO, 'scan_debut', "Scan du dossier: %s", self.photo_directory,
+                  dossier=str(self.photo_directory))
+        self._start_stats('extraction')
+        
+        previous_metadata = {}
+        if incremental and self.metadata_file.exists():
+            with self._timer('chargement_precedent'):
+                previous_metadata = self.load_metadata()
+        
+        checkpoint_metadata = {}
+        if resume:
+            if self.checkpoint_file.exists():
+                checkpoint_metadata = self._load_checkpoint()
+                logger.info("Reprise: %d photos deja extraites", len(checkpoint_metadata))
+            else:
+                logger.info("Aucun point de reprise trouve, extraction complete.")
+        
+        checkpoint_output = None
+        if checkpoint:
+            # En reprise, on complète le fichier existant ; sinon on repart de zéro
+            checkpoint_output = open(
+                self.checkpoint_file, 'a' if checkpoint_metadata else 'w', encoding='utf-8'
+            )
+        
+        exif_output = self._open_exif_output(incremental)
+        
+        counts = {'photos': 0, 'extraites': 0, 'reprises': 0, 'retrouvees': 0}
+        plan = self._iter_walk_plan(previous_metadata, checkpoint_metadata, counts)
+        return self._iter_plan(plan, counts, previous_metadata, workers, use_processes,
+                               checkpoint_output, pipeline, exif_output)
     
-    def load_metadata(self):
+    def iter_photo_files(self, directory=None):
         """
-        Charge les métadonnées depuis le fichier JSON.
+        Parcourt un dossier avec les filtres du gestionnaire.
         
-        Returns:
-            dict: Dictionnaire des métadonnées
+        Args:
+            directory (Path): Dossier à parcourir (par défaut photo_directory)
+            
+        Yields:
+            tuple: (chemin, os.stat_result)
         """
-        if not self.metadata_file.exists():
-            print(f"Fichier de metadonnees non trouve: {self.metadata_file}")
-            return {}
+        return iter_photo_files(
+            directory if directory is not None else self.photo_directory,
+            self.supported_formats,
+            include=self.include_patterns,
+            exclude=self.exclude_patterns,
+            skip_hidden=self.skip_hidden
+        )
+    
+    def _iter_walk_plan(self, previous_metadata, checkpoint_metadata, counts):
+        """
+        Parcourt le dossier et indique pour chaque photo s'il faut l'extraire.
         
-        with open(self.metadata_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        Args:
+            previous_metadata (dict): Métadonnées du fichier existant
+            checkpoint_metadata (dict): Métadonnées du fichier de reprise
+            counts (dict): Compteurs mis à jour pendant le parcours
+            
+        Yields:
+            tuple: (chemin, stat, métadonnées réutilisées ou None)
+        """
+        photo_files = self.iter_photo_files()
+        if self.stats is not None:
+            photo_files = self.stats.timed_iter(photo_files, 'parcours')
         
-        metadata_dict = {}
-        for filepath, metadata in data.get('photos', {}).items():
-            # Reconvertir les données EXIF si nécessaire
-            if 'raw_exif_b64' in metadata:
-                try:
-                    import base64
-                    exif_bytes = base64.b64decode(metadata['raw_exif_b64'])
-                    metadata['raw_exif'] = piexif.load(exif_bytes)
-                    del metadata['raw_exif_b64']
-                except Exception as e:
-                    print(f"Erreur chargement EXIF pour {filepath}: {e}")
+        for filepath, stat_info in photo_files:
+            counts['photos'] += 1
+            if filepath in previous_metadata:
+                counts['retrouvees'] += 1
+            
+            previous = checkpoint_metadata.get(filepath)
+            if self._is_up_to_date(previous, stat_info):
+                counts['reprises'] += 1
+            else:
+                previous = previous_metadata.get(filepath)
             
-            metadata_dict[filepath] = metadata
+            if self._is_up_to_date(previous, stat_info):
+                yield Path(filepath), stat_info, self._complete_place(previous)
+            else:
+                counts['extraites'] += 1
+                yield Path(filepath), stat_info, None
+    
+    def _is_up_to_date(self, metadata, stat_info):
+        """
+        Indique si des métadonnées déjà extraites correspondent encore au fichier.
         
-        return metadata_dict
+        Args:
+            metadata (dict): Métadonnées déjà extraites (ou None)
+            stat_info (os.stat_result): Informations actuelles du fichier
+            
+        Returns:
+            bool: True si la taille et la date de modification sont identiques
+                (et si l'empreinte est présente quand elle est demandée)
+        """
+        return (metadata is not None
+                and not metadata.get('erreur')
+                and (not self.fingerprint or FINGERPRINT_FIELD in metadata)
+                and metadata.get('taille') == stat_info.st_size
+                and metadata.get('mtime_ns') == stat_info.st_mtime_ns)
     
-    def restore_metadata(self, target_directory=None):
+    def _iter_plan(self, plan, counts, previous_metadata, workers, use_processes,
+                   checkpoint_output=None, pipeline=False, exif_output=None):
         """
-        Restaure les métadonnées sur les photos.
+        Fournit les métadonnées prévues par iter_scan, dans l'ordre du parcours.
+        
+        Les photos à extraire sont envoyées aux extracteurs pendant le
+        parcours ; les photos réutilisées sont gardées en attente pour être
+        rendues à leur place.
         
         Args:
-            target_directory (str): Dossier cible (par défaut: dossier original)
+            plan (iterator): (chemin, stat, métadonnées réutilisées ou None)
+            counts (dict): Compteurs tenus par le parcours
+            previous_metadata (dict): Métadonnées du fichier existant
+            workers (int): Nombre d'extractions menées en parallèle
+            use_processes (bool): Utiliser des processus plutôt que des threads
+            checkpoint_output (file): Fichier de reprise ouvert, ou None
+            pipeline (bool): Extraire avec ScanPipeline
+            exif_output (ExifArchiveWriter): Sauvegarde complète des EXIF, ou None
+            
+        Yields:
+            tuple: (chemin, métadonnées)
         """
-        if target_directory is None:
-            target_directory = self.photo_directory
-        else:
-            target_directory = Path(target_directory)
+        bytes_before, files_before = self.bytes_read, self.files_read
         
-        metadata_dict = self.load_metadata()
+        waiting = deque()
         
-        if not metadata_dict:
-            print("Aucune metadonnees a restaurer.")
-            return
+        def files_to_extract():
+            for item in plan:
+                waiting.append(item)
+                if item[2] is None:
+                    yield item[0]
         
-        print(f"Restauration des metadonnees...")
+        scan_pipeline = None
+        if pipeline:
+            scan_pipeline = ScanPipeline(self, readers=workers)
+            extracted = scan_pipeline.run(files_to_extract())
+        elif workers <= 1:
+            extracted = self._iter_sequential(files_to_extract())
+        else:
+            extracted = self._iter_parallel(files_to_extract(), workers, use_processes)
         
-        for original_path, metadata in metadata_dict.items():
-            original_filename = Path(original_path).name
-            
-            # Chercher le fichier dans le dossier cible
-            target_files = list(target_directory.rglob(original_filename))
-            
-            if not target_files:
-                print(f"Fichier non trouve: {original_filename}")
-                continue
-            
-            target_file = target_files[0]
-            
-            try:
-                # Charger les EXIF existants du fichier cible
-                try:
-                    current_exif = piexif.load(str(target_file))
-                except:
-                    # Si pas d'EXIF, créer une structure vide
-                    current_exif = {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+        pending = 0
+        try:
+            for metadata, block in extracted:
+                # Photos réutilisées placées avant la photo extraite
+                file_path, stat_info, previous = waiting.popleft()
+                while previous is not None:
+                    self._backup_exif(exif_output, file_path, stat_info)
+                    yield str(file_path), previous
+                    file_path, stat_info, previous = waiting.popleft()
                 
-                # Restaurer la date de création si disponible
-                if metadata.get('date_creation') and metadata.get('heure_creation'):
-                    try:
-                        # Reconvertir la date au format EXIF: "YYYY:MM:DD HH:MM:SS"
-                        date_str = metadata['date_creation']  # "16/05/2025"
-                        time_str = metadata['heure_creation']  # "17:00:50"
-                        
-                        # Parser la date
-                        day, month, year = date_str.split('/')
-                        exif_datetime = f"{year}:{month.zfill(2)}:{day.zfill(2)} {time_str}"
-                        
-                        print(f"Restauration date: {exif_datetime} pour {target_file.name}")
-                        
-                        # Mettre à jour les champs de date EXIF
-                        current_exif["Exif"][piexif.ExifIFD.DateTimeOriginal] = exif_datetime.encode('utf-8')
-                        current_exif["Exif"][piexif.ExifIFD.DateTimeDigitized] = exif_datetime.encode('utf-8')
-                        current_exif["0th"][piexif.ImageIFD.DateTime] = exif_datetime.encode('utf-8')
-                        
-                    except Exception as e:
-                        print(f"Erreur conversion date pour {target_file.name}: {e}")
+                self._backup_exif(exif_output, file_path, stat_info, block)
+                self.correct_date(file_path, metadata)
+                metadata['taille'] = stat_info.st_size
+                metadata['mtime_ns'] = stat_info.st_mtime_ns
                 
-                # Restaurer le GPS si disponible
-                if metadata.get('gps_latitude') is not None and metadata.get('gps_longitude') is not None:
-                    try:
-                        lat = float(metadata['gps_latitude'])
-                        lon = float(metadata['gps_longitude'])
-                        
-                        # Convertir en format DMS pour EXIF
-                        def decimal_to_dms(decimal):
-                            abs_decimal = abs(decimal)
-                            degrees = int(abs_decimal)
-                            minutes_float = (abs_decimal - degrees) * 60
-                            minutes = int(minutes_float)
-                            seconds = (minutes_float - minutes) * 60
-                            return ((degrees, 1), (minutes, 1), (int(seconds * 1000), 1000))
-                        
-                        lat_dms = decimal_to_dms(lat)
-                        lon_dms = decimal_to_dms(lon)
-                        lat_ref = 'N' if lat >= 0 else 'S'
-                        lon_ref = 'E' if lon >= 0 else 'W'
-                        
-                        current_exif["GPS"][piexif.GPSIFD.GPSLatitude] = lat_dms
-                        current_exif["GPS"][piexif.GPSIFD.GPSLatitudeRef] = lat_ref.encode('utf-8')
-                        current_exif["GPS"][piexif.GPSIFD.GPSLongitude] = lon_dms
-                        current_exif["GPS"][piexif.GPSIFD.GPSLongitudeRef] = lon_ref.encode('utf-8')
-                        
-                        print(f"Restauration GPS: {lat}, {lon} pour {target_file.name}")
-                        
-                    except Exception as e:
-                        print(f"Erreur conversion GPS pour {target_file.name}: {e}")
+                if checkpoint_output is not None:
+                    checkpoint_output.write(self._photo_line(str(file_path), metadata))
+                    pending += 1
+                    if pending >= self.checkpoint_interval:
+                        _sync_file(checkpoint_output)
+                        pending = 0
                 
-                # Appliquer les metadonnees mises a jour
-                exif_bytes = piexif.dump(current_exif)
-                piexif.insert(exif_bytes, str(target_file))
+                yield str(file_path), metadata
+            
+            while waiting:
+                file_path, stat_info, previous = waiting.popleft()
+                self._backup_exif(exif_output, file_path, stat_info)
+                yield str(file_path), previous
+            
+            if exif_output is not None:
+                self._close_exif_output(exif_output)
+        finally:
+            # Arrête les extracteurs si l'appelant s'interrompt avant la fin
+            extracted.close()
+            if checkpoint_output is not None:
+                _sync_file(checkpoint_output)
+                checkpoint_output.close()
+            if scan_pipeline is not None:
+                self.pipeline_stats = scan_pipeline.stats
+            if exif_output is not None and not exif_output.closed:
+                # Scan interrompu : la sauvegarde précédente est conservée
+                exif_output.abort()
+        
+        files_read = self.files_read - files_before
+        bytes_read = self.bytes_read - bytes_before
+        self.log_date_rules()
+        if files_read:
+            log_event(logger, SUMMARY, 'lecture', "Octets lus: %d (%d par fichier)",
+                      bytes_read, bytes_read // files_read, octets=bytes_read, fichiers=files_read)
+        
+        pruned = len(previous_metadata) - counts['retrouvees']
+        reused = counts['photos'] - counts['extraites'] - counts['reprises']
+        self.scan_summary = {
+            'reutilisees': reused,
+            'reprises': counts['reprises'],
+            'extraites': counts['extraites'],
+            'supprimees': pruned
+        }
+        if self.stats is not None:
+            self.stats.count('octets_lus', bytes_read)
+            self.stats.counters.update(self.scan_summary)
+            self.stats.finish()
+        if previous_metadata:
+            log_event(logger, SUMMARY, 'scan_bilan',
+                      "Entrees reutilisees: %d, re-extraites: %d, supprimees: %d",
+                      reused, counts['extraites'], pruned, **self.scan_summary)
+    
+    def _open_exif_archive(self):
+        """
+        Ouvre la sauvegarde complète des EXIF, si elle existe.
+        
+        Returns:
+            ExifArchive: Sauvegarde, ou None si absente ou illisible
+        """
+        if not self.exif_archive_file.exists():
+            return None
+        try:
+            return ExifArchive(self.exif_archive_file)
+        except (ExifArchiveError, OSError) as e:
+            logger.warning("Sauvegarde des EXIF ignoree: %s", e)
+            return None
+    
+    def _open_exif_output(self, incremental=True):
+        """
+        Prépare l'écriture de la sauvegarde complète des EXIF d'un scan.
+        
+        Args:
+            incremental (bool): Recopier les EXIF des photos inchangées depuis
+                la sauvegarde précédente
+            
+        Returns:
+            ExifArchiveWriter: Sauvegarde en cours, ou None si exif_backup
+                n'est pas activé
+        """
+        if not self.exif_backup:
+            return None
+        previous = self._open_exif_archive() if incremental else None
+        return ExifArchiveWriter(self.exif_archive_file, previous)
+    
+    def _backup_exif(self, exif_output, file_path, stat_info, block=None):
+        """
+        Ajoute les EXIF complets d'une photo JPEG à la sauvegarde en cours.
+        
+        Sans structure lue pendant l'extraction (photo réutilisée ou
+        reprise), celle de la sauvegarde précédente est recopiée si le
+        fichier n'a pas changé ; sinon l'en-tête du fichier est relu.
+        
+        Args:
+            exif_output (ExifArchiveWriter): Sauvegarde en cours, ou None
+            file_path (Path): Chemin de la photo
+            stat_info (os.stat_result): Informations du fichier
+            block (bytes): Structure EXIF lue pendant l'extraction, ou None
+        """
+        if exif_output is None or file_path.suffix.lower() not in ARCHIVED_SUFFIXES:
+            return
+        
+        with self._timer('sauvegarde_exif'):
+            if block is None:
+                if exif_output.copy(file_path, stat_info):
+                    return
+                try:
+                    block, bytes_read = read_exif_block(file_path)
+                except (ExifHeaderError, OSError) as e:
+                    logger.warning("EXIF complets non sauvegardes pour %s: %s", file_path.name, e)
+                    self._count_error(e)
+                    return
+                self.count_bytes_read(bytes_read, files_read=0)
+            
+            if block:
+                exif_output.add(file_path, block, stat_info)
+    
+    def _close_exif_output(self, exif_output):
+        """Termine la sauvegarde complète des EXIF d'un scan."""
+        exif_output.close()
+        if self.stats is not None:
+            self.stats.count('octets_ecrits', exif_output.size)
+        log_event(logger, SUMMARY, 'sauvegarde_exif',
+                  "EXIF complets sauvegardes: %s (%d photos, %d structures, %d octets)",
+                  self.exif_archive_file, len(exif_output), exif_output.block_count,
+                  exif_output.size, fichier=str(self.exif_archive_file), photos=len(exif_output),
+                  structures=exif_output.block_count, octets=exif_output.size)
+    
+    def _iter_sequential(self, photo_files):
+        """
+        Extrait les métadonnées des photos une par une.
+        
+        Yields:
+            tuple: (métadonnées, structure EXIF lue ou None) de chaque photo,
+                dans l'ordre de photo_files
+        """
+        for file_path in photo_files:
+            metadata, block = _extract_worker(self, file_path)
+            _log_extracted(file_path, metadata)
+            yield metadata, block
+    
+    def _iter_parallel(self, photo_files, workers, use_processes):
+        """
+        Extrait les métadonnées des photos avec un pool de threads ou de processus.
+        
+        Args:
+            photo_files (iterator): Photos à traiter, lues au fur et à mesure
+            workers (int): Taille du pool
+            use_processes (bool): Utiliser des processus plutôt que des threads
+            
+        Yields:
+            tuple: (métadonnées, structure EXIF lue ou None) de chaque photo,
+                dans l'ordre de photo_files
+        """
+        if use_processes:
+            # Le gestionnaire (fuseaux, lieux) est transmis une seule fois
+            # à chaque processus, pas à chaque photo
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_extract_process,
+                                           initargs=(self,))
+            worker = _extract_process_worker
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers)
+            worker = partial(_extract_worker, self)
+        
+        logger.info("Extraction parallele: %d %s", workers, 'processus' if use_processes else 'threads')
+        
+        # Une fenêtre de tâches en attente laisse le parcours avancer pendant
+        # l'extraction, et les résultats restent dans l'ordre des fichiers
+        submitted = deque()
+        
+        def submit_order():
+            for file_path in photo_files:
+                submitted.append(file_path)
+                yield file_path
+        
+        with executor:
+            for result in _ordered_map(executor, worker, submit_order(), workers * 4):
+                file_path = submitted.popleft()
+                if use_processes:
+                    # Les compteurs des processus sont reportés dans le gestionnaire
+                    result, bytes_read, files_read, stats = result
+                    self.count_bytes_read(bytes_read, files_read)
+                    if stats is not None:
+                        self.stats.merge(stats)
+                _log_extracted(file_path, result[0])
+                yield result
+    
+    def _photo_line(self, filepath, metadata):
+        """
+        Sérialise une photo sur une ligne JSONL.
+        
+        Args:
+            filepath (str): Chemin de la photo
+            metadata (dict): Métadonnées de la photo
+            
+        Returns:
+            str: Ligne JSONL terminée par un retour à la ligne
+        """
+        return _jsonl_line({
+            'type': 'photo',
+            'chemin': filepath,
+            'donnees': self._prepare_for_save(filepath, metadata)
+        })
+    
+    def _load_checkpoint(self):
+        """
+        Lit les photos enregistrées dans le fichier de reprise.
+        
+        Une dernière ligne incomplète (extraction interrompue pendant
+        l'écriture) est retirée du fichier pour pouvoir le compléter.
+        
+        Returns:
+            PhotoRecords: Métadonnées des photos déjà extraites
+        """
+        checkpoint_metadata = PhotoRecords()
+        valid_size = 0
+        
+        with open(self.checkpoint_file, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+                if record.get('type') == 'photo':
+                    checkpoint_metadata[record['chemin']] = self._restore_raw_exif(
+                        record['chemin'], record['donnees']
+                    )
+        
+        if valid_size < self.checkpoint_file.stat().st_size:
+            with open(self.checkpoint_file, 'r+b') as f:
+                f.truncate(valid_size)
+        
+        return checkpoint_metadata
+    
+    def clear_checkpoint(self):
+        """Supprime le fichier de reprise une fois la sauvegarde finale écrite."""
+        if self.checkpoint_file.exists():
+            self.checkpoint_file.unlink()
+    
+    def _prepare_for_save(self, filepath, metadata):
+        """
+        Prépare les métadonnées d'une photo pour l'écriture sur disque.
+        
+        Args:
+            filepath (str): Chemin de la photo
+            metadata (dict): Métadonnées de la photo
+            
+        Returns:
+            dict: Métadonnées sérialisables en JSON
+        """
+        # Copier les métadonnées sans les données EXIF brutes
+        clean_metadata = {k: v for k, v in metadata.items() if k != 'raw_exif'}
+        
+        # Sauvegarder les données EXIF pour la restauration
+        if 'raw_exif' in metadata:
+            try:
+                exif_bytes = piexif.dump(metadata['raw_exif'])
+                import base64
+                clean_metadata['raw_exif_b64'] = base64.b64encode(exif_bytes).decode('utf-8')
+            except Exception as e:
+                logger.warning("Erreur sauvegarde EXIF pour %s: %s", filepath, e)
+        
+        return clean_metadata
+    
+    def save_metadata(self, metadata_dict):
+        """
+        Sauvegarde les métadonnées dans un fichier JSON ou JSONL.
+        
+        Au format JSONL, chaque photo est écrite dès qu'elle est fournie :
+        metadata_dict peut alors être un itérateur (par exemple iter_scan)
+        et rien n'est gardé en mémoire.
+        
+        Args:
+            metadata_dict (dict): Dictionnaire des métadonnées, ou itérable
+                de couples (chemin, métadonnées)
                 
-                # Modifier seulement la date de création du fichier système (pas la modification)
-                if metadata.get('date_creation') and metadata.get('heure_creation'):
-                    try:
-                        from datetime import datetime
-                        import time
-                        
-                        # Reconvertir en objet datetime
-                        date_str = metadata['date_creation']  # "16/05/2025"
-                        time_str = metadata['heure_creation']  # "17:00:50"
-                        
-                        day, month, year = date_str.split('/')
-                        hour, minute, second = time_str.split(':')
-                        
-                        # Créer l'objet datetime
-                        new_datetime = datetime(
-                            int(year), int(month), int(day),
-                            int(hour), int(minute), int(second)
-                        )
-                        
-                        # Convertir en timestamp
-                        timestamp = new_datetime.timestamp()
-                        
-                        # Pour Windows : modifier SEULEMENT la date de création (pas la modification)
-                        try:
-                            import platform
-                            if platform.system() == "Windows":
-                                import ctypes
-                                from ctypes import wintypes
-                                
-                                # Convertir datetime en FILETIME Windows
-                                # FILETIME = nombre de 100-nanosecondes depuis 1er janvier 1601
-                                import calendar
-                                epoch_as_filetime = 116444736000000000  # January 1, 1970 as FILETIME
-                                timestamp_100ns = int(timestamp * 10000000) + epoch_as_filetime
-                                
-                                # Structures Windows
-                                class FILETIME(ctypes.Structure):
-                                    _fields_ = [("dwLowDateTime", wintypes.DWORD),
-                                              ("dwHighDateTime", wintypes.DWORD)]
-                                
-                                # Convertir timestamp en FILETIME
-                                ft = FILETIME()
-                                ft.dwLowDateTime = timestamp_100ns & 0xFFFFFFFF
-                                ft.dwHighDateTime = timestamp_100ns >> 32
-                                
-                                # Ouvrir le fichier avec les bonnes permissions
-                                kernel32 = ctypes.windll.kernel32
-                                handle = kernel32.CreateFileW(
-                                    str(target_file),
-                                    0x40000000,  # GENERIC_WRITE
-                                    0,           # No sharing
-                                    None,        # Default security
-                                    3,           # OPEN_EXISTING
-                                    0,           # Normal attributes
-                                    None         # No template
-                                )
-                                
-                                if handle != -1:  # INVALID_HANDLE_VALUE
-                                    # Modifier SEULEMENT la date de création (1er paramètre)
-                                    # None, None = ne pas changer accès et modification
-                                    success = kernel32.SetFileTime(handle, ctypes.byref(ft), None, None)
-                                    kernel32.CloseHandle(handle)
-                                    
-                                    if success:
-                                        print(f"Date creation Windows mise a jour: {new_datetime.strftime('%d/%m/%Y %H:%M:%S')} pour {target_file.name}")
-                                        print(f"   (Date de modification preservee)")
-                                    else:
-                                        print(f"Echec modification date creation Windows pour {target_file.name}")
-                                else:
-                                    print(f"Impossible d'ouvrir le fichier pour modification date creation: {target_file.name}")
-                            else:
-                                # Sur autres systèmes, on ne peut modifier que l'accès/modification
-                                print(f"Modification date creation non supportee sur {platform.system()}")
-                                print(f"   (Seules les dates d'acces/modification peuvent etre modifiees)")
-                                
-                        except Exception as e:
-                            print(f"Erreur modification date creation pour {target_file.name}: {e}")
-                        
-                    except Exception as e:
-                        print(f"Erreur modification date fichier pour {target_file.name}: {e}")
+        Returns:
+            int: Nombre de photos sauvegardées
+        """
+        with self._timer('sauvegarde'):
+            total_photos = self._save_metadata(metadata_dict)
+        if self.stats is not None:
+            self.stats.count('octets_ecrits', self.metadata_file.stat().st_size)
+        
+        _log_saved(self.metadata_file, total_photos)
+        return total_photos
+    
+    def _save_metadata(self, metadata_dict):
+        """Écrit le fichier de métadonnées (voir save_metadata)."""
+        items = metadata_dict.items() if hasattr(metadata_dict, 'items') else metadata_dict
+        extraction_date = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        
+        if self.output_format == 'sqlite':
+            # Une seule transaction : la base garde son contenu en cas d'erreur
+            with SQLiteMetadataStore(self.metadata_file) as store:
+                total_photos = store.save(
+                    ((filepath, self._prepare_for_save(filepath, metadata))
+                     for filepath, metadata in items),
+                    extraction_date
+                )
+            return total_photos
+        
+        # Écrire dans un fichier temporaire puis le renommer : un fichier
+        # à moitié écrit ne remplace jamais une sauvegarde valide
+        temp_file = self.metadata_file.with_name(self.metadata_file.name + '.tmp')
+        
+        if self.output_format == 'jsonl':
+            total_photos = 0
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                f.write(_jsonl_line({'type': 'entete', 'extraction_date': extraction_date}))
+                for filepath, metadata in items:
+                    f.write(self._photo_line(filepath, metadata))
+                    f.flush()
+                    total_photos += 1
+                f.write(_jsonl_line({'type': 'fin', 'total_photos': total_photos}))
+                _sync_file(f)
+        else:
+            # Le nombre de photos est écrit avant les photos : un itérateur
+            # est d'abord rangé sous forme compacte
+            if not hasattr(metadata_dict, '__len__'):
+                metadata_dict = PhotoRecords(items)
+                items = metadata_dict.items()
+            total_photos = len(metadata_dict)
+            
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                _write_json_document(f, extraction_date, total_photos, (
+                    (filepath, self._prepare_for_save(filepath, metadata))
+                    for filepath, metadata in items
+                ))
+                _sync_file(f)
+        
+        os.replace(temp_file, self.metadata_file)
+        return total_photos
+    
+    def display_summary(self, metadata_dict, details=True):
+        """
+        Affiche un résumé des métadonnées extraites.
+        
+        Args:
+            metadata_dict (dict): Dictionnaire des métadonnées, ou itérable
+                de couples (chemin, métadonnées) comme iter_metadata
+            details (bool): Afficher chaque photo, pas seulement les statistiques
+        """
+        print("\n" + "="*60)
+        print("RESUME DES METADONNEES EXTRAITES")
+        print("="*60)
+        
+        if hasattr(metadata_dict, 'items'):
+            items = metadata_dict.items()
+            print(f"Total des photos: {len(metadata_dict)}")
+        else:
+            items = metadata_dict
+        
+        total_photos = 0
+        photos_avec_gps = 0
+        photos_avec_date = 0
+        
+        if details:
+            print("\nDETAILS PAR PHOTO:")
+            print("-" * 60)
+        
+        for _, metadata in items:
+            total_photos += 1
+            nom = metadata['nom']
+            date = metadata['date_creation'] or "Non trouvee"
+            heure = metadata['heure_creation'] or "Non trouvee"
+            
+            if metadata['gps_latitude'] and metadata['gps_longitude']:
+                gps_info = f"GPS: {metadata['gps_latitude']:.4f}, {metadata['gps_longitude']:.4f}"
+                photos_avec_gps += 1
+            else:
+                gps_info = "Pas de GPS"
+            
+            if metadata['date_creation']:
+                photos_avec_date += 1
+            
+            if not details:
+                continue
+            print(f"{nom}")
+            print(f"   Date: {date} a {heure}")
+            print(f"   {gps_info}")
+            if metadata.get('ville'):
+                lieu = (metadata['ville'], metadata.get('region'), metadata.get('pays'))
+                print(f"   Lieu: {', '.join(filter(None, lieu))}")
+            if metadata.get('localisation'):
+                print(f"   Carte: {metadata['localisation']}")
+            print()
+        
+        print("-" * 60)
+        print(f"STATISTIQUES:")
+        print(f"   - Photos avec date: {photos_avec_date}/{total_photos}")
+        print(f"   - Photos avec GPS: {photos_avec_gps}/{total_photos}")
+        print("=" * 60)
+    
+    def detect_file_format(self):
+        """
+        Détermine le format du fichier de métadonnées d'après son contenu.
+        
+        Returns:
+            str: 'sqlite', 'jsonl' ou 'json'
+        """
+        if is_sqlite_file(self.metadata_file):
+            return 'sqlite'
+        
+        with open(self.metadata_file, 'r', encoding='utf-8') as f:
+            first_line = f.readline()
+        
+        try:
+            first_record = json.loads(first_line)
+        except ValueError:
+            # Début d'un JSON indenté sur plusieurs lignes
+            return 'json'
+        
+        if isinstance(first_record, dict) and first_record.get('type') == 'entete':
+            return 'jsonl'
+        return 'json'
+    
+    def read_file_info(self):
+        """
+        Lit la date d'extraction et le nombre de photos du fichier de métadonnées.
+        
+        Returns:
+            dict: 'extraction_date' et 'total_photos'
+        """
+        file_format = self.detect_file_format()
+        
+        if file_format == 'sqlite':
+            with SQLiteMetadataStore(self.metadata_file) as store:
+                return store.info()
+        
+        if file_format == 'json':
+            with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {
+                'extraction_date': data.get('extraction_date'),
+                'total_photos': data.get('total_photos', 0)
+            }
+        
+        info = {'extraction_date': None, 'total_photos': 0}
+        with open(self.metadata_file, 'r', encoding='utf-8') as f:
+            info['extraction_date'] = json.loads(f.readline()).get('extraction_date')
+        
+        # Le total est dans la dernière ligne ; sans elle (extraction
+        # interrompue), on compte les photos
+        last_record = _read_last_jsonl_record(self.metadata_file)
+        if last_record and last_record.get('type') == 'fin':
+            info['total_photos'] = last_record.get('total_photos', 0)
+        else:
+            info['total_photos'] = sum(1 for _ in self.iter_metadata())
+        return info
+    
+    def iter_metadata(self):
+        """
+        Lit les métadonnées photo par photo, quel que soit le format du fichier.
+        
+        Le fichier n'est jamais chargé entièrement en mémoire, même au
+        format JSON.
+        
+        Yields:
+            tuple: (chemin, métadonnées)
+        """
+        file_format = self.detect_file_format()
+        
+        if file_format == 'sqlite':
+            with SQLiteMetadataStore(self.metadata_file) as store:
+                for filepath, metadata in store.iter_photos():
+                    yield filepath, self._restore_raw_exif(filepath, metadata)
+            return
+        
+        if file_format == 'json':
+            with open(self.metadata_file, 'r', encoding='utf-8') as f:
+                for filepath, metadata in _iter_json_photos(f):
+                    yield filepath, self._restore_raw_exif(filepath, metadata)
+            return
+        
+        with open(self.metadata_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Dernière ligne tronquée par une extraction interrompue
+                    logger.warning("Ligne %d illisible ignoree dans %s", line_number, self.metadata_file)
+                    continue
+                if record.get('type') == 'photo':
+                    filepath = record['chemin']
+                    yield filepath, self._restore_raw_exif(filepath, record['donnees'])
+    
+    def _restore_raw_exif(self, filepath, metadata):
+        """
+        Reconvertit les données EXIF brutes sauvegardées en base64.
+        
+        Args:
+            filepath (str): Chemin de la photo
+            metadata (dict): Métadonnées lues depuis le fichier
+            
+        Returns:
+            dict: Métadonnées avec 'raw_exif' si présent
+        """
+        if 'raw_exif_b64' in metadata:
+            try:
+                import base64
+                exif_bytes = base64.b64decode(metadata['raw_exif_b64'])
+                metadata['raw_exif'] = piexif.load(exif_bytes)
+                del metadata['raw_exif_b64']
+            except Exception as e:
+                logger.warning("Erreur chargement EXIF pour %s: %s", filepath, e)
+        return metadata
+    
+    def load_metadata(self):
+        """
+        Charge les métadonnées depuis le fichier JSON ou JSONL.
+        
+        Returns:
+            dict: Dictionnaire des métadonnées
+        """
+        if not self.metadata_file.exists():
+            logger.warning("Fichier de metadonnees non trouve: %s", self.metadata_file)
+            return {}
+        
+        return PhotoRecords(self.iter_metadata())
+    
+    def build_filename_index(self, target_directory):
+        """
+        Parcourt le dossier cible une seule fois et indexe les photos par nom.
+        
+        Args:
+            target_directory (Path): Dossier à indexer
+            
+        Returns:
+            dict: Nom de fichier -> liste des chemins portant ce nom
+        """
+        filename_index = {}
+        
+        # Les motifs d'inclusion portent sur le dossier scanné, pas sur la cible
+        with self._timer('index'):
+            for filepath, _ in iter_photo_files(target_directory, self.supported_formats,
+                                                skip_hidden=self.skip_hidden):
+                filepath = Path(filepath)
+                filename_index.setdefault(filepath.name, []).append(filepath)
+        
+        return filename_index
+    
+    def build_fingerprint_index(self, filename_index):
+        """
+        Prépare l'index des empreintes des photos du dossier cible.
+        
+        Les empreintes sont calculées à la demande par resolve_target_file,
+        seulement pour les photos introuvables ou ambiguës sous leur nom.
+        
+        Args:
+            filename_index (dict): Index construit par build_filename_index
+            
+        Returns:
+            FingerprintIndex: Index des empreintes
+        """
+        paths = (path for paths in filename_index.values() for path in paths)
+        return FingerprintIndex(paths, compute=self.content_fingerprint)
+    
+    def resolve_target_file(self, filename_index, original_path, metadata,
+                            target_directory, resolution_stats=None, fingerprint_index=None):
+        """
+        Retrouve le fichier cible correspondant à une entrée des métadonnées.
+        
+        Si plusieurs fichiers portent le même nom, on privilégie dans l'ordre :
+        le même contenu (empreinte), le même chemin relatif que l'original,
+        puis la même taille, puis le premier fichier trouvé. Une photo absente
+        sous son nom (renommée) est cherchée par son empreinte, de même que
+        celle dont le seul homonyme n'est pas à la même place.
+        
+        Args:
+            filename_index (dict): Index construit par build_filename_index
+            original_path (str): Chemin d'origine de la photo
+            metadata (dict): Métadonnées de la photo
+            target_directory (Path): Dossier cible
+            resolution_stats (dict): Compteurs trouves/absents/ambigus/empreinte
+                à mettre à jour
+            fingerprint_index (FingerprintIndex): Empreintes du dossier cible,
+                utilisées si la photo a une empreinte
+            
+        Returns:
+            Path: Fichier cible, ou None si introuvable
+        """
+        candidates = filename_index.get(Path(original_path).name)
+        fingerprint = metadata.get(FINGERPRINT_FIELD) if fingerprint_index is not None else None
+        
+        if not candidates:
+            # Photo renommée : la chercher par son contenu
+            matches = fingerprint_index.find(fingerprint) if fingerprint else []
+            if resolution_stats is not None:
+                if matches:
+                    resolution_stats['trouves'] += 1
+                    resolution_stats['empreinte'] += 1
+                else:
+                    resolution_stats['absents'] += 1
+            return self._closest_match(matches, original_path, target_directory) if matches else None
+        
+        if resolution_stats is not None:
+            resolution_stats['trouves'] += 1
+            if len(candidates) > 1:
+                resolution_stats['ambigus'] += 1
+        
+        relative_target = self._relative_target(original_path, target_directory)
+        
+        # Seule photo de ce nom, à la même place : pas besoin de son empreinte
+        if len(candidates) == 1 and (not fingerprint or candidates[0] == relative_target):
+            return candidates[0]
+        
+        # 1. Même contenu, sous ce nom ou un autre (photo renommée dont le
+        # nom a été repris par une autre photo)
+        if fingerprint:
+            matches = [candidate for candidate in candidates
+                       if fingerprint_index.fingerprint(candidate) == fingerprint]
+            if not matches:
+                matches = fingerprint_index.find(fingerprint)
+            if matches:
+                if resolution_stats is not None:
+                    resolution_stats['empreinte'] += 1
+                return self._closest_match(matches, original_path, target_directory)
+        
+        # 2. Même chemin relatif que dans le dossier d'origine
+        if relative_target in candidates:
+            return relative_target
+        
+        # 3. Même taille que le fichier d'origine
+        original_size = metadata.get('taille')
+        if original_size is not None:
+            for candidate in candidates:
+                try:
+                    if candidate.stat().st_size == original_size:
+                        return candidate
+                except OSError:
+                    continue
+        
+        # 4. Premier fichier trouvé
+        return candidates[0]
+    
+    def _relative_target(self, original_path, target_directory):
+        """
+        Chemin qu'aurait une photo dans le dossier cible à la même place
+        que dans le dossier d'origine.
+        
+        Returns:
+            Path: Chemin dans le dossier cible, ou None si la photo n'était
+                pas dans photo_directory
+        """
+        try:
+            return target_directory / Path(original_path).relative_to(self.photo_directory)
+        except ValueError:
+            return None
+    
+    def _closest_match(self, matches, original_path, target_directory):
+        """Parmi des photos de même contenu, préfère celle à la même place que l'original."""
+        relative_target = self._relative_target(original_path, target_directory)
+        return relative_target if relative_target in matches else matches[0]
+    
+    def restore_metadata(self, target_directory=None, workers=1, dry_run=False, full_exif=True,
+                         in_place=False):
+        """
+        Restaure les métadonnées sur les photos.
+        
+        Chaque photo est réécrite dans un fichier temporaire qui remplace
+        ensuite l'original : une interruption ne laisse jamais de JPEG tronqué.
+        Les photos qui portent déjà les bonnes valeurs ne sont pas réécrites.
+        
+        Si metadata_simple.exif existe (extraction avec exif_backup), les
+        JPEG retrouvent tous leurs EXIF d'origine, et pas seulement la date
+        et le GPS.
+        
+        Avec in_place, seuls les octets modifiés du segment EXIF d'un JPEG
+        sont réécrits quand le segment garde sa taille (voir restore_file).
+        
+        Les règles date_rules corrigent les dates restaurées, sans modifier
+        le fichier de métadonnées.
+        
+        Args:
+            target_directory (str): Dossier cible (par défaut: dossier original)
+            workers (int): Nombre de photos restaurées en parallèle
+            dry_run (bool): Seulement indiquer les photos qui seraient modifiées
+            full_exif (bool): Utiliser la sauvegarde complète des EXIF si elle existe
+            in_place (bool): Modifier les JPEG sur place quand c'est possible
+            
+        Returns:
+            dict: Bilan de la restauration (compteurs, octets écrits, durée)
+        """
+        if target_directory is None:
+            target_directory = self.photo_directory
+        else:
+            target_directory = Path(target_directory)
+        
+        if not self.metadata_file.exists():
+            logger.warning("Fichier de metadonnees non trouve: %s", self.metadata_file)
+            logger.warning("Aucune metadonnees a restaurer.")
+            return None
+        
+        # Les entrées sont lues au fur et à mesure, sans charger tout le fichier
+        metadata_entries = self.iter_metadata()
+        first_entry = next(metadata_entries, None)
+        
+        if first_entry is None:
+            logger.warning("Aucune metadonnees a restaurer.")
+            return None
+        
+        log_event(logger, logging.INFO, 'restauration_debut', "Restauration des metadonnees...",
+                  cible=str(target_directory), simulation=dry_run)
+        start = time.perf_counter()
+        
+        self._start_stats('restauration')
+        
+        # Parcourir le dossier cible une seule fois
+        filename_index = self.build_filename_index(target_directory)
+        index_duration = time.perf_counter() - start
+        logger.info("Index des fichiers cibles construit en %.2f s (%d fichiers)",
+                    index_duration, sum(len(paths) for paths in filename_index.values()))
+        
+        resolution_stats = {'trouves': 0, 'absents': 0, 'ambigus': 0, 'empreinte': 0}
+        report = {'restaures': 0, 'inchanges': 0, 'a_modifier': 0, 'erreurs': 0, 'octets_ecrits': 0}
+        
+        # Empreintes des photos cibles, calculées seulement si le nom ne suffit pas
+        fingerprint_index = self.build_fingerprint_index(filename_index)
+        
+        exif_archive = self._open_exif_archive() if full_exif else None
+        if exif_archive is not None:
+            logger.info("Sauvegarde complete des EXIF: %d photos", len(exif_archive))
+        
+        def restore_jobs():
+            for original_path, metadata in chain([first_entry], metadata_entries):
+                # Chercher le fichier dans l'index du dossier cible
+                target_file = self.resolve_target_file(
+                    filename_index, original_path, metadata, target_directory, resolution_stats,
+                    fingerprint_index
+                )
+                
+                if target_file is None:
+                    log_event(logger, logging.WARNING, 'photo_absente', "Fichier non trouve: %s",
+                              Path(original_path).name, chemin=original_path)
+                    continue
+                
+                self.correct_date(original_path, metadata)
+                yield target_file, metadata, self._saved_exif_block(
+                    exif_archive, original_path, metadata, target_file
+                )
+        
+        try:
+            if workers <= 1:
+                results = (self.restore_file(target_file, metadata, dry_run, exif_block, in_place)
+                           for target_file, metadata, exif_block in restore_jobs())
+                self._collect_restore_results(results, report)
+            else:
+                logger.info("Restauration parallele: %d threads", workers)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = _ordered_map(
+                        executor,
+                        lambda job: self.restore_file(job[0], job[1], dry_run, job[2], in_place),
+                        restore_jobs(), workers * 4
+                    )
+                    self._collect_restore_results(results, report)
+        finally:
+            if exif_archive is not None:
+                exif_archive.close()
+        
+        return self._finish_restore_report(report, resolution_stats, index_duration, start,
+                                           dry_run)
+    
+    def _saved_exif_block(self, exif_archive, original_path, metadata, target_file):
+        """
+        Structure EXIF sauvegardée d'une photo à restaurer.
+        
+        Args:
+            exif_archive (ExifArchive): Sauvegarde complète, ou None
+            original_path (str): Chemin de la photo lors de l'extraction
+            metadata (dict): Métadonnées sauvegardées de la photo
+            target_file (Path): Photo à restaurer
+            
+        Returns:
+            bytes: Structure TIFF, ou None (pas de sauvegarde pour cette
+                photo, photo modifiée depuis, cible qui n'est pas un JPEG)
+        """
+        if exif_archive is None or target_file.suffix.lower() not in ARCHIVED_SUFFIXES:
+            return None
+        try:
+            with self._timer('lecture_sauvegarde_exif'):
+                return exif_archive.get(original_path, metadata.get('taille'),
+                                        metadata.get('mtime_ns'))
+        except ExifArchiveError as e:
+            logger.warning("EXIF complets illisibles pour %s: %s", target_file.name, e)
+            self._count_error(e)
+            return None
+    
+    def _finish_restore_report(self, report, resolution_stats, index_duration, start, dry_run):
+        """
+        Complète et affiche le bilan d'une restauration.
+        
+        Args:
+            report (dict): Compteurs remplis par _collect_restore_results
+            resolution_stats (dict): Compteurs de resolve_target_file
+            index_duration (float): Durée de construction de l'index
+            start (float): Début de la restauration (time.perf_counter)
+            dry_run (bool): La restauration était une simulation
+            
+        Returns:
+            dict: Bilan complet
+        """
+        duration = time.perf_counter() - start
+        if self.stats is not None:
+            self.stats.counters.update(resolution_stats)
+            self.stats.finish()
+        report.update({
+            'absents': resolution_stats['absents'],
+            'ambigus': resolution_stats['ambigus'],
+            'par_empreinte': resolution_stats.get('empreinte', 0),
+            'duree_index': index_duration,
+            'duree': duration,
+            'photos_par_seconde': report['restaures'] / duration if duration else 0.0
+        })
+        
+        logger.log(SUMMARY, "Index: construit en %.2f s - %d trouves (%d par empreinte), "
+                   "%d absents, %d ambigus",
+                   index_duration, resolution_stats['trouves'], report['par_empreinte'],
+                   resolution_stats['absents'], resolution_stats['ambigus'])
+        if dry_run:
+            logger.log(SUMMARY, "Simulation: %d photos a modifier, %d deja a jour",
+                       report['a_modifier'], report['inchanges'])
+        self.log_date_rules()
+        log_event(logger, SUMMARY, 'restauration_bilan',
+                  "Bilan: %d restaurees, %d inchangees, %d erreurs, %d non trouvees en %.2f s "
+                  "(%.1f photos/s, %.1f Mo/s ecrits)",
+                  report['restaures'], report['inchanges'], report['erreurs'], report['absents'],
+                  duration, report['photos_par_seconde'],
+                  report['octets_ecrits'] / duration / 1e6 if duration else 0.0,
+                  trouves=resolution_stats['trouves'], **report)
+        
+        return report
+    
+    def _collect_restore_results(self, results, report):
+        """
+        Additionne les résultats de restore_file dans le bilan.
+        
+        Args:
+            results: Itérable de couples (statut, octets écrits)
+            report (dict): Bilan à compléter
+        """
+        counters = {
+            'restaure': 'restaures',
+            'inchange': 'inchanges',
+            'a_modifier': 'a_modifier',
+            'erreur': 'erreurs'
+        }
+        for status, bytes_written in results:
+            report[counters[status]] += 1
+            report['octets_ecrits'] += bytes_written
+    
+    def restore_file(self, target_file, metadata, dry_run=False, exif_block=None, in_place=False):
+        """
+        Restaure la date et le GPS d'une photo.
+        
+        Le fichier n'est réécrit que si ses EXIF diffèrent des valeurs
+        sauvegardées. Avec exif_block, les EXIF du JPEG sont remplacés par la
+        structure sauvegardée, recopiée telle quelle quand elle porte déjà la
+        date et le GPS des métadonnées.
+        
+        Avec in_place, un JPEG dont le segment EXIF garde sa taille (balises
+        déjà présentes, structure sauvegardée de même taille) n'est pas
+        recopié : seuls les octets modifiés sont écrits dans le fichier.
+        Sinon, il est réécrit entièrement dans un fichier temporaire.
+        
+        Args:
+            target_file (Path): Photo à mettre à jour
+            metadata (dict): Métadonnées sauvegardées de la photo
+            dry_run (bool): Seulement indiquer ce qui serait modifié
+            exif_block (bytes): Structure EXIF complète sauvegardée, ou None
+            in_place (bool): Modifier le JPEG sur place quand c'est possible
+            
+        Returns:
+            tuple: (statut, nombre d'octets écrits), statut parmi 'restaure',
+                'inchange', 'a_modifier' (simulation) et 'erreur'
+        """
+        stats = self.stats
+        if stats is None:
+            return self._restore_file(target_file, metadata, dry_run, exif_block, in_place)
+        
+        start = time.perf_counter()
+        try:
+            return self._restore_file(target_file, metadata, dry_run, exif_block, in_place)
+        finally:
+            stats.file_done(target_file, time.perf_counter() - start)
+    
+    def _restore_file(self, target_file, metadata, dry_run, exif_block, in_place):
+        """Restaure la date et le GPS d'une photo (voir restore_file)."""
+        try:
+            # Sur place, seul le segment EXIF est lu ; le fichier entier ne
+            # l'est que s'il faut le réécrire
+            segment = None
+            if in_place and target_file.suffix.lower() in IN_PLACE_SUFFIXES:
+                segment = self._read_exif_segment(target_file)
+            image_data = None if segment is not None else self._read_image(target_file)
+            
+            if exif_block is not None:
+                # Les EXIF sauvegardés remplacent ceux du fichier : la date et
+                # le GPS sont comparés à ceux de la sauvegarde
+                current_exif = parse_exif_block(exif_block)
+            elif segment is not None:
+                current_exif = parse_exif_block(segment[0])
+            else:
+                current_exif = self._load_current_exif(image_data)
+            
+            exif_datetime = None
+            
+            # Restaurer la date de création si disponible
+            if metadata.get('date_creation') and metadata.get('heure_creation'):
+                try:
+                    # Reconvertir la date au format EXIF: "YYYY:MM:DD HH:MM:SS"
+                    date_str = metadata['date_creation']  # "16/05/2025"
+                    time_str = metadata['heure_creation']  # "17:00:50"
+                    
+                    # Parser la date
+                    day, month, year = date_str.split('/')
+                    exif_datetime = f"{year}:{month.zfill(2)}:{day.zfill(2)} {time_str}"
+                    
+                except Exception as e:
+                    logger.warning("Erreur conversion date pour %s: %s", target_file.name, e)
+            
+            gps = None
+            
+            # Restaurer le GPS si disponible
+            if metadata.get('gps_latitude') is not None and metadata.get('gps_longitude') is not None:
+                try:
+                    gps = (float(metadata['gps_latitude']), float(metadata['gps_longitude']))
+                except Exception as e:
+                    logger.warning("Erreur conversion GPS pour %s: %s", target_file.name, e)
+            
+            # Comparer avec les EXIF actuels avant de réécrire le fichier
+            changes = []
+            # Avec les EXIF sauvegardés, seule la date d'où vient celle des
+            # métadonnées doit correspondre : ils sont restaurés tels quels
+            date_source = metadata.get('source_date') if exif_block is not None else None
+            if exif_datetime and not self._same_exif_dates(current_exif, exif_datetime, date_source):
+                changes.append(f"date -> {exif_datetime}")
+            if gps and not self._same_exif_gps(current_exif, *gps):
+                changes.append(f"GPS -> {gps[0]}, {gps[1]}")
+            
+            exif_bytes = None
+            if exif_block is not None:
+                if changes:
+                    # Date ou GPS différents de la sauvegarde : corrigés dans sa copie
+                    exif_bytes = self._patch_saved_exif(exif_block, exif_datetime, gps, target_file)
+                else:
+                    # Copie exacte des EXIF sauvegardés, sans passer par piexif.dump
+                    exif_bytes = EXIF_HEADER + exif_block
+                try:
+                    current_block = (segment[0] if segment is not None
+                                     else jpeg_exif_block(image_data))
+                    unchanged = EXIF_HEADER + current_block == exif_bytes
+                except ExifHeaderError:
+                    unchanged = False
+                changes = [] if unchanged else ["EXIF complets"] + changes
+            
+            if not changes:
+                log_event(logger, logging.INFO, 'photo_restauree', "Inchange: %s", target_file.name,
+                          fichier=str(target_file), statut='inchange')
+                return 'inchange', 0
+            
+            if dry_run:
+                log_event(logger, logging.INFO, 'photo_restauree', "A modifier: %s (%s)",
+                          target_file.name, ', '.join(changes),
+                          fichier=str(target_file), statut='a_modifier', modifications=changes)
+                return 'a_modifier', 0
+            
+            if segment is not None:
+                written = self._write_in_place(target_file, segment, exif_bytes, exif_datetime, gps)
+                if written is not None:
+                    self._restored(target_file, metadata, changes, written, 'sur_place')
+                    return 'restaure', written
+                # Le segment doit changer de taille : réécriture complète
+                image_data = self._read_image(target_file)
+                if exif_block is None:
+                    current_exif = self._load_current_exif(image_data)
+            
+            if exif_bytes is None:
+                exif_bytes = self._dump_restored_exif(current_exif, exif_datetime, gps, target_file)
+            
+            # Appliquer les metadonnees mises a jour
+            with self._timer('piexif_insert'):
+                output = io.BytesIO()
+                piexif.insert(exif_bytes, image_data, output)
+                new_data = output.getvalue()
+            with self._timer('ecriture_fichier'):
+                _replace_file_atomically(target_file, new_data)
+            
+            self._restored(target_file, metadata, changes, len(new_data), 'complet')
+            return 'restaure', len(new_data)
                 
-                print(f"Restauré: {target_file.name}")
+        except Exception as e:
+            log_event(logger, logging.ERROR, 'photo_restauree', "Erreur restauration %s: %s",
+                      target_file.name, e, fichier=str(target_file), statut='erreur', erreur=str(e))
+            self._count_error(e)
+            return 'erreur', 0
+    
+    def _restored(self, target_file, metadata, changes, bytes_written, mode):
+        """Termine la restauration d'une photo écrite : date de création, mesures et journal."""
+        if self.stats is not None:
+            self.stats.count('octets_ecrits', bytes_written)
+            self.stats.count('ecritures_sur_place' if mode == 'sur_place' else 'reecritures')
+        
+        # Modifier seulement la date de création du fichier système (pas la modification)
+        if metadata.get('date_creation') and metadata.get('heure_creation'):
+            with self._timer('date_creation_fichier'):
+                self._set_creation_time(target_file, metadata)
+        
+        log_event(logger, logging.INFO, 'photo_restauree', "Restauré: %s", target_file.name,
+                  fichier=str(target_file), statut='restaure', modifications=changes,
+                  octets=bytes_written, ecriture=mode)
+    
+    def _read_image(self, target_file):
+        """Lit une photo entière."""
+        with self._timer('lecture_fichier'):
+            with open(target_file, 'rb') as f:
+                image_data = f.read()
+        if self.stats is not None:
+            self.stats.count('octets_lus', len(image_data))
+        return image_data
+    
+    def _load_current_exif(self, image_data):
+        """EXIF complets d'une photo lue par _read_image, au format piexif."""
+        try:
+            with self._timer('piexif_load'):
+                return piexif.load(image_data)
+        except Exception:
+            # Si pas d'EXIF, créer une structure vide
+            return {"0th": {}, "Exif": {}, "GPS": {}, "1st": {}, "thumbnail": None}
+    
+    def _read_exif_segment(self, target_file):
+        """
+        Lit le segment EXIF d'un JPEG à modifier sur place.
+        
+        Returns:
+            tuple: (structure TIFF, position dans le fichier), ou None si le
+                JPEG n'a pas de segment EXIF lisible
+        """
+        try:
+            with self._timer('lecture_exif'):
+                block, position, bytes_read = locate_jpeg_exif(target_file)
+        except ExifHeaderError:
+            return None
+        if self.stats is not None:
+            self.stats.count('octets_lus', bytes_read)
+        if block is None:
+            return None
+        return block, position
+    
+    def _write_in_place(self, target_file, segment, exif_bytes, exif_datetime, gps):
+        """
+        Écrit sur place les octets modifiés du segment EXIF.
+        
+        Args:
+            target_file (Path): JPEG à modifier
+            segment (tuple): (structure TIFF actuelle, position), de _read_exif_segment
+            exif_bytes (bytes): EXIF complets attendus, ou None pour ne
+                modifier que la date et le GPS
+            exif_datetime (str): Date au format EXIF, ou None
+            gps (tuple): (latitude, longitude), ou None
+            
+        Returns:
+            int: Nombre d'octets écrits, ou None si le segment doit changer de taille
+        """
+        block, position = segment
+        if exif_bytes is not None:
+            expected = exif_bytes[len(EXIF_HEADER):]
+            if len(expected) != len(block):
+                return None
+            patches = diff_patches(block, expected)
+        else:
+            try:
+                patches = plan_tag_patches(block, self._restored_values(exif_datetime, gps))
+            except ExifHeaderError:
+                patches = None
+            if patches is None:
+                return None
+        
+        with self._timer('ecriture_sur_place'):
+            return write_patches(target_file, position, patches)
+    
+    def _patch_saved_exif(self, exif_block, exif_datetime, gps, target_file):
+        """
+        Corrige la date et le GPS dans une copie des EXIF sauvegardés.
+        
+        Les valeurs sont remplacées à leur place quand les balises existent,
+        ce qui garde la structure et sa taille ; sinon les EXIF sont
+        reconstruits par piexif.
+        
+        Returns:
+            bytes: EXIF prêts pour piexif.insert
+        """
+        try:
+            patches = plan_tag_patches(exif_block, self._restored_values(exif_datetime, gps))
+        except ExifHeaderError:
+            patches = None
+        if patches is not None:
+            return EXIF_HEADER + apply_patches(exif_block, patches)
+        
+        with self._timer('piexif_load'):
+            exif_dict = piexif.load(EXIF_HEADER + exif_block)
+        return self._dump_restored_exif(exif_dict, exif_datetime, gps, target_file)
+    
+    def _restored_values(self, exif_datetime, gps):
+        """
+        Balises EXIF à écrire pour une date et une position.
+        
+        Args:
+            exif_datetime (str): Date au format EXIF, ou None
+            gps (tuple): (latitude, longitude), ou None
+            
+        Returns:
+            dict: Valeurs au format piexif ("0th", "Exif", "GPS")
+        """
+        values = {"0th": {}, "Exif": {}, "GPS": {}}
+        if exif_datetime:
+            date_value = exif_datetime.encode('utf-8')
+            values["Exif"][piexif.ExifIFD.DateTimeOriginal] = date_value
+            values["Exif"][piexif.ExifIFD.DateTimeDigitized] = date_value
+            values["0th"][piexif.ImageIFD.DateTime] = date_value
+        
+        if gps:
+            lat, lon = gps
+            values["GPS"][piexif.GPSIFD.GPSLatitude] = _decimal_to_dms(lat)
+            values["GPS"][piexif.GPSIFD.GPSLatitudeRef] = b'N' if lat >= 0 else b'S'
+            values["GPS"][piexif.GPSIFD.GPSLongitude] = _decimal_to_dms(lon)
+            values["GPS"][piexif.GPSIFD.GPSLongitudeRef] = b'E' if lon >= 0 else b'W'
+        return values
+    
+    def _dump_restored_exif(self, exif_dict, exif_datetime, gps, target_file):
+        """
+        Écrit la date et le GPS sauvegardés dans des EXIF au format piexif.
+        
+        Args:
+            exif_dict (dict): EXIF à compléter (modifiés sur place)
+            exif_datetime (str): Date au format EXIF, ou None
+            gps (tuple): (latitude, longitude), ou None
+            target_file (Path): Photo restaurée
+            
+        Returns:
+            bytes: EXIF prêts pour piexif.insert
+        """
+        if exif_datetime:
+            logger.debug("Restauration date: %s pour %s", exif_datetime, target_file.name)
+        if gps:
+            logger.debug("Restauration GPS: %s, %s pour %s", gps[0], gps[1], target_file.name)
+        
+        # Mettre à jour les champs de date et de GPS
+        for ifd, values in self._restored_values(exif_datetime, gps).items():
+            exif_dict[ifd].update(values)
+        
+        with self._timer('piexif_dump'):
+            return piexif.dump(exif_dict)
+    
+    def _same_exif_dates(self, exif_dict, exif_datetime, source=None):
+        """
+        Indique si les trois dates EXIF valent déjà exif_datetime.
+        
+        Args:
+            exif_dict (dict): EXIF actuels au format piexif
+            exif_datetime (str): Date attendue "YYYY:MM:DD HH:MM:SS"
+            source (str): Source EXIF de la date (voir EXIF_DATE_TAGS) : seule
+                cette date est comparée, les autres sont laissées telles quelles
+            
+        Returns:
+            bool: True si aucune date n'est à modifier
+        """
+        expected = exif_datetime.encode('utf-8')
+        if source in EXIF_DATE_TAGS:
+            ifd, tag = EXIF_DATE_TAGS[source]
+            value = exif_dict[ifd].get(tag)
+            return isinstance(value, bytes) and value.rstrip(b'\x00 ') == expected
+        return (exif_dict["Exif"].get(piexif.ExifIFD.DateTimeOriginal) == expected
+                and exif_dict["Exif"].get(piexif.ExifIFD.DateTimeDigitized) == expected
+                and exif_dict["0th"].get(piexif.ImageIFD.DateTime) == expected)
+    
+    def _same_exif_gps(self, exif_dict, latitude, longitude):
+        """
+        Indique si les coordonnées GPS EXIF correspondent déjà à la position donnée.
+        
+        La comparaison tolère l'arrondi au millième de seconde d'arc fait
+        lors de l'écriture.
+        
+        Args:
+            exif_dict (dict): EXIF actuels au format piexif
+            latitude (float): Latitude attendue
+            longitude (float): Longitude attendue
+            
+        Returns:
+            bool: True si le GPS n'est pas à modifier
+        """
+        gps_data = exif_dict.get("GPS") or {}
+        try:
+            current_lat = self.get_decimal_from_dms(
+                gps_data[piexif.GPSIFD.GPSLatitude],
+                gps_data[piexif.GPSIFD.GPSLatitudeRef].decode('utf-8')
+            )
+            current_lon = self.get_decimal_from_dms(
+                gps_data[piexif.GPSIFD.GPSLongitude],
+                gps_data[piexif.GPSIFD.GPSLongitudeRef].decode('utf-8')
+            )
+        except (KeyError, IndexError, TypeError, ValueError, ZeroDivisionError):
+            return False
+        
+        return (abs(current_lat - latitude) < GPS_TOLERANCE
+                and abs(current_lon - longitude) < GPS_TOLERANCE)
+    
+    def _set_creation_time(self, target_file, metadata):
+        """
+        Applique la date de prise de vue comme date de création du fichier.
+        
+        Seul Windows permet de modifier la date de création ; la date de
+        modification n'est pas changée.
+        
+        Args:
+            target_file (Path): Photo à mettre à jour
+            metadata (dict): Métadonnées contenant date_creation et heure_creation
+        """
+        try:
+            # Reconvertir en objet datetime
+            date_str = metadata['date_creation']  # "16/05/2025"
+            time_str = metadata['heure_creation']  # "17:00:50"
+            
+            day, month, year = date_str.split('/')
+            hour, minute, second = time_str.split(':')
+            
+            # Créer l'objet datetime
+            new_datetime = datetime(
+                int(year), int(month), int(day),
+                int(hour), int(minute), int(second)
+            )
+            
+            # Convertir en timestamp
+            timestamp = new_datetime.timestamp()
+            
+            # Pour Windows : modifier SEULEMENT la date de création (pas la modification)
+            try:
+                import platform
+                if platform.system() == "Windows":
+                    import ctypes
+                    from ctypes import wintypes
+                    
+                    # Convertir datetime en FILETIME Windows
+                    # FILETIME = nombre de 100-nanosecondes depuis 1er janvier 1601
+                    epoch_as_filetime = 116444736000000000  # January 1, 1970 as FILETIME
+                    timestamp_100ns = int(timestamp * 10000000) + epoch_as_filetime
+                    
+                    # Structures Windows
+                    class FILETIME(ctypes.Structure):
+                        _fields_ = [("dwLowDateTime", wintypes.DWORD),
+                                  ("dwHighDateTime", wintypes.DWORD)]
+                    
+                    # Convertir timestamp en FILETIME
+                    ft = FILETIME()
+                    ft.dwLowDateTime = timestamp_100ns & 0xFFFFFFFF
+                    ft.dwHighDateTime = timestamp_100ns >> 32
+                    
+                    # Ouvrir le fichier avec les bonnes permissions
+                    kernel32 = ctypes.windll.kernel32
+                    handle = kernel32.CreateFileW(
+                        str(target_file),
+                        0x40000000,  # GENERIC_WRITE
+                        0,           # No sharing
+                        None,        # Default security
+                        3,           # OPEN_EXISTING
+                        0,           # Normal attributes
+                        None         # No template
+                    )
+                    
+                    if handle != -1:  # INVALID_HANDLE_VALUE
+                        # Modifier SEULEMENT la date de création (1er paramètre)
+                        # None, None = ne pas changer accès et modification
+                        success = kernel32.SetFileTime(handle, ctypes.byref(ft), None, None)
+                        kernel32.CloseHandle(handle)
+                        
+                        if success:
+                            logger.debug("Date creation Windows mise a jour: %s pour %s "
+                                         "(date de modification preservee)",
+                                         new_datetime.strftime('%d/%m/%Y %H:%M:%S'), target_file.name)
+                        else:
+                            logger.warning("Echec modification date creation Windows pour %s",
+                                           target_file.name)
+                    else:
+                        logger.warning("Impossible d'ouvrir le fichier pour modification date creation: %s",
+                                       target_file.name)
+                else:
+                    # Sur autres systèmes, on ne peut modifier que l'accès/modification
+                    logger.debug("Modification date creation non supportee sur %s "
+                                 "(seules les dates d'acces/modification peuvent etre modifiees)",
+                                 platform.system())
                     
             except Exception as e:
-                print(f"Erreur restauration {target_file.name}: {e}")
+                logger.warning("Erreur modification date creation pour %s: %s", target_file.name, e)
+            
+        except Exception as e:
+            logger.warning("Erreur modification date fichier pour %s: %s", target_file.name, e)
+
+
+# Chronomètre sans effet quand les mesures ne sont pas activées
+_NO_TIMER = nullcontext()
+
+# Gestionnaire d'un processus d'extraction (voir _init_extract_process)
+_process_manager = None
+
+
+def _decimal_to_dms(decimal):
+    """
+    Convertit une coordonnée décimale au format DMS des EXIF.
+    
+    Args:
+        decimal (float): Coordonnée en décimal
+        
+    Returns:
+        tuple: ((degrés, 1), (minutes, 1), (secondes * 1000, 1000))
+    """
+    abs_decimal = abs(decimal)
+    degrees = int(abs_decimal)
+    minutes_float = (abs_decimal - degrees) * 60
+    minutes = int(minutes_float)
+    seconds = (minutes_float - minutes) * 60
+    return ((degrees, 1), (minutes, 1), (int(seconds * 1000), 1000))
+
+
+def _replace_file_atomically(target_file, data):
+    """
+    Remplace le contenu d'un fichier via un fichier temporaire renommé.
+    
+    Le fichier temporaire est créé dans le même dossier pour que le
+    renommage soit atomique ; les permissions de l'original sont conservées.
+    
+    Args:
+        target_file (Path): Fichier à remplacer
+        data (bytes): Nouveau contenu
+    """
+    fd, temp_path = tempfile.mkstemp(
+        prefix=f".{target_file.name}.", suffix=".tmp", dir=target_file.parent
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            _sync_file(f)
+        shutil.copymode(target_file, temp_path)
+        os.replace(temp_path, target_file)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _ordered_map(executor, function, iterable, window):
+    """
+    Équivalent de executor.map qui ne lit l'itérable qu'au fur et à mesure.
+    
+    Au plus `window` tâches sont en attente à la fois, et les résultats sont
+    rendus dans l'ordre de l'itérable.
+    
+    Args:
+        executor (Executor): Pool de threads ou de processus
+        function (callable): Fonction à appliquer
+        iterable: Arguments, un par tâche
+        window (int): Nombre maximal de tâches en attente
+        
+    Yields:
+        Résultat de chaque tâche, dans l'ordre
+    """
+    pending = deque()
+    for item in iterable:
+        pending.append(executor.submit(function, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _jsonl_line(record):
+    """Sérialise un enregistrement sur une ligne JSONL."""
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _write_json_document(file_obj, extraction_date, total_photos, photos):
+    """
+    Écrit le document JSON des métadonnées photo par photo.
+    
+    Le résultat est identique à json.dump(..., indent=2) du document
+    complet, sans que celui-ci soit construit en mémoire.
+    
+    Args:
+        file_obj (file): Fichier ouvert en écriture
+        extraction_date (str): Date de l'extraction
+        total_photos (int): Nombre de photos
+        photos: Itérable de couples (chemin, métadonnées sérialisables)
+    """
+    encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    
+    def encode(value, indent):
+        return encoder.encode(value).replace('\n', '\n' + ' ' * indent)
+    
+    file_obj.write('{\n')
+    file_obj.write(f'  "extraction_date": {encode(extraction_date, 2)},\n')
+    file_obj.write(f'  "total_photos": {encode(total_photos, 2)},\n')
+    file_obj.write('  "photos": {')
+    
+    # Les photos sont écrites par paquets pour limiter les appels à write
+    chunk = []
+    separator = '\n'
+    for filepath, metadata in photos:
+        chunk.append(f'{separator}    {encode(filepath, 4)}: {encode(metadata, 4)}')
+        separator = ',\n'
+        if len(chunk) >= 256:
+            file_obj.write(''.join(chunk))
+            chunk = []
+    file_obj.write(''.join(chunk))
+    file_obj.write('\n  }\n}' if separator != '\n' else '}\n}')
+
+
+class _JsonReader:
+    """Lecture d'un document JSON valeur par valeur, par blocs de texte."""
+    
+    def __init__(self, file_obj, chunk_size):
+        self.file_obj = file_obj
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.position = 0
+        self.decoder = json.JSONDecoder()
+    
+    def _fill(self):
+        """Ajoute un bloc au texte en cours, sans garder ce qui est déjà lu."""
+        data = self.file_obj.read(self.chunk_size)
+        if not data:
+            return False
+        self.buffer = self.buffer[self.position:] + data
+        self.position = 0
+        return True
+    
+    def peek(self):
+        """Premier caractère après les blancs ('' en fin de fichier)."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\r\n':
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self._fill():
+                return ''
+    
+    def expect(self, char):
+        """Passe le caractère attendu."""
+        if self.peek() != char:
+            raise ValueError(f"JSON invalide: '{char}' attendu a la position {self.position}")
+        self.position += 1
+    
+    def value(self):
+        """Lit la valeur suivante (chaîne, nombre, objet...)."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except ValueError:
+                # Valeur coupée par la fin du bloc
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buffer) and self._fill():
+                # Nombre peut-être coupé par la fin du bloc
+                continue
+            self.position = end
+            return value
+    
+    def more(self, closing):
+        """Passe la virgule avant l'élément suivant ; False à la fin de l'objet."""
+        if self.peek() == closing:
+            self.position += 1
+            return False
+        self.expect(',')
+        return True
+
+
+def _iter_json_photos(file_obj, chunk_size=1 << 16):
+    """
+    Lit les photos d'un document JSON de métadonnées au fil du fichier.
+    
+    Seule la photo en cours de lecture est en mémoire ; les autres clés du
+    document (date d'extraction, total) sont ignorées.
+    
+    Args:
+        file_obj (file): Fichier ouvert en lecture (texte)
+        chunk_size (int): Taille des blocs lus
+        
+    Yields:
+        tuple: (chemin, métadonnées)
+        
+    Raises:
+        ValueError: Si le document est invalide
+    """
+    reader = _JsonReader(file_obj, chunk_size)
+    reader.expect('{')
+    if reader.peek() == '}':
+        return
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'photos':
+            reader.expect('{')
+            if reader.peek() == '}':
+                reader.position += 1
+            else:
+                while True:
+                    filepath = reader.value()
+                    reader.expect(':')
+                    yield filepath, reader.value()
+                    if not reader.more('}'):
+                        break
+        else:
+            reader.value()
+        if not reader.more('}'):
+            return
+
+
+def _sync_file(file_obj):
+    """Force l'écriture d'un fichier sur le disque."""
+    file_obj.flush()
+    os.fsync(file_obj.fileno())
+
+
+def _read_last_jsonl_record(file_path, chunk_size=4096):
+    """
+    Lit le dernier enregistrement d'un fichier JSONL sans parcourir tout le fichier.
+    
+    Args:
+        file_path (Path): Fichier JSONL
+        chunk_size (int): Taille des blocs lus depuis la fin du fichier
+        
+    Returns:
+        dict: Dernier enregistrement, ou None s'il est illisible
+    """
+    with open(file_path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        tail = b''
+        while position > 0 and tail.count(b'\n') < 2:
+            read_size = min(chunk_size, position)
+            position -= read_size
+            f.seek(position)
+            tail = f.read(read_size) + tail
+    
+    lines = tail.strip().splitlines()
+    if not lines:
+        return None
+    try:
+        return json.loads(lines[-1].decode('utf-8'))
+    except ValueError:
+        return None
+
+
+def _extract_worker(manager, file_path, exif_dict=None):
+    """
+    Extrait les métadonnées d'une photo dans un thread ou un processus.
+    
+    Une erreur inattendue est enregistrée dans le champ 'erreur' de la photo
+    au lieu d'interrompre tout le scan.
+    
+    Args:
+        manager (SimplePhotoMetadata): Gestionnaire utilisé pour l'extraction
+        file_path (Path): Chemin vers l'image
+        exif_dict (dict): EXIF déjà lus, ou None
+        
+    Returns:
+        tuple: (métadonnées de la photo, structure EXIF lue ou None)
+    """
+    stats = manager.stats
+    start = time.perf_counter()
+    try:
+        return manager._extract_with_block(file_path, exif_dict)
+    except Exception as e:
+        logger.warning("Erreur pour %s: %s", file_path.name, e)
+        manager._count_error(e)
+        return {
+            'nom': file_path.name,
+            'date_creation': None,
+            'heure_creation': None,
+            'source_date': None,
+            'gps_latitude': None,
+            'gps_longitude': None,
+            'localisation': None,
+            'erreur': str(e)
+        }, None
+    finally:
+        if stats is not None:
+            stats.file_done(file_path, time.perf_counter() - start)
+
+
+def _init_extract_process(manager):
+    """
+    Initialise un processus d'extraction avec le gestionnaire à utiliser.
+    
+    Args:
+        manager (SimplePhotoMetadata): Gestionnaire utilisé pour l'extraction
+    """
+    global _process_manager
+    # Verrou recréé : il peut être copié du processus principal (fork)
+    manager._counters_lock = threading.Lock()
+    _process_manager = manager
+
+
+def _extract_process_worker(file_path):
+    """
+    Variante de _extract_worker pour un pool de processus (voir
+    _init_extract_process).
+    
+    Returns:
+        tuple: ((métadonnées, structure EXIF lue ou None), octets lus,
+            fichiers lus, mesures ou None) pour cette photo
+    """
+    manager = _process_manager
+    bytes_before, files_before = manager.bytes_read, manager.files_read
+    if manager.stats is not None:
+        # Mesures propres à cette photo, additionnées par le processus principal
+        manager.stats = ProcessingStats(manager.stats.operation, manager.stats.slowest_count)
+    extracted = _extract_worker(manager, file_path)
+    return (
+        extracted,
+        manager.bytes_read - bytes_before,
+        manager.files_read - files_before,
+        manager.stats
+    )
+
+
+def _log_extracted(file_path, metadata):
+    """Journalise l'extraction d'une photo (événement 'photo_extraite')."""
+    log_event(logger, logging.INFO, 'photo_extraite', "Traitement de: %s", file_path.name,
+              fichier=str(file_path), source_date=metadata.get('source_date'),
+              gps=metadata.get('gps_latitude') is not None, erreur=metadata.get('erreur'))
+
+
+def _log_saved(metadata_file, total_photos):
+    """Journalise l'écriture du fichier de métadonnées."""
+    log_event(logger, SUMMARY, 'sauvegarde', "Metadonnees sauvegardees: %s", metadata_file,
+              fichier=str(metadata_file), photos=total_photos)
 
 
 def main():
     """Fonction principale."""
+    configure_logging()
+    
     print("Extracteur Simple de Metadonnees de Photos")
     print("=" * 45)
     print("Extrait : Nom, Date/Heure, GPS")
@@ -7,20 +7,15 @@ import os
 import sys
 from pathlib import Path
 from simple_metadata import SimplePhotoMetadata
+from photo_log import configure_logging
+from photo_walker import iter_photo_files
 import json
 
 
 def find_photos_in_directory(directory):
     """Trouve toutes les photos dans un dossier."""
-    photo_dir = Path(directory)
     supported_formats = {'.jpg', '.jpeg', '.tiff', '.tif'}
-    photos = []
-    
-    for file_path in photo_dir.rglob('*'):
-        if file_path.is_file() and file_path.suffix.lower() in supported_formats:
-            photos.append(file_path)
-    
-    return photos
+    return [Path(file_path) for file_path, _ in iter_photo_files(directory, supported_formats)]
 
 
 def test_extraction_restoration():
@@ -120,4 +115,5 @@ def test_extraction_restoration():
 
 
 if __name__ == "__main__":
+    configure_logging()
     test_extraction_restoration()
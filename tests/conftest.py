@@ -0,0 +1,54 @@
+"""
+Outils communs des tests : accès aux scripts du dépôt et création de
+photos de test.
+"""
+
+import sys
+from pathlib import Path
+
+import piexif
+import pytest
+from PIL import Image
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def exif_bytes(date_original=None, gps=None):
+    """
+    Construit un bloc EXIF minimal.
+
+    Args:
+        date_original (str): Date au format EXIF "AAAA:MM:JJ HH:MM:SS"
+        gps (tuple): (latitude, longitude) positives (nord, est)
+
+    Returns:
+        bytes: Bloc EXIF pour PIL ou piexif
+    """
+    exif = {"0th": {piexif.ImageIFD.Make: b"Test"}, "Exif": {}, "GPS": {}, "1st": {},
+            "thumbnail": None}
+    if date_original:
+        exif["Exif"][piexif.ExifIFD.DateTimeOriginal] = date_original.encode()
+    if gps:
+        def dms(value):
+            degrees = int(value)
+            minutes = int((value - degrees) * 60)
+            seconds = round(((value - degrees) * 60 - minutes) * 60 * 100)
+            return ((degrees, 1), (minutes, 1), (seconds, 100))
+        exif["GPS"] = {piexif.GPSIFD.GPSLatitudeRef: b"N", piexif.GPSIFD.GPSLatitude: dms(gps[0]),
+                       piexif.GPSIFD.GPSLongitudeRef: b"E", piexif.GPSIFD.GPSLongitude: dms(gps[1])}
+    return piexif.dump(exif)
+
+
+@pytest.fixture
+def make_jpeg():
+    """Crée une photo JPEG, avec ou sans EXIF."""
+    def make(path, date_original=None, gps=None):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image = Image.new('RGB', (64, 48), (120, 80, 40))
+        if date_original or gps:
+            image.save(path, exif=exif_bytes(date_original, gps))
+        else:
+            image.save(path)
+        return path
+    return make
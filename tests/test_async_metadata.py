@@ -0,0 +1,100 @@
+"""Tests de l'interface asyncio."""
+
+import asyncio
+import json
+import shutil
+import threading
+from contextlib import aclosing
+
+import piexif
+
+from async_metadata import BATCH_SIZE, AsyncPhotoMetadata, _iter_in_thread
+from exif_archive import ExifArchive
+from simple_metadata import SimplePhotoMetadata
+
+
+def test_restore_from_sqlite_store(tmp_path, make_jpeg):
+    source = tmp_path / "source"
+    make_jpeg(source / "IMG_0001.jpg", "2021:07:02 10:11:12", gps=(48.85, 2.35))
+    # Plusieurs paquets de lecture, avec des restaurations entre eux
+    for number in range(2, BATCH_SIZE * 2 + 2):
+        make_jpeg(source / "sub" / f"IMG_{number:04d}.jpg", "2021:07:03 08:00:00")
+    manager = SimplePhotoMetadata(source, output_format='sqlite')
+    manager.save_metadata(manager.scan_directory())
+    assert manager.detect_file_format() == 'sqlite'
+
+    target = tmp_path / "cible"
+    shutil.copytree(source, target)
+    for photo in target.rglob("*.jpg"):
+        piexif.remove(str(photo))
+
+    photos = AsyncPhotoMetadata(source, output_format='sqlite', concurrency=2)
+    report = asyncio.run(photos.restore(target, full_exif=False))
+
+    assert report['restaures'] == BATCH_SIZE * 2 + 1
+    assert report['erreurs'] == 0
+    exif = piexif.load(str(target / "IMG_0001.jpg"))
+    assert exif["Exif"][piexif.ExifIFD.DateTimeOriginal] == b"2021:07:02 10:11:12"
+
+
+def test_iter_in_thread_uses_one_thread_and_closes_early():
+    threads = set()
+    closed = []
+
+    def numbers():
+        try:
+            for number in range(1000):
+                threads.add(threading.get_ident())
+                yield number
+        finally:
+            closed.append(threading.get_ident())
+
+    async def first_items():
+        items = []
+        entries = _iter_in_thread(numbers(), size=4)
+        try:
+            async for item in entries:
+                items.append(item)
+                if len(items) == 10:
+                    break
+        finally:
+            await entries.aclose()
+        return items
+
+    assert asyncio.run(first_items()) == list(range(10))
+    assert len(threads) == 1
+    assert closed == list(threads)
+
+
+def test_scan_directory_saves_full_exif(tmp_path, make_jpeg):
+    for number in range(3):
+        make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", "2021:07:02 10:11:12")
+    photos = AsyncPhotoMetadata(tmp_path, concurrency=2, exif_backup=True)
+
+    async def scan():
+        async with aclosing(photos.scan_directory()) as entries:
+            return [entry async for entry in entries]
+
+    entries = asyncio.run(scan())
+
+    assert [metadata['date_creation'] for _, metadata in entries] == ['02/07/2021'] * 3
+    json.dumps(dict(entries))
+    archive = ExifArchive(photos.manager.exif_archive_file)
+    assert all(path in archive for path, _ in entries)
+    archive.close()
+
+
+def test_instance_reused_across_event_loops(tmp_path, make_jpeg):
+    paths = [make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", "2021:07:02 10:11:12")
+                    for number in range(4)]
+    photos = AsyncPhotoMetadata(tmp_path, concurrency=1)
+
+    async def extract_all():
+        # Plus de photos que de places : le sémaphore est réellement attendu
+        return await asyncio.gather(*(photos.extract(path) for path in paths))
+
+    first = asyncio.run(extract_all())
+    second = asyncio.run(extract_all())
+
+    assert first == second
+    assert [metadata['date_creation'] for metadata in second] == ['02/07/2021'] * 4
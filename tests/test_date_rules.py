@@ -0,0 +1,71 @@
+"""Tests des règles de correction des dates."""
+
+import pytest
+
+from date_rules import DateCorrector, DateRule
+from photo_dates import FILENAME_STYLES, filename_pattern, match_filename_date, parse_filename_datetime
+
+
+def photo(name, date_creation=None, heure_creation=None, **fields):
+    return {'nom': name, 'date_creation': date_creation, 'heure_creation': heure_creation, **fields}
+
+
+def correct(rule, metadata):
+    DateCorrector([rule]).correct(f"/photos/{metadata['nom']}", metadata)
+    return metadata
+
+
+def test_filename_rule_replaces_file_date():
+    metadata = photo("IMG_20210711_065821.jpg", "01/01/2024", "12:00:00", source_date='fichier')
+
+    correct(DateRule('nom', 'nom_fichier'), metadata)
+
+    assert (metadata['date_creation'], metadata['heure_creation']) == ('11/07/2021', '06:58:21')
+    assert metadata['source_date'] == 'nom_fichier'
+
+
+def test_filename_rule_keeps_exif_date():
+    metadata = photo("IMG_20210711_065821.jpg", "12/07/2021", "08:00:00", source_date='exif_original')
+
+    correct(DateRule('nom', 'nom_fichier'), metadata)
+
+    assert metadata['date_creation'] == '12/07/2021'
+
+
+def test_filename_rule_skips_dated_legacy_record():
+    # Photo extraite avant l'enregistrement de source_date
+    metadata = photo("IMG_20210711_065821.jpg", "12/07/2021", "08:00:00")
+
+    correct(DateRule('nom', 'nom_fichier'), metadata)
+
+    assert (metadata['date_creation'], metadata['heure_creation']) == ('12/07/2021', '08:00:00')
+    assert 'source_date' not in metadata
+
+
+def test_filename_rule_dates_undated_legacy_record():
+    metadata = photo("IMG-20210711-WA0001.jpg")
+
+    correct(DateRule('nom', 'nom_fichier'), metadata)
+
+    assert metadata['date_creation'] == '11/07/2021'
+
+
+def test_shift_rule():
+    metadata = photo("DSC_0001.jpg", "11/07/2021", "00:30:00", source_date='exif_original')
+
+    correct(DateRule('horloge', 'decalage', filename='DSC_*', seconds=-3600), metadata)
+
+    assert (metadata['date_creation'], metadata['heure_creation']) == ('10/07/2021', '23:30:00')
+
+
+@pytest.mark.parametrize('name, expected', [
+    ("IMG_20210711_065821.jpg", ('11/07/2021', '06:58:21')),
+    ("PXL_20210711_065821123.jpg", ('11/07/2021', '06:58:21')),
+    ("IMG-20210711-WA0000.jpg", ('11/07/2021', None)),
+    ("2021-07-11 06.58.21.jpg", ('11/07/2021', '06:58:21')),
+    ("Screenshot_20210711-065821.png", ('11/07/2021', '06:58:21')),
+    ("IMG_20211399_000000.jpg", None),
+])
+def test_scan_and_rules_read_the_same_filename_dates(name, expected):
+    assert parse_filename_datetime(name) == expected
+    assert match_filename_date(filename_pattern(tuple(FILENAME_STYLES)), name) == expected
@@ -0,0 +1,134 @@
+"""Tests de la lecture rapide des EXIF des fichiers HEIF."""
+
+import struct
+
+import pytest
+
+from conftest import exif_bytes
+from exif_header import (
+    EXIF_HEADER,
+    ExifHeaderError,
+    parse_exif_block,
+    read_exif_block,
+    read_exif_header,
+    strip_heif_exif_prefix,
+)
+
+
+EXIF_ITEM_ID = 2
+
+
+def box(box_type, content):
+    return struct.pack(">L4s", 8 + len(content), box_type) + content
+
+
+def full_box(box_type, version, content):
+    return box(box_type, bytes([version, 0, 0, 0]) + content)
+
+
+def exif_item(tiff):
+    """Contenu d'un élément Exif : position de l'en-tête TIFF, marque Exif, TIFF."""
+    return struct.pack(">L", len(EXIF_HEADER)) + EXIF_HEADER + tiff
+
+
+def cut(data, size):
+    """Boîte coupée à `size` octets, avec une taille cohérente."""
+    return struct.pack(">L", size) + data[4:size]
+
+
+def meta_box(item_offset, item_length, construction_method, idat=None, cuts=None):
+    """Boîte 'meta' déclarant une image et un élément Exif, coupée selon `cuts`."""
+    cuts = cuts or {}
+    infe = (full_box(b"infe", 2, struct.pack(">HH4s", 1, 0, b"hvc1") + b"\x00")
+            + full_box(b"infe", 2, struct.pack(">HH4s", EXIF_ITEM_ID, 0, b"Exif") + b"\x00"))
+    iinf = full_box(b"iinf", 0, struct.pack(">H", 2) + infe)
+    if b"iinf" in cuts:
+        iinf = cut(iinf, cuts[b"iinf"])
+    # Version 1 : méthode de construction ; offsets et longueurs sur 4 octets
+    iloc = full_box(b"iloc", 1, bytes([0x44, 0x00]) + struct.pack(">H", 2)
+                    + struct.pack(">HHHH", 1, 0, 0, 1) + struct.pack(">LL", 0, 0)
+                    + struct.pack(">HHHH", EXIF_ITEM_ID, construction_method, 0, 1)
+                    + struct.pack(">LL", item_offset, item_length))
+    if b"iloc" in cuts:
+        iloc = cut(iloc, cuts[b"iloc"])
+    children = iinf + iloc
+    if idat is not None:
+        children += box(b"idat", idat)
+    return full_box(b"meta", 0, children)
+
+
+def heif_file(tiff, in_idat=False, cuts=None):
+    """Fichier HEIF minimal : ftyp, meta puis mdat (élément Exif et image)."""
+    ftyp = box(b"ftyp", b"heic" + struct.pack(">L", 0) + b"mif1heic")
+    item = exif_item(tiff)
+    if in_idat:
+        meta = meta_box(0, len(item), 1, idat=item, cuts=cuts)
+        return ftyp + meta + box(b"mdat", b"\x00" * 64)
+    # La position de l'élément ne change pas la taille de 'meta'
+    meta_size = len(meta_box(0, len(item), 0, cuts=cuts))
+    item_offset = len(ftyp) + meta_size + 8
+    meta = meta_box(item_offset, len(item), 0, cuts=cuts)
+    return ftyp + meta + box(b"mdat", item + b"\x00" * 64)
+
+
+def tiff_of(date, gps=None):
+    return exif_bytes(date, gps)[len(EXIF_HEADER):]
+
+
+def assert_date_and_gps(exif_dict):
+    assert exif_dict["Exif"][36867] == b"2021:07:02 10:11:12"
+    assert exif_dict["GPS"][2][0] == (48, 1)
+    assert exif_dict["GPS"][4][0] == (2, 1)
+
+
+@pytest.mark.parametrize("in_idat", [False, True])
+def test_heif_exif_item(tmp_path, in_idat):
+    tiff = tiff_of("2021:07:02 10:11:12", gps=(48.85, 2.35))
+    photo = tmp_path / "IMG_0001.heic"
+    photo.write_bytes(heif_file(tiff, in_idat=in_idat))
+
+    exif_dict, bytes_read = read_exif_header(photo)
+    block, _ = read_exif_block(photo)
+
+    assert_date_and_gps(exif_dict)
+    assert block == tiff
+    assert_date_and_gps(parse_exif_block(block))
+    # Les données d'image ne sont jamais lues
+    assert bytes_read < photo.stat().st_size - 32
+
+
+@pytest.mark.parametrize("in_idat", [False, True])
+def test_truncated_heif_raises_header_error(tmp_path, in_idat):
+    tiff = tiff_of("2021:07:02 10:11:12", gps=(48.85, 2.35))
+    data = heif_file(tiff, in_idat=in_idat)
+    photo = tmp_path / "IMG_0001.heic"
+
+    # Fichier coupé n'importe où après l'en-tête 'ftyp'
+    for size in range(32, len(data) - 72):
+        photo.write_bytes(data[:size])
+        for read in (read_exif_header, read_exif_block):
+            with pytest.raises(ExifHeaderError):
+                read(photo)
+
+    # Boîte 'iinf' (56 octets : en-tête de 14, puis deux 'infe' de 21) ou
+    # 'iloc' (48 octets) coupée à l'intérieur d'une boîte 'meta' complète ;
+    # 'iinf' coupée entre deux 'infe' reste valide, sans élément Exif
+    cut_sizes = {b"iinf": [*range(8, 14), *range(36, 56)], b"iloc": range(8, 48)}
+    for box_type, sizes in cut_sizes.items():
+        for size in sizes:
+            photo.write_bytes(heif_file(tiff, in_idat=in_idat, cuts={box_type: size}))
+            for read in (read_exif_header, read_exif_block):
+                with pytest.raises(ExifHeaderError):
+                    read(photo)
+
+
+def test_strip_heif_exif_prefix():
+    tiff = tiff_of("2021:07:02 10:11:12")
+
+    assert strip_heif_exif_prefix(exif_item(tiff)) == tiff
+    # Position erronée : la marque Exif est cherchée
+    assert strip_heif_exif_prefix(struct.pack(">L", 99) + EXIF_HEADER + tiff) == tiff
+    with pytest.raises(ExifHeaderError):
+        strip_heif_exif_prefix(b"\x00\x00")
+    with pytest.raises(ExifHeaderError):
+        strip_heif_exif_prefix(struct.pack(">L", 0) + b"pas de TIFF")
@@ -0,0 +1,104 @@
+"""Tests de la modification sur place des EXIF."""
+
+import piexif
+import pytest
+from PIL import Image
+
+from exif_header import EXIF_HEADER, locate_jpeg_exif
+from exif_patch import apply_patches, diff_patches, plan_tag_patches
+from simple_metadata import SimplePhotoMetadata
+
+
+def dated_exif(date, gps=None):
+    """EXIF portant les trois dates restaurées et, éventuellement, un GPS."""
+    exif = {"0th": {piexif.ImageIFD.Make: b"Test", piexif.ImageIFD.DateTime: date.encode()},
+            "Exif": {piexif.ExifIFD.DateTimeOriginal: date.encode(),
+                     piexif.ExifIFD.DateTimeDigitized: date.encode()},
+            "GPS": {}, "1st": {}, "thumbnail": None}
+    if gps:
+        exif["GPS"] = {
+            piexif.GPSIFD.GPSLatitudeRef: b"N",
+            piexif.GPSIFD.GPSLatitude: ((gps[0], 1), (0, 1), (0, 100)),
+            piexif.GPSIFD.GPSLongitudeRef: b"E",
+            piexif.GPSIFD.GPSLongitude: ((gps[1], 1), (0, 1), (0, 100)),
+        }
+    return piexif.dump(exif)
+
+
+def make_photo(path, exif):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new('RGB', (16, 16), 'blue').save(path, 'JPEG', exif=exif)
+    return path
+
+
+def metadata_for(date, time, gps=None):
+    metadata = {'date_creation': date, 'heure_creation': time}
+    if gps:
+        metadata.update(gps_latitude=gps[0], gps_longitude=gps[1])
+    return metadata
+
+
+def test_plan_tag_patches_keeps_structure():
+    tiff = dated_exif("2020:01:01 00:00:00")[len(EXIF_HEADER):]
+    values = {"Exif": {piexif.ExifIFD.DateTimeOriginal: b"2021:07:02 10:11:12"}}
+
+    patches = plan_tag_patches(tiff, values)
+    patched = apply_patches(tiff, patches)
+
+    assert len(patched) == len(tiff)
+    exif = piexif.load(EXIF_HEADER + patched)
+    assert exif["Exif"][piexif.ExifIFD.DateTimeOriginal] == b"2021:07:02 10:11:12"
+    assert exif["Exif"][piexif.ExifIFD.DateTimeDigitized] == b"2020:01:01 00:00:00"
+
+
+def test_plan_tag_patches_refuses_missing_or_longer_values():
+    tiff = dated_exif("2020:01:01 00:00:00")[len(EXIF_HEADER):]
+
+    assert plan_tag_patches(tiff, {"GPS": {piexif.GPSIFD.GPSLatitudeRef: b"N"}}) is None
+    assert plan_tag_patches(tiff, {"0th": {piexif.ImageIFD.Make: b"Plus long"}}) is None
+
+
+def test_diff_patches():
+    assert diff_patches(b"abcdef", b"abcdef") == []
+    assert diff_patches(b"abcdef", b"aXcdYf") == [(1, b"XcdY")]
+    with pytest.raises(ValueError):
+        diff_patches(b"abc", b"abcd")
+
+
+def test_restore_in_place_keeps_size(tmp_path):
+    photo = make_photo(tmp_path / "IMG_0001.jpg", dated_exif("2020:01:01 00:00:00", gps=(10, 20)))
+    size = photo.stat().st_size
+    manager = SimplePhotoMetadata(tmp_path)
+    metadata = metadata_for('02/07/2021', '10:11:12', gps=(48.85, 2.35))
+
+    status, written = manager.restore_file(photo, metadata, in_place=True)
+
+    assert status == 'restaure'
+    assert 0 < written < 200
+    assert photo.stat().st_size == size
+    exif = piexif.load(str(photo))
+    assert exif["Exif"][piexif.ExifIFD.DateTimeOriginal] == b"2021:07:02 10:11:12"
+    assert exif["0th"][piexif.ImageIFD.DateTime] == b"2021:07:02 10:11:12"
+    assert exif["GPS"][piexif.GPSIFD.GPSLatitude][0] == (48, 1)
+    assert exif["GPS"][piexif.GPSIFD.GPSLongitude][0] == (2, 1)
+
+    assert manager.restore_file(photo, metadata, in_place=True) == ('inchange', 0)
+
+
+def test_restore_in_place_falls_back_to_rewrite(tmp_path):
+    # Pas de GPS dans le fichier : le segment EXIF doit grandir
+    photo = make_photo(tmp_path / "IMG_0001.jpg", dated_exif("2020:01:01 00:00:00"))
+    block_size = len(locate_jpeg_exif(photo)[0])
+    manager = SimplePhotoMetadata(tmp_path)
+    metadata = metadata_for('02/07/2021', '10:11:12', gps=(48.85, 2.35))
+
+    status, written = manager.restore_file(photo, metadata, in_place=True)
+
+    assert status == 'restaure'
+    assert written == photo.stat().st_size
+    assert len(locate_jpeg_exif(photo)[0]) > block_size
+    exif = piexif.load(str(photo))
+    assert exif["Exif"][piexif.ExifIFD.DateTimeOriginal] == b"2021:07:02 10:11:12"
+    assert exif["GPS"][piexif.GPSIFD.GPSLatitude][0] == (48, 1)
+
+    assert manager.restore_file(photo, metadata, in_place=True) == ('inchange', 0)
@@ -0,0 +1,36 @@
+"""Tests de la base SQLite des métadonnées."""
+
+from metadata_store import SQLiteMetadataStore, distance_km
+from photo_dates import parse_date_argument
+
+
+def add_photos(store):
+    store.save([
+        ('/photos/paris.jpg', {'nom': 'paris.jpg', 'date_creation': '02/07/2021',
+                               'heure_creation': '10:11:12', 'gps_latitude': 48.8567,
+                               'gps_longitude': 2.3508}),
+        ('/photos/lyon.jpg', {'nom': 'lyon.jpg', 'date_creation': '15/08/2021',
+                              'heure_creation': '09:00:00', 'gps_latitude': 45.764,
+                              'gps_longitude': 4.8357}),
+        ('/photos/sans_date.jpg', {'nom': 'sans_date.jpg', 'date_creation': None,
+                                   'heure_creation': None, 'gps_latitude': None,
+                                   'gps_longitude': None}),
+    ], '2021-09-01T00:00:00')
+
+
+def test_query_by_period_radius_and_name(tmp_path):
+    with SQLiteMetadataStore(tmp_path / "metadata_simple.db") as store:
+        add_photos(store)
+
+        july = store.query(start=parse_date_argument('2021-07'),
+                           end=parse_date_argument('2021-07', end_of_day=True))
+        near_paris = store.query(latitude=48.85, longitude=2.35, radius_km=5)
+        by_name = store.query(name='l*.jpg')
+
+    assert [path for path, _ in july] == ['/photos/paris.jpg']
+    assert [path for path, _ in near_paris] == ['/photos/paris.jpg']
+    assert [path for path, _ in by_name] == ['/photos/lyon.jpg']
+
+
+def test_distance_km():
+    assert round(distance_km(48.8567, 2.3508, 45.764, 4.8357)) == 392
@@ -0,0 +1,74 @@
+"""Tests des empreintes de contenu et de la recherche des photos renommées."""
+
+import io
+import shutil
+
+import piexif
+from PIL import Image
+
+from conftest import exif_bytes
+from photo_fingerprint import FingerprintIndex, content_fingerprint
+from simple_metadata import SimplePhotoMetadata
+
+
+def make_photo(path, color, date_original=None):
+    """JPEG de contenu propre à `color`, avec ou sans date."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    image = Image.new('RGB', (64, 48), color)
+    if date_original:
+        image.save(path, exif=exif_bytes(date_original))
+    else:
+        image.save(path)
+    return path
+
+
+def test_fingerprint_ignores_exif_and_name(tmp_path):
+    photo = make_photo(tmp_path / "IMG_0001.jpg", (120, 80, 40), "2021:07:02 10:11:12")
+    other = make_photo(tmp_path / "IMG_0002.jpg", (40, 80, 120), "2021:07:02 10:11:12")
+    fingerprint, _ = content_fingerprint(photo)
+
+    output = io.BytesIO()
+    piexif.insert(exif_bytes("2022:01:01 00:00:00", gps=(48.85, 2.35)), photo.read_bytes(), output)
+    renamed = tmp_path / "copie.jpg"
+    renamed.write_bytes(output.getvalue())
+
+    assert renamed.stat().st_size != photo.stat().st_size
+    assert content_fingerprint(renamed)[0] == fingerprint
+    assert content_fingerprint(other)[0] != fingerprint
+
+
+def test_fingerprint_index_computes_lazily():
+    computed = []
+
+    def compute(path):
+        computed.append(path)
+        return path[0]
+
+    index = FingerprintIndex(['a1', 'a2', 'b1'], compute=compute)
+
+    assert index.fingerprint('b1') == 'b'
+    assert computed == ['b1']
+    assert index.find('a') == ['a1', 'a2']
+    assert index.find('c') == []
+    assert sorted(computed) == ['a1', 'a2', 'b1']
+
+
+def test_renamed_photo_found_by_fingerprint(tmp_path):
+    source = tmp_path / "source"
+    make_photo(source / "IMG_0001.jpg", (120, 80, 40), "2021:07:02 10:11:12")
+    make_photo(source / "IMG_0002.jpg", (40, 80, 120), "2021:07:03 08:00:00")
+    manager = SimplePhotoMetadata(source, fingerprint=True)
+    manager.save_metadata(manager.scan_directory())
+
+    target = tmp_path / "cible"
+    shutil.copytree(source, target)
+    (target / "IMG_0001.jpg").rename(target / "vacances.jpg")
+    for photo in target.glob("*.jpg"):
+        piexif.remove(str(photo))
+
+    report = manager.restore_metadata(target)
+
+    assert report['par_empreinte'] == 1
+    assert report['restaures'] == 2
+    exif = piexif.load(str(target / "vacances.jpg"))
+    assert exif["Exif"][piexif.ExifIFD.DateTimeOriginal] == b"2021:07:02 10:11:12"
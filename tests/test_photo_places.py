@@ -0,0 +1,73 @@
+"""Tests du géocodage inverse hors ligne."""
+
+from photo_places import PlaceIndex
+from simple_metadata import SimplePhotoMetadata
+
+
+def write_places(path, extra_rows=()):
+    """Écrit un petit fichier de lieux au format GeoNames."""
+    rows = [
+        ('Paris', 48.8566, 2.3522, 'FR', '11'),
+        ('Lyon', 45.7640, 4.8357, 'FR', '84'),
+        *extra_rows,
+    ]
+    lines = []
+    for number, (name, latitude, longitude, country, admin1) in enumerate(rows):
+        fields = [''] * 19
+        fields[0], fields[1], fields[2] = str(number), name, name
+        fields[4], fields[5] = str(latitude), str(longitude)
+        fields[8], fields[10] = country, admin1
+        lines.append('\t'.join(fields))
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    (path.parent / 'admin1CodesASCII.txt').write_text(
+        "FR.11\tIle-de-France\tIle-de-France\t3012874\n", encoding='utf-8')
+    return path
+
+
+def test_nearest_place(tmp_path):
+    index = PlaceIndex.open(write_places(tmp_path / 'lieux.txt'))
+
+    assert index.nearest(48.86, 2.34)[2] == 'Paris'
+    assert index.nearest(45.76, 4.84)[2] == 'Lyon'
+    assert index.nearest(0.0, 0.0) is None
+    index.close()
+
+
+def test_nearest_place_near_poles(tmp_path, monkeypatch):
+    rows = [('Station', 89.5, 30.0, 'AQ', ''), ('Base', -89.9, -150.0, 'AQ', '')]
+    index = PlaceIndex.open(write_places(tmp_path / 'lieux.txt', rows))
+    cells = []
+    nearest_in_cell = index._nearest_in_cell
+    monkeypatch.setattr(index, '_nearest_in_cell',
+                        lambda *args: cells.append(args[:2]) or nearest_in_cell(*args))
+
+    assert index.nearest(89.45, 35.0)[2] == 'Station'
+    assert index.nearest(-89.95, 10.0)[2] == 'Base'
+    # Loin en longitude, même près du pôle
+    assert index.nearest(89.0, -150.0) is None
+    assert index.nearest(85.0, 10.0) is None
+    # Pas de recherche anneau par anneau sur toute la circonférence
+    assert len(cells) < 1000
+    index.close()
+
+
+def test_process_scan_opens_index_once_per_worker(tmp_path, make_jpeg, monkeypatch):
+    places_file = write_places(tmp_path / 'lieux.txt')
+    photos = tmp_path / 'photos'
+    for number in range(8):
+        make_jpeg(photos / f"IMG_{number:04d}.jpg", "2021:07:02 10:11:12", gps=(48.85, 2.35))
+    manager = SimplePhotoMetadata(photos, places_file=places_file)
+    pickled = []
+    getstate = PlaceIndex.__getstate__
+
+    def counting_getstate(self):
+        pickled.append(self)
+        return getstate(self)
+
+    monkeypatch.setattr(PlaceIndex, '__getstate__', counting_getstate)
+
+    records = manager.scan_directory(workers=2, use_processes=True)
+
+    assert len(pickled) <= 2
+    assert {metadata['ville'] for metadata in records.values()} == {'Paris'}
+    assert {metadata['region'] for metadata in records.values()} == {'Ile-de-France'}
@@ -0,0 +1,137 @@
+"""Tests des recherches en mémoire par date et par lieu."""
+
+import random
+
+import pytest
+
+from metadata_store import bounding_box, distance_km
+from photo_dates import capture_timestamp
+from photo_query import PhotoQueryIndex, parse_rectangle
+
+
+def make_records(count=2000, seed=1):
+    """Photos aléatoires : dates sur deux ans, positions autour de Paris et partout."""
+    generator = random.Random(seed)
+    records = {}
+    for number in range(count):
+        metadata = {'nom': f"IMG_{number:05d}.jpg", 'date_creation': None, 'heure_creation': None,
+                    'source_date': None, 'gps_latitude': None, 'gps_longitude': None,
+                    'localisation': None}
+        if generator.random() < 0.9:
+            metadata['date_creation'] = (f"{generator.randint(1, 28):02d}/"
+                                         f"{generator.randint(1, 12):02d}/{generator.randint(2020, 2021)}")
+            metadata['heure_creation'] = f"{generator.randint(0, 23):02d}:00:00"
+            metadata['source_date'] = 'exif_original'
+        if generator.random() < 0.5:
+            metadata['gps_latitude'] = 48.85 + generator.gauss(0, 0.2)
+            metadata['gps_longitude'] = 2.35 + generator.gauss(0, 0.2)
+        elif generator.random() < 0.5:
+            metadata['gps_latitude'] = generator.uniform(-89, 89)
+            metadata['gps_longitude'] = generator.uniform(-180, 180)
+        records[f"/photos/{number % 7}/{metadata['nom']}"] = metadata
+    return records
+
+
+def timestamp(metadata):
+    return capture_timestamp(metadata['date_creation'], metadata['heure_creation'])
+
+
+def in_box(metadata, lat_min, lat_max, lon_min, lon_max):
+    latitude, longitude = metadata['gps_latitude'], metadata['gps_longitude']
+    if latitude is None or not lat_min <= latitude <= lat_max:
+        return False
+    if lon_min <= lon_max:
+        return lon_min <= longitude <= lon_max
+    return longitude >= lon_min or longitude <= lon_max
+
+
+@pytest.fixture(scope='module')
+def records():
+    return make_records()
+
+
+@pytest.fixture(scope='module')
+def index(records):
+    return PhotoQueryIndex(records)
+
+
+def test_period(records, index):
+    start, end = capture_timestamp('01/03/2021', None), capture_timestamp('31/03/2021', '23:59:59')
+
+    found = index.between(start, end)
+
+    expected = {path for path, metadata in records.items()
+                if timestamp(metadata) is not None and start <= timestamp(metadata) <= end}
+    assert {path for path, _ in found} == expected
+    times = [timestamp(metadata) for _, metadata in found]
+    assert times == sorted(times)
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (48.85, 2.35, 5), (0.0, 179.9, 800), (88.0, 0.0, 500),
+])
+def test_radius(records, index, latitude, longitude, radius_km):
+    found = index.within(latitude, longitude, radius_km)
+
+    box = bounding_box(latitude, longitude, radius_km)
+    expected = {path for path, metadata in records.items() if in_box(metadata, *box) and distance_km(
+        latitude, longitude, metadata['gps_latitude'], metadata['gps_longitude']) <= radius_km}
+    assert {path for path, _ in found} == expected
+
+
+@pytest.mark.parametrize('box', [(48.5, 49.0, 2.0, 2.5), (-30.0, 30.0, 170.0, -170.0)])
+def test_box_and_period(records, index, box):
+    start = capture_timestamp('01/01/2021', None)
+
+    found = index.query(start=start, box=box)
+
+    expected = {path for path, metadata in records.items() if in_box(metadata, *box)
+                and timestamp(metadata) is not None and timestamp(metadata) >= start}
+    assert {path for path, _ in found} == expected
+
+
+@pytest.mark.parametrize('latitude, longitude', [(48.85, 2.35), (-60.0, -179.5), (10.0, 100.0)])
+def test_nearest(records, index, latitude, longitude):
+    found = index.nearest(latitude, longitude, count=5)
+
+    distances = sorted(distance_km(latitude, longitude, metadata['gps_latitude'],
+                                   metadata['gps_longitude'])
+                       for metadata in records.values() if metadata['gps_latitude'] is not None)
+    assert [round(distance, 6) for distance, _, _ in found] == [
+        round(distance, 6) for distance in distances[:5]]
+
+
+def test_no_criteria_returns_undated_last(records, index):
+    found = index.query()
+
+    assert len(found) == len(records)
+    assert found[-1][1]['date_creation'] is None
+
+
+def test_name_and_limit(index):
+    found = index.query(name='IMG_0001?.jpg', limit=3)
+
+    assert len(found) == 3
+    assert all(metadata['nom'].startswith('IMG_0001') for _, metadata in found)
+
+
+@pytest.mark.parametrize('box', [(-10.0, 10.0, 179.0, 180.0), (-10.0, 10.0, 179.0, -179.0),
+                                 (-10.0, 10.0, -180.0, -179.0)])
+def test_box_on_antimeridian(box):
+    records = {}
+    for number, longitude in enumerate((180.0, -180.0, 179.95, -179.95)):
+        records[f"/photos/IMG_{number}.jpg"] = {
+            'nom': f"IMG_{number}.jpg", 'date_creation': None, 'heure_creation': None,
+            'source_date': None, 'gps_latitude': 0.0, 'gps_longitude': longitude,
+            'localisation': None}
+
+    found = PhotoQueryIndex(records).in_box(*box)
+
+    expected = {path for path, metadata in records.items() if in_box(metadata, *box)}
+    assert {path for path, _ in found} == expected
+
+
+def test_parse_rectangle():
+    assert parse_rectangle('48,49,2,3') == (48.0, 49.0, 2.0, 3.0)
+    with pytest.raises(ValueError):
+        parse_rectangle('49,48,2,3')
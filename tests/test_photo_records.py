@@ -0,0 +1,49 @@
+"""Tests du stockage compact des métadonnées."""
+
+import pytest
+
+from photo_records import PhotoRecords
+
+
+RECORDS = {
+    '/photos/a/IMG_0001.jpg': {
+        'nom': 'IMG_0001.jpg', 'date_creation': '02/07/2021', 'heure_creation': '10:11:12',
+        'source_date': 'exif_original', 'gps_latitude': 48.8567, 'gps_longitude': 2.3508,
+        'localisation': 'https://www.google.com/maps?q=48.8567,2.3508',
+        'decalage_utc': '+02:00', 'source_decalage': 'fuseau',
+        'pays': 'France', 'region': 'Ile-de-France', 'ville': 'Paris',
+        'taille': 1234, 'mtime_ns': 1625213472000000000,
+    },
+    '/photos/b/IMG_0002.jpg': {
+        'nom': 'IMG_0002.jpg', 'date_creation': None, 'heure_creation': None,
+        'source_date': None, 'gps_latitude': None, 'gps_longitude': None,
+        'localisation': None, 'erreur': 'EXIF illisibles',
+    },
+    '/photos/b/ancienne.jpg': {
+        # Photo extraite avant l'enregistrement de la source de la date
+        'nom': 'ancienne.jpg', 'date_creation': '01/01/2010', 'heure_creation': None,
+        'gps_latitude': None, 'gps_longitude': None, 'localisation': None,
+    },
+}
+
+
+@pytest.mark.parametrize('filepath', list(RECORDS))
+def test_round_trip_keeps_values_and_key_order(filepath):
+    records = PhotoRecords(RECORDS)
+
+    metadata = records[filepath]
+
+    assert metadata == RECORDS[filepath]
+    assert list(metadata) == list(RECORDS[filepath])
+
+
+def test_mapping_operations():
+    records = PhotoRecords(RECORDS)
+
+    del records['/photos/b/IMG_0002.jpg']
+    records['/photos/c/IMG_0003.jpg'] = dict(RECORDS['/photos/b/IMG_0002.jpg'], nom='IMG_0003.jpg')
+
+    assert len(records) == 3
+    assert '/photos/b/IMG_0002.jpg' not in records
+    assert records['/photos/c/IMG_0003.jpg']['nom'] == 'IMG_0003.jpg'
+    assert records.timestamp('/photos/a/IMG_0001.jpg') == 1625220672
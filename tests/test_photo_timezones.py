@@ -0,0 +1,31 @@
+"""Tests du décalage horaire des photos."""
+
+from photo_timezones import TimezoneResolver, parse_offset, system_offset
+
+
+def test_exif_offset_first():
+    metadata = {'date_creation': '02/07/2021', 'heure_creation': '10:11:12',
+                'source_date': 'exif_original', 'gps_latitude': 35.0, 'gps_longitude': 139.0}
+
+    assert TimezoneResolver().resolve(metadata, b'+02:00') == (120, 'exif')
+
+
+def test_longitude_without_polygons():
+    metadata = {'date_creation': '02/07/2021', 'heure_creation': '10:11:12',
+                'source_date': 'exif_original', 'gps_latitude': 35.0, 'gps_longitude': 139.0}
+
+    assert TimezoneResolver().resolve(metadata) == (540, 'longitude')
+
+
+def test_file_date_uses_system_offset_even_with_gps():
+    metadata = {'date_creation': '02/07/2021', 'heure_creation': '10:11:12',
+                'source_date': 'fichier', 'gps_latitude': 35.0, 'gps_longitude': 139.0}
+
+    assert TimezoneResolver().resolve(metadata) == (
+        system_offset('02/07/2021', '10:11:12'), 'systeme')
+
+
+def test_parse_offset():
+    assert parse_offset('-05:30') == -330
+    assert parse_offset(b'+01:00\x00') == 60
+    assert parse_offset('n/a') is None
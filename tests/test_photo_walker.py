@@ -0,0 +1,47 @@
+"""Tests du parcours des dossiers de photos."""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from photo_walker import iter_photo_files
+
+
+EXTENSIONS = {'.jpg'}
+
+
+def walk(root, **options):
+    """Chemins relatifs (avec '/') des photos trouvées, dans l'ordre du parcours."""
+    return [Path(path).relative_to(root).as_posix()
+            for path, _ in iter_photo_files(root, EXTENSIONS, **options)]
+
+
+def touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b'')
+    return path
+
+
+def test_hidden_files_scanned_by_default(tmp_path):
+    touch(tmp_path / 'a.jpg')
+    touch(tmp_path / '.cache.jpg')
+    touch(tmp_path / '.album' / 'b.jpg')
+    touch(tmp_path / '@eaDir' / 'vignette.jpg')
+
+    assert walk(tmp_path) == ['.cache.jpg', 'a.jpg', '.album/b.jpg']
+    assert walk(tmp_path, skip_hidden=True) == ['a.jpg']
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason="liens symboliques indisponibles")
+def test_symlinked_directories_followed_once(tmp_path):
+    touch(tmp_path / 'photos' / 'a.jpg')
+    try:
+        os.symlink(tmp_path / 'photos', tmp_path / 'lien')
+        # Boucle : un lien vers un dossier parent
+        os.symlink(tmp_path, tmp_path / 'photos' / 'boucle')
+    except OSError:
+        pytest.skip("liens symboliques non autorisés")
+
+    # 'lien' vient avant 'photos' : le dossier est parcouru par le lien
+    assert walk(tmp_path) == ['lien/a.jpg']
@@ -0,0 +1,60 @@
+"""Tests de l'extraction en pipeline."""
+
+import threading
+
+import pytest
+
+from scan_pipeline import ScanPipeline
+from simple_metadata import SimplePhotoMetadata
+
+
+def run_with_timeout(pipeline, photo_files, timeout=10):
+    """Exécute le pipeline dans un thread : un blocage fait échouer le test."""
+    outcome = {}
+
+    def consume():
+        try:
+            outcome['results'] = list(pipeline.run(photo_files))
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=consume, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), "le pipeline est bloque"
+    return outcome
+
+
+def test_results_in_walk_order(tmp_path, make_jpeg):
+    photos = [make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", f"2021:07:{number + 1:02d} 10:11:12")
+              for number in range(12)]
+    pipeline = ScanPipeline(SimplePhotoMetadata(tmp_path), readers=3, queue_size=2)
+
+    outcome = run_with_timeout(pipeline, photos)
+
+    assert [metadata['nom'] for metadata, _ in outcome['results']] == [p.name for p in photos]
+    assert pipeline.stats['etapes']['ecriture']['elements'] == 12
+
+
+@pytest.mark.parametrize('stage', ['read_exif_block', 'parse_exif_block'])
+def test_stage_error_stops_pipeline(tmp_path, make_jpeg, monkeypatch, stage):
+    photos = [make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", "2021:07:02 10:11:12")
+              for number in range(5)]
+    manager = SimplePhotoMetadata(tmp_path)
+
+    def fail(*args):
+        raise RuntimeError("panne")
+
+    monkeypatch.setattr(manager, stage, fail)
+
+    outcome = run_with_timeout(ScanPipeline(manager, readers=2), photos)
+
+    assert isinstance(outcome.get('error'), RuntimeError)
+
+
+def test_pipeline_rejects_processes(tmp_path, make_jpeg):
+    make_jpeg(tmp_path / "IMG_0001.jpg", "2021:07:02 10:11:12")
+    manager = SimplePhotoMetadata(tmp_path)
+
+    with pytest.raises(ValueError):
+        manager.scan_directory(workers=2, use_processes=True, pipeline=True)
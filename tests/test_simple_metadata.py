@@ -0,0 +1,109 @@
+"""Tests de l'extraction des métadonnées."""
+
+import io
+import json
+import struct
+
+import pytest
+from PIL import Image
+
+from date_rules import DateCorrector, DateRule
+from exif_archive import ExifArchive
+from simple_metadata import SimplePhotoMetadata
+
+
+def write_corrupt_exif_jpeg(path):
+    """Écrit un JPEG dont le segment APP1 contient des EXIF tronqués."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, 'JPEG')
+    jpeg = buffer.getvalue()
+    payload = b'Exif\x00\x00II*\x00\x08\x00\x00\x00\x05'
+    app1 = b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+    path.write_bytes(jpeg[:2] + app1 + jpeg[2:])
+    return path
+
+
+def test_corrupt_exif_still_dated_from_filename(tmp_path):
+    photo = write_corrupt_exif_jpeg(tmp_path / "IMG_20190304_101112.jpg")
+
+    metadata = SimplePhotoMetadata(tmp_path).extract_simple_metadata(photo)
+
+    assert metadata['date_creation'] == '04/03/2019'
+    assert metadata['heure_creation'] == '10:11:12'
+    assert metadata['source_date'] == 'nom_fichier'
+    assert metadata['avertissement_exif']
+    assert 'erreur' not in metadata
+
+
+def test_corrupt_exif_still_dated_from_file(tmp_path):
+    photo = write_corrupt_exif_jpeg(tmp_path / "photo.jpg")
+
+    metadata = SimplePhotoMetadata(tmp_path).extract_simple_metadata(photo)
+
+    assert metadata['source_date'] == 'fichier'
+    assert metadata['date_creation'] is not None
+    assert metadata['avertissement_exif']
+
+
+def test_corrupt_exif_reused_on_rescan_and_corrected(tmp_path):
+    photo = write_corrupt_exif_jpeg(tmp_path / "IMG_20190304_101112.jpg")
+    rules = DateCorrector([DateRule('horloge', 'decalage', seconds=3600)])
+    manager = SimplePhotoMetadata(tmp_path, date_rules=rules)
+
+    manager.save_metadata(manager.scan_directory())
+    rescan = SimplePhotoMetadata(tmp_path, date_rules=rules)
+    records = rescan.scan_directory()
+
+    assert rescan.scan_summary['reutilisees'] == 1
+    assert rescan.scan_summary['extraites'] == 0
+    assert records[str(photo)]['heure_creation'] == '11:11:12'
+
+
+def test_exif_block_kept_out_of_metadata(tmp_path, make_jpeg):
+    photo = make_jpeg(tmp_path / "IMG_0001.jpg", "2021:07:02 10:11:12")
+
+    metadata = SimplePhotoMetadata(tmp_path, exif_backup=True).extract_simple_metadata(photo)
+
+    assert metadata['date_creation'] == '02/07/2021'
+    assert all(not isinstance(value, bytes) for value in metadata.values())
+    json.dumps(metadata)
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    {'workers': 2},
+    {'workers': 2, 'use_processes': True},
+    {'workers': 2, 'pipeline': True},
+])
+def test_scan_saves_full_exif(tmp_path, make_jpeg, options):
+    for number in range(4):
+        make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", f"2021:07:0{number + 1} 10:11:12")
+    manager = SimplePhotoMetadata(tmp_path, exif_backup=True)
+
+    records = manager.scan_directory(**options)
+    manager.save_metadata(records)
+
+    assert len(records) == 4
+    archive = ExifArchive(manager.exif_archive_file)
+    assert all(path in archive for path in records)
+    archive.close()
+
+
+def test_process_scan_sends_manager_once_per_worker(tmp_path, make_jpeg, monkeypatch):
+    for number in range(8):
+        make_jpeg(tmp_path / f"IMG_{number:04d}.jpg", "2021:07:02 10:11:12", gps=(48.85, 2.35))
+    manager = SimplePhotoMetadata(tmp_path, timezones=True, instrument=True)
+    pickled = []
+    getstate = SimplePhotoMetadata.__getstate__
+
+    def counting_getstate(self):
+        pickled.append(self)
+        return getstate(self)
+
+    monkeypatch.setattr(SimplePhotoMetadata, '__getstate__', counting_getstate)
+
+    records = manager.scan_directory(workers=2, use_processes=True)
+
+    assert len(pickled) <= 2
+    assert all(metadata['decalage_utc'] for metadata in records.values())
+    assert manager.stats.counters['fichiers'] == 8